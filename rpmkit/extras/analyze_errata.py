@@ -171,11 +171,16 @@ def make_topic_models(workdir):
 
 def updi_xml_itr(updateinfo):
     """
-    :param updateinfo: the content of updateinfo.xml :: str
+    :param updateinfo: Path or file object of updateinfo.xml, parsed
+        incrementally to keep memory usage bounded even if it's huge
     """
-    root = ET.ElementTree(ET.fromstring(updateinfo)).getroot()
-    for upd in root.findall("update"):
-        uinfo = upd.attrib
+    itr = ET.iterparse(updateinfo, events=("start", "end"))
+    (_event, root) = next(itr)
+    for event, upd in itr:
+        if event != "end" or upd.tag != "update":
+            continue
+
+        uinfo = dict(upd.attrib)
         for k in "id title severity rights summary description".split():
             elem = upd.find(k)
             if elem is not None:
@@ -186,6 +191,7 @@ def updi_xml_itr(updateinfo):
         uinfo["refs"] = [r.attrib for r in upd.findall(".//reference")]
         uinfo["packages"] = [dict(filename=p.find("filename").text, **p.attrib)
                              for p in upd.findall(".//package")]
+        root.clear()  # Free elements parsed already.
         yield uinfo
 
 
@@ -195,8 +201,8 @@ def get_errata_list_from_updateinfo_file(filepath):
 
     :param filepath: Path to updateinfo.xml.gz
     """
-    uinfo = gzip.GzipFile(filename=filepath).read()
-    return sorted(updi_xml_itr(uinfo), key=operator.itemgetter("issued"))
+    with gzip.GzipFile(filename=filepath) as uinfo:
+        return sorted(updi_xml_itr(uinfo), key=operator.itemgetter("issued"))
 
 
 def option_parser():
@@ -25,7 +25,7 @@ Commands:
                  List removed RPMs along with the RPMs specified in args
   e[rase]        Same as the above
   s[tandalones]  List the standalone RPMs which required by not any other
-                 RPMs nor requires any other RPMs
+                 RPMs nor requires any other RPMs exclusively
   l[eaves]       List the leaf RPMs which is required by no any other RPMs
   u[pdates]      List update RPMs (DNF will be used as a backend)
 
@@ -35,6 +35,7 @@ Examples:
   %prog -R ./rhel-6-client-1 -x ./rpm_list_to_keep.txt e NetworkManager'*'
   %prog -R ./rhel-6-client-1 e 'NetworkManager.*'  # In regexp.
   %prog -R ./rhel-6-client-1 s
+  %prog -R ./rhel-6-client-1 s --thresholds 1,2,5
   %prog -R ./rhel-6-client-1 leaves
   %prog -R ./rhel-6-client-1 u --latest"""
 
@@ -49,8 +50,8 @@ _FMT_CHOICES = tuple(anyconfig.list_types())
 
 def option_parser(usage=_USAGE, ac_fmt_choices=_FMT_CHOICES):
     defaults = dict(verbose=False, root='/', excludes=None, output=None,
-                    format="simple", st_rpms=1, use_dnf=False,
-                    latest=False, repos=[])
+                    format="simple", st_nrpms=1, thresholds=None,
+                    use_dnf=False, latest=False, repos=[])
 
     p = optparse.OptionParser(usage)
     p.set_defaults(**defaults)
@@ -81,9 +82,16 @@ def option_parser(usage=_USAGE, ac_fmt_choices=_FMT_CHOICES):
     sog = optparse.OptionGroup(p, "Options for standalones command")
     sog.add_option("", "--st-nrpms", type="int",
                    help="Number of RPMs to find standadlone RPMs. "
-                        "Only RPMs has no requires/required RPMs will be "
-                        "selected if it's 1 (default) and RPMs has N "
-                        "requires and/or required RPMs at a maximum.")
+                        "Only RPMs no other RPMs require and do not require "
+                        "any RPMs exclusively will be selected if it's 1 "
+                        "(default), and RPMs no other RPMs require and "
+                        "consist of N RPMs at a maximum along with RPMs "
+                        "only these require.")
+    sog.add_option("", "--thresholds",
+                   help="Comma separated numbers of RPMs to find standalone "
+                        "RPMs for each, e.g. 1,2,5. Results for all of them "
+                        "are computed at once and --st-nrpms is ignored if "
+                        "this option was given.")
     p.add_option_group(sog)
 
     uog = optparse.OptionGroup(p, "Options for updates command")
@@ -115,12 +123,44 @@ def is_file(filepath):
     return os.path.exists(filepath) and os.path.isfile(filepath)
 
 
+def parse_thresholds(thresholds):
+    """
+    :param thresholds: Comma separated numbers of RPMs :: str
+    :return: A list of the numbers
+
+    >>> parse_thresholds("1,2,5")
+    [1, 2, 5]
+    >>> parse_thresholds("1,a")
+    Traceback (most recent call last):
+    ValueError: Invalid threshold, not a positive integer: a
+    """
+    res = []
+    for val in thresholds.split(','):
+        try:
+            num = int(val)
+        except ValueError:
+            num = 0
+
+        if num < 1:
+            raise ValueError("Invalid threshold, not a positive integer: " +
+                             val)
+        res.append(num)
+
+    return res
+
+
 def main(cmd_map=_ARGS_CMD_MAP):
     p = option_parser()
     (options, args) = p.parse_args()
 
     RU.init_log(DEBUG if options.verbose else INFO)
 
+    if options.thresholds:
+        try:
+            thresholds = parse_thresholds(options.thresholds)
+        except ValueError as exc:
+            p.error(str(exc))
+
     if not args:
         p.print_usage()
         sys.exit(1)
@@ -134,7 +174,7 @@ def main(cmd_map=_ARGS_CMD_MAP):
         sys.exit(1)
 
     root = os.path.abspath(options.root)
-    all_rpms = [x["name"] for x in RR.list_installed_rpms(root)]
+    all_rpms = list(RR.list_installed_names_g(root))
 
     if options.excludes:
         if is_file(options.excludes):
@@ -167,8 +207,16 @@ def main(cmd_map=_ARGS_CMD_MAP):
         data = dict(removed=xs, )
 
     elif cmd == CMD_STANDALONES:
-        xs = sorted(RR.list_standalones(root, options.st_nrpms, excludes))
-        data = dict(standalones=xs, )
+        if options.thresholds:
+            res = RR.list_standalones_by_thresholds(root, thresholds,
+                                                    excludes)
+            xs = ["%d %s" % (n, x) for n in thresholds for x in res[n]]
+            data = dict(standalones=dict((str(n), res[n]) for n
+                                         in thresholds), )
+        else:
+            xs = sorted(RR.list_standalones(root, options.st_nrpms,
+                                            excludes))
+            data = dict(standalones=xs, )
 
     elif cmd == CMD_UPDATES:
         xs = [dict(name=x.name, version=x.version, release=x.release,
@@ -209,11 +209,16 @@ def expand_baseurl_in_repofile(baseurl, relver=None, yumvars=_YUMVARS):
 
 def updateinfo_xml_itr(updateinfo):
     """
-    :param updateinfo: the content of updateinfo.xml :: str
+    :param updateinfo: Path or file object of updateinfo.xml, parsed
+        incrementally to keep memory usage bounded even if it's huge
     """
-    root = ET.ElementTree(ET.fromstring(updateinfo)).getroot()
-    for upd in root.findall("update"):
-        uinfo = upd.attrib
+    itr = ET.iterparse(updateinfo, events=("start", "end"))
+    (_event, root) = next(itr)
+    for event, upd in itr:
+        if event != "end" or upd.tag != "update":
+            continue
+
+        uinfo = dict(upd.attrib)
         for k in "id title severity rights summary description".split():
             elem = upd.find(k)
             if elem is not None:
@@ -224,6 +229,7 @@ def updateinfo_xml_itr(updateinfo):
         uinfo["refs"] = [r.attrib for r in upd.findall(".//reference")]
         uinfo["packages"] = [dict(filename=p.find("filename").text, **p.attrib)
                              for p in upd.findall(".//package")]
+        root.clear()  # Free elements parsed already.
         yield uinfo
 
 
@@ -283,8 +289,9 @@ def get_errata_list_from_updateinfo_by_repofile(rid, basearch="x86_64"):
             LOG.error("Failed to get updateinfo.xml from %s", upd_url)
             return None
 
-        updgz = resp.content
-        uinfo = gzip.GzipFile(fileobj=StringIO.StringIO(updgz)).read()
+        # Keep it compressed in memory and decompress it while parsing.
+        updgz = StringIO.StringIO(resp.content)
+        uinfo = gzip.GzipFile(fileobj=updgz)
         return sorted(updateinfo_xml_itr(uinfo),
                       key=operator.itemgetter("issued"))
     except Exception as exc:
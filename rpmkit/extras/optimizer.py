@@ -211,7 +211,7 @@ def main():
     # host_prof_specs = args[0]
 
     root = os.path.abspath(options.root)
-    all_rpms = [x["name"] for x in RR.list_installed_rpms(root)]
+    all_rpms = list(RR.list_installed_names_g(root))
 
     (excludes, removes) = make_excl_packages_list(options.ppaths,
                                                   options.gpaths)
@@ -220,7 +220,8 @@ def main():
     if options.use_dnf:
         (excludes, xs) = RED.compute_removed(remove_candidates, root, excludes)
     else:
-        xs = RR.compute_removed(remove_candidates, root, excludes=excludes)
+        (excludes, xs) = RR.compute_removed_and_excludes(remove_candidates,
+                                                         root, excludes)
 
     data = dict(removed=xs, excludes=excludes)
 
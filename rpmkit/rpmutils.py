@@ -157,6 +157,40 @@ def rpm_transactionset(root='/', readonly=True):
     return ts
 
 
+def rpmdb_tag_values_g(root='/', tags=RPM_BASIC_KEYS, name=None,
+                       pattern=None):
+    """
+    Iterate installed RPMs in RPM DB lazily and yield values of given tags
+    only, instead of header objects, one by one.
+
+    :param root: RPM DB root dir
+    :param tags: RPM tag names or values, e.g. ("name", "version"),
+        (rpm.RPMTAG_NAME, )
+    :param name: Name of RPM to match exactly or None. RPM DB index is used
+        to find it so that it's much faster than ``pattern``.
+    :param pattern: Glob pattern of the names of RPMs to match or None, e.g.
+        'kernel*'. It's evaluated by rpmlib before headers are loaded.
+
+    :return: A generator yields tuples of values of ``tags``
+    """
+    ts = rpm_transactionset(root)
+    try:
+        if name is None:
+            mi = ts.dbMatch()
+        else:
+            mi = ts.dbMatch("name", name)
+
+        if pattern is not None:
+            mi.pattern("name", rpm.RPMMIRE_GLOB, pattern)
+
+        for h in mi:
+            yield tuple(h[t] for t in tags)
+
+        del mi
+    finally:
+        ts.closeDB()
+
+
 def _list_installed_rpms(root='/', keys=RPM_BASIC_KEYS, yum=False):
     """
     Return a list of installed RPMs.
@@ -173,19 +207,26 @@ def _list_installed_rpms(root='/', keys=RPM_BASIC_KEYS, yum=False):
         return sorted((p2d(p) for p in yum_list_installed(root)),
                       key=itemgetter(*keys))
     else:
-        ts = rpm_transactionset(root)
-        mi = ts.dbMatch()
-
-        ps = [h2nvrea(h, keys) for h in mi]
-        del mi, ts
-
-        return sorted(ps, key=itemgetter(*keys))
+        return sorted((dict(zip(keys, vs)) for vs
+                       in rpmdb_tag_values_g(root, keys)),
+                      key=itemgetter(*keys))
 
 
 yum_list_installed = RM.memoize(_yum_list_installed)
 list_installed_rpms = RM.memoize(_list_installed_rpms)
 
 
+def list_installed_names_g(root='/', pattern=None):
+    """
+    :param root: RPM DB root dir
+    :param pattern: Glob pattern of the names of RPMs to match or None
+
+    :return: A generator yields the names of installed RPMs
+    """
+    for vs in rpmdb_tag_values_g(root, ("name", ), pattern=pattern):
+        yield vs[0]
+
+
 def guess_rhel_version(root, maybe_rhel_4=False):
     """
     Guess RHEL major version from RPM database based on
@@ -235,9 +276,9 @@ def guess_rhel_version(root, maybe_rhel_4=False):
 
 
 def _get_rpmver(root):
-    ts = rpm_transactionset(root, True)
-    rpmver = [h for h in ts.dbMatch()][0][rpm.RPMTAG_RPMVERSION]
-    del ts
+    vals = rpmdb_tag_values_g(root, (rpm.RPMTAG_RPMVERSION, ))
+    rpmver = next(vals)[0]
+    vals.close()
 
     return rpmver
 
@@ -255,7 +296,17 @@ def guess_rhel_version_simple(root):
     :param root: RPM DB root dir
     :param maybe_rhel_4:
     """
-    rpmver = _get_rpmver(root)
+    return rhel_version_from_rpmver(_get_rpmver(root))
+
+
+def rhel_version_from_rpmver(rpmver):
+    """
+    :param rpmver: Version of rpm, see :function:`guess_rhel_version_simple`
+    :return: RHEL major version or 0 if unknown
+
+    >>> rhel_version_from_rpmver("4.11.1")
+    7
+    """
     irpmver = int(''.join(rpmver.split('.')[:4])[:4])
 
     if irpmver in (433, 432, 431):
@@ -322,6 +373,65 @@ def find_latest(packages):
     return sorted(packages, cmp=pcmp)[-1]
 
 
+# Ranks of segments of versions and releases in keys. Tilde sorts before
+# anything even the end of string, caret sorts after the end but before any
+# other segments and numeric segments are newer than alphabetical ones, same
+# as rpmvercmp.
+(_VR_TILDE, _VR_END, _VR_CARET, _VR_ALPHA, _VR_NUM) = (0, 1, 2, 3, 4)
+_VR_SEG_RE = re.compile(r"(~|\^|[0-9]+|[a-zA-Z]+)")
+
+
+def _vr_key(vr):
+    """
+    :param vr: Version or release string
+    :return: A tuple of (rank, value) of segments in `vr`
+    """
+    segs = []
+    for seg in _VR_SEG_RE.findall(vr or ''):
+        if seg == '~':
+            segs.append((_VR_TILDE, ))
+        elif seg == '^':
+            segs.append((_VR_CARET, ))
+        elif seg.isdigit():
+            segs.append((_VR_NUM, int(seg)))
+        else:
+            segs.append((_VR_ALPHA, seg))
+
+    segs.append((_VR_END, ))
+    return tuple(segs)
+
+
+def evr_key(epoch, version, release):
+    """
+    Make a key to sort and compare EVRs in pure python with the same results
+    as rpm.labelCompare, so that EVRs can be compared without calling rpm or
+    yum and looked up with bisect.
+
+    :param epoch: Epoch, an int or a str or None
+    :param version: Version string
+    :param release: Release string
+    :return: A tuple can be compared with other keys
+
+    >>> evr_key(0, "4.1.2", "15.el6_5.1") < evr_key(0, "4.1.2", "15.el6_5.2")
+    True
+    >>> evr_key(None, "1.0", "1") == evr_key("0", "1.00", "1")
+    True
+    >>> evr_key(1, "0.1", "1") > evr_key(0, "9.9", "9")
+    True
+    >>> evr_key(0, "1.0", "1") > evr_key(0, "1.0a", "1")  # num > alpha
+    False
+    >>> evr_key(0, "1.0~rc1", "1") < evr_key(0, "1.0", "1")
+    True
+    >>> evr_key(0, "1.0^1", "1") > evr_key(0, "1.0", "1")
+    True
+    >>> evr_key(0, "1.0^1", "1") < evr_key(0, "1.0.1", "1")
+    True
+    >>> evr_key(0, "2.6.32", "431.el6") < evr_key(0, "2.6.32", "431.1.2.el6")
+    True
+    """
+    return (int(epoch or 0), _vr_key(version), _vr_key(release))
+
+
 def sort_by_names(xs):
     """
     :param xs: [dict(name, ...)]
@@ -536,63 +646,60 @@ def _get_leaves(root=None):
 get_leaves = RM.memoize(_get_leaves)
 
 
-def _list_standalones_1_g(name, reqs, rreqs, nrpms=1, excludes=[]):
+def list_standalones_by_thresholds(root=None, thresholds=(1, ),
+                                   excludes=None, rreqs=None):
     """
-    List the RPMs no other RPMs require nor no required by.
+    List the RPMs no other RPMs require and the RPMs only these require (its
+    exclusively-owned dependency subtree) consist of N RPMs at maximum, for
+    each N in ``thresholds``.
 
-    :param name: Name of the RPM to start to find RPMs
-    :param reqs: RPM Dependency relation map
-    :param rreqs: Reversed RPM Dependency relation map
-    :param nrpms: number of RPMs considered as standalones
+    Sizes of the exclusively-owned subtrees of all RPMs are computed at once
+    and results for each threshold are just filtered from them.
+
+    :param root: root dir of RPM Database
+    :param thresholds: A list of numbers of RPMs considered as standalones
     :param excludes: RPMs which should be skipped and excluded from results
+    :param rreqs: Reversed RPM Dependency relation map or an instance of
+        :class:`DepGraph` or None (computed from RPM DB in ``root``)
+
+    :return: A dict, {threshold: [RPM names]}
+
+    >>> rreqs = dict(a=[], b=["a"], c=["a", "d"], d=[], e=[])
+    >>> res = list_standalones_by_thresholds(rreqs=rreqs,
+    ...                                      thresholds=(1, 2, 3))
+    >>> sorted(res.items())
+    [(1, ['d', 'e']), (2, ['a', 'd', 'e']), (3, ['a', 'd', 'e'])]
     """
-    if name in excludes:
-        logging.info("%s is in the excluded list" % name)
-        return
-
-    ps = rreqs.get(name, [])
-    if ps:
-        if any(e in ps for e in excludes):
-            logging.debug("%s is required by RPM[s] in the excluded list"
-                          % name)
-        elif len(ps) >= nrpms:
-            logging.debug("%s is required by more than %d RPMs" %
-                          (name, len(ps)))
-        else:
-            logging.debug("%s is required by %d RPMs: %s" %
-                          (name, len(ps), ' '.join(ps)))
-            for p in ps:
-                for x in _list_standalones_1_g(p, reqs, rreqs, nrpms - 1,
-                                               excludes):
-                    yield x
+    if not rreqs:
+        graph = make_dep_graph(root)
+    elif isinstance(rreqs, DepGraph):
+        graph = rreqs
     else:
-        ps = reqs.get(name, [])
-        if not ps or len(ps) < nrpms:
-            logging.debug("%s requires %d RPMs: %s" %
-                          (name, len(ps), ' '.join(ps)))
-            yield name
+        graph = DepGraph(rreqs)
+
+    leaves = graph.list_leaves_and_exclusive_sizes(excludes or ())
+    return dict((n, [name for name, size in leaves if size <= n]) for n
+                in thresholds)
 
 
-def list_standalones_g(root=None, nrpms=1, excludes=[]):
+def list_standalones_g(root=None, nrpms=1, excludes=None):
     """
-    List the RPMs no other RPMs require nor no required by.
+    List the RPMs no other RPMs require and the RPMs only these require
+    consist of ``nrpms`` RPMs at maximum.
 
     :param root: root dir of RPM Database
     :param nrpms: number of RPMs considered as standalones
     :param excludes: RPMs which should be skipped and excluded from results
     """
-    all_rpms = [p["name"] for p in list_installed_rpms(root)]
-    reqs = make_requires_dict(root)
-    rreqs = make_reversed_requires_dict(root)
+    res = list_standalones_by_thresholds(root, (nrpms, ), excludes)
+    for name in res[nrpms]:
+        yield name
 
-    for r in all_rpms:
-        for x in _list_standalones_1_g(r, reqs, rreqs, nrpms, excludes):
-            yield x
 
-
-def list_standalones(root=None, nrpms=1, excludes=[]):
+def list_standalones(root=None, nrpms=1, excludes=None):
     """
-    List the RPMs no other RPMs require nor no required by.
+    List the RPMs no other RPMs require and the RPMs only these require
+    consist of ``nrpms`` RPMs at maximum.
 
     :param root: root dir of RPM Database
     :param nrpms: number of RPMs considered as standalones
@@ -647,37 +754,364 @@ def list_required_rpms_not_required_by_others(rpmname, root=None):
     return result
 
 
-def _compute_removed_1(remove, rreqs, acc=[]):
+class DepGraph(object):
+    """
+    RPM dependency graph indexed by integers to compute RPMs to be removed
+    along with given RPMs iteratively, with bytearrays as node (RPM) sets.
+
+    Graph is built once from a reversed RPM dependency relation map and it can
+    answer many removal queries, e.g. candidate removal sets evaluated one by
+    one by fake_yum and the optimizer.
+
+    >>> rreqs = dict(a=["b"], b=["c", "d"], c=[], d=["a"], e=[], f=["e"])
+    >>> g = DepGraph(rreqs)
+    >>> g.compute_removed(["a"])
+    ['a', 'b', 'c', 'd']
+    >>> g.compute_removed(["e", "x"])
+    ['e', 'x']
+    >>> g.compute_removed(["a", "f"], excludes=["c"])
+    ['e', 'f']
+    >>> g.compute_removed_batch([["c"], ["f"], ["b"]])
+    [['c'], ['e', 'f'], ['a', 'b', 'c', 'd']]
+    """
+
+    def __init__(self, rreqs):
+        """
+        :param rreqs: Reversed RPM Dependency relation map, {r: [p]}
+        """
+        names = set(rreqs.keys())
+        for ps in rreqs.values():
+            names.update(ps)
+
+        self.names = sorted(names)
+        self.index = dict((n, i) for i, n in enumerate(self.names))
+        self.rreqs = [tuple(self.index[p] for p in sorted(rreqs.get(n, [])))
+                      for n in self.names]
+
+    def _closure(self, idx, state, mark=2):
+        """
+        Traverse the graph from the node ``idx`` in breadth first order and
+        mark nodes not marked in ``state`` yet.
+
+        :param idx: Index of the RPM to start traversal from
+        :param state: A bytearray holds state of each nodes; 0 = not visited
+        :param mark: State value to mark newly visited nodes
+
+        :return: A list of indices of newly visited nodes including ``idx``
+        """
+        state[idx] = mark
+        visited = [idx]
+        rreqs = self.rreqs
+
+        for cur in visited:  # NOTE: ``visited`` works as a queue also.
+            for nxt in rreqs[cur]:
+                if not state[nxt]:
+                    state[nxt] = mark
+                    visited.append(nxt)
+
+        return visited
+
+    def _reqs(self):
+        """
+        :return: RPM Dependency relation map, [(index_of_required_RPM)]
+        """
+        reqs = [[] for _n in self.names]
+        for idx, ps in enumerate(self.rreqs):
+            for p in ps:
+                reqs[p].append(idx)
+
+        return reqs
+
+    def _postorder(self, reqs):
+        """
+        List nodes in post order of the depth first traversal from the
+        virtual root node requires all of the leaves (and nodes unreachable
+        from these leaves, e.g. RPMs in dependency cycles only).
+
+        :param reqs: RPM Dependency relation map, see :meth:`_reqs`
+        :return: (A list of node indices in post order, a list of node indices
+            the virtual root node requires)
+        """
+        visited = bytearray(len(self.names))
+        order = []
+        roots = []
+
+        starts = [i for i, ps in enumerate(self.rreqs) if not ps]
+        starts += range(len(self.names))  # Unreachable nodes from leaves.
+
+        for start in starts:
+            if visited[start]:
+                continue
+
+            visited[start] = 1
+            roots.append(start)
+            stack = [(start, iter(reqs[start]))]
+            while stack:
+                (cur, children) = stack[-1]
+                for child in children:
+                    if not visited[child]:
+                        visited[child] = 1
+                        stack.append((child, iter(reqs[child])))
+                        break
+                else:
+                    stack.pop()
+                    order.append(cur)
+
+        return (order, roots)
+
+    def immediate_dominators(self):
+        """
+        Compute the immediate dominator of each node in the dependency graph
+        from the virtual root node requires all of the leaves, with the
+        iterative algorithm by Cooper, Harvey and Kennedy.
+
+        RPMs (nodes) dominated by a RPM are the RPMs only that RPM requires
+        directly or indirectly.
+
+        :return: (A list of immediate dominator indices of each nodes, where
+            the index of the virtual root node is len(self.names),
+            a list of node indices in post order)
+        """
+        nnodes = len(self.names)
+        root = nnodes
+        (order, roots) = self._postorder(self._reqs())
+
+        porder = [0] * (nnodes + 1)
+        for i, idx in enumerate(order):
+            porder[idx] = i
+        porder[root] = nnodes
+
+        preds = [list(self.rreqs[i]) for i in range(nnodes)]
+        for idx in roots:
+            preds[idx].append(root)
+
+        idoms = [None] * (nnodes + 1)
+        idoms[root] = root
+
+        def intersect(x, y):
+            while x != y:
+                while porder[x] < porder[y]:
+                    x = idoms[x]
+                while porder[y] < porder[x]:
+                    y = idoms[y]
+            return x
+
+        changed = True
+        while changed:
+            changed = False
+            for idx in reversed(order):
+                new_idom = None
+                for p in preds[idx]:
+                    if idoms[p] is None:
+                        continue
+                    new_idom = p if new_idom is None else intersect(p,
+                                                                    new_idom)
+                if idoms[idx] != new_idom:
+                    idoms[idx] = new_idom
+                    changed = True
+
+        return (idoms, order)
+
+    def list_leaves_and_exclusive_sizes(self, excludes=()):
+        """
+        Compute the size of the exclusively-owned dependency subtree, that is,
+        the number of the RPMs only the RPM requires directly or indirectly
+        and itself, of each leaf RPM no other RPMs require.
+
+        :param excludes: RPMs which should be skipped and excluded from
+            results; leaves require any of these exclusively are excluded also
+
+        :return: A list of (leaf_RPM_name, size_of_subtree) sorted by names
+
+        >>> rreqs = dict(a=[], b=["a"], c=["a", "d"], d=[], e=[])
+        >>> DepGraph(rreqs).list_leaves_and_exclusive_sizes()
+        [('a', 2), ('d', 1), ('e', 1)]
+        >>> DepGraph(rreqs).list_leaves_and_exclusive_sizes(["b"])
+        [('d', 1), ('e', 1)]
+        """
+        root = len(self.names)
+        (idoms, order) = self.immediate_dominators()
+
+        sizes = [1] * (root + 1)
+        excluded = self._excluded(excludes) + bytearray(1)
+
+        # Dominators come before the nodes they dominate in reverse post
+        # order so that sizes can be accumulated bottom-up in post order.
+        for idx in order:
+            idom = idoms[idx]
+            if idom != root:
+                sizes[idom] += sizes[idx]
+                excluded[idom] |= excluded[idx]
+
+        return [(self.names[idx], sizes[idx]) for idx in range(root)
+                if not self.rreqs[idx] and not excluded[idx]]
+
+    def _excluded(self, excludes):
+        """
+        :param excludes: RPM names should not be removed
+        :return: A bytearray, excluded (1) or not (0) for each nodes
+        """
+        excluded = bytearray(len(self.names))
+        for name in excludes:
+            idx = self.index.get(name)
+            if idx is not None:
+                excluded[idx] = 1
+
+        return excluded
+
+    def compute_removed_g(self, removes, excludes=(), excluded=None):
+        """
+        :param removes: The list of name of RPMs to remove (uninstall).
+        :param excludes: RPMs which should not be removed and excluded from
+            the RPMs to be removed
+        :param excluded: A bytearray made by :meth:`_excluded` from
+            ``excludes`` previously to reuse, or None
+
+        :yield: A list of RPM names to be removed newly along with each RPM
+            in ``removes`` (may be empty)
+        """
+        if excluded is None:
+            excluded = self._excluded(excludes)
+        else:
+            excluded = bytearray(excluded)  # It'll be modified.
+
+        return self._removed_g(removes, excludes, excluded)
+
+    def _removed_g(self, removes, excludes, excluded):
+        """
+        Same as :meth:`compute_removed_g` but RPMs excluded as some of their
+        requires are so are marked in ``excluded`` in place.
+        """
+        removed = bytearray(len(self.names))
+        others = set()  # RPMs not in the graph.
+
+        for r in removes:
+            idx = self.index.get(r)
+            if idx is None:
+                if r in excludes or r in others:
+                    yield []
+                else:
+                    others.add(r)
+                    yield [r]
+                continue
+
+            if excluded[idx]:
+                logging.info("Excluded and not resolve requires: " + r)
+                yield []
+                continue
+
+            if removed[idx]:
+                yield []
+                continue
+
+            xs = self._closure(idx, removed)
+            if any(excluded[x] for x in xs):
+                logging.info("Excluded as some of requires are so: " + r)
+                for x in xs:
+                    removed[x] = 0
+                    excluded[x] = 1
+                yield []
+            else:
+                for x in xs:
+                    removed[x] = 1
+                yield [self.names[x] for x in xs]
+
+    def compute_removed(self, removes, excludes=(), excluded=None):
+        """
+        :param removes: The list of name of RPMs to remove (uninstall).
+        :param excludes: RPMs which should not be removed and excluded from
+            the RPMs to be removed
+        :param excluded: See :meth:`compute_removed_g`
+
+        :return: [pname], a sorted list of RPM names to be uninstalled along
+            with ``removes`` RPMs.
+        """
+        return sorted(RU.concat(self.compute_removed_g(removes, excludes,
+                                                       excluded)))
+
+    def compute_removed_and_excludes(self, removes, excludes=()):
+        """
+        :param removes: The list of name of RPMs to remove (uninstall).
+        :param excludes: RPMs which should not be removed and excluded from
+            the RPMs to be removed
+
+        :return: A tuple of ([pname], a sorted list of ``excludes`` and RPMs
+            excluded as some of their requires are so, [pname], a sorted list
+            of RPM names to be uninstalled along with ``removes`` RPMs)
+
+        >>> g = DepGraph(dict(a=["b"], b=["c"], c=[], d=[]))
+        >>> g.compute_removed_and_excludes(["a", "d"], ["c"])
+        (['a', 'b', 'c'], ['d'])
+        """
+        excluded = self._excluded(excludes)
+        xs = sorted(RU.concat(self._removed_g(removes, excludes, excluded)))
+        excls = set(excludes)
+        excls.update(n for n, x in itertools.izip(self.names, excluded) if x)
+
+        return (sorted(excls), xs)
+
+    def compute_removed_batch(self, removes_list, excludes=()):
+        """
+        Batch version of :meth:`compute_removed` to answer many removal
+        queries against this graph.
+
+        :param removes_list: A list of the lists of RPM names to remove
+        :param excludes: RPMs which should not be removed in every queries
+
+        :return: A list of the results of :meth:`compute_removed` for each
+            RPM name list in ``removes_list``
+        """
+        excluded = self._excluded(excludes)
+        return [self.compute_removed(rs, excludes, excluded) for rs
+                in removes_list]
+
+
+def _make_dep_graph(root=None):
+    """
+    :param root: RPM Database root dir or None (use /var/lib/rpm).
+    :return: An instance of :class:`DepGraph`
+    """
+    return DepGraph(make_reversed_requires_dict(root))
+
+
+make_dep_graph = RM.memoize(_make_dep_graph)
+
+
+def compute_removed_1(remove, rreqs, acc=None):
     """
-    Recursively, it will traverse dependency tree and Return a list of RPMs if
-    given ``remove`` RPM was uninstalled such like yum does with 'remove
-    (uninstall)' sub command.
+    Traverse dependency tree and return a list of RPMs if given ``remove`` RPM
+    was uninstalled such like yum does with 'remove (uninstall)' sub command.
 
     :param remove: The name of RPM to remove (uninstall).
     :param rreqs: Reversed RPM Dependency relation map
-    :param acc: Accumulator
+    :param acc: A list of RPM names already resolved or None
 
     :return: [pname], a list of RPM names to be uninstalled along with
-        ``removes`` RPMs.
-    """
-    removes_next = sorted(p for p in rreqs.get(remove, []) if p not in acc)
-    logging.debug("Resolved requires: "
-                  "%s -> %s" % (remove, ' '.join(removes_next) or 'none'))
+        ``removes`` RPMs, including ``acc``.
 
-    if removes_next:
-        for r in removes_next:
-            acc.extend(x for x in _compute_removed_1(r, rreqs, acc + [r])
-                       if x not in acc)
+    >>> rreqs = dict(a=["b"], b=["c", "d"], c=[], d=["a"])
+    >>> compute_removed_1("a", rreqs)
+    ['b', 'c', 'd']
+    >>> compute_removed_1("b", rreqs, ["b"])
+    ['b', 'c', 'd', 'a']
+    """
+    acc = [] if acc is None else list(acc)
+    seen = set(acc)
+    seen.add(remove)
+
+    targets = [remove]
+    for r in targets:
+        removes_next = sorted(p for p in rreqs.get(r, []) if p not in seen)
+        logging.debug("Resolved requires: "
+                      "%s -> %s" % (r, ' '.join(removes_next) or 'none'))
+        seen.update(removes_next)
+        targets.extend(removes_next)
+        acc.extend(removes_next)
 
     return acc
 
 
-# :note: This function should not be memoized as argument ``acc`` may be
-# changed everytime it's called.
-compute_removed_1 = _compute_removed_1
-
-
-def compute_removed_g(removes, rreqs, acc=[], excludes=[]):
+def compute_removed_g(removes, rreqs, acc=None, excludes=None):
     """
     This is a derived version of :function:``compute_removed_1`` which accepts
     multiple RPMs as ``removes`` parameter.
@@ -686,49 +1120,84 @@ def compute_removed_g(removes, rreqs, acc=[], excludes=[]):
     uninstalled such like yum does with 'remove (uninstall)' sub command.
 
     :param removes: The list of name of RPMs to remove (uninstall).
-    :param rreqs: Reversed RPM Dependency relation map
-    :param acc: Accumulator
+    :param rreqs: Reversed RPM Dependency relation map or an instance of
+        :class:`DepGraph`
+    :param acc: A list of RPM names already resolved or None
     :param excludes: RPMs which should not be removed and excluded from the
         RPMs to be removed
 
     :yield: [pname], a list of RPM names to be uninstalled along with
         ``removes`` RPMs one by one.
     """
-    for r in removes:
-        if r in excludes:
-            logging.info("Excluded and not resolve requires: " + r)
-            continue
-
-        xs = compute_removed_1(r, rreqs, acc + [r])
-
-        if any(x in excludes for x in xs):
-            logging.info("Excluded as some of requires are so: " + r)
-            excludes.extend([r] + xs)
-            continue
+    graph = rreqs if isinstance(rreqs, DepGraph) else DepGraph(rreqs)
+    acc = [] if acc is None else list(acc)
 
-        acc.extend([r] + xs)
+    for xs in graph.compute_removed_g(removes, excludes or ()):
+        acc.extend(xs)
         yield acc
 
 
-def compute_removed(removes, root=None, rreqs=None, acc=[], excludes=[]):
+def compute_removed(removes, root=None, rreqs=None, acc=None, excludes=None):
     """
     Returns a list of RPMs if given list of RPMs ``removes`` was uninstalled
     such like yum does with 'remove (uninstall)' sub command.
 
     :param removes: The list of name of RPMs to remove (uninstall).
     :param root: RPM Database root dir or None (use /var/lib/rpm).
-    :param rreqs: Reversed RPM Dependency relation map
-    :param acc: Accumulator
+    :param rreqs: Reversed RPM Dependency relation map or an instance of
+        :class:`DepGraph`
+    :param acc: A list of RPM names already resolved or None
     :param excludes: RPMs which should not be removed and excluded from the
         RPMs to be removed
 
     :return: [pname], a list of RPM names to be uninstalled along with
         ``removes`` RPMs.
+
+    >>> rreqs = dict(a=["b"], b=["c"], c=[], d=[])
+    >>> compute_removed(["b", "d"], rreqs=rreqs)
+    ['b', 'c', 'd']
+    >>> compute_removed(["a", "d"], rreqs=rreqs, excludes=["c"])
+    ['d']
     """
     if not rreqs:
-        rreqs = make_reversed_requires_dict(root)
+        graph = make_dep_graph(root)
+    elif isinstance(rreqs, DepGraph):
+        graph = rreqs
+    else:
+        graph = DepGraph(rreqs)
+
+    xs = graph.compute_removed(removes, excludes or ())
+    return ucat([acc, xs]) if acc else xs
+
+
+def compute_removed_and_excludes(removes, root=None, excludes=(),
+                                 rreqs=None):
+    """
+    Similar to :function:`compute_removed` but returns RPMs excluded also like
+    :function:`rpmkit.extras.rk_dnf.compute_removed`.
+
+    :param removes: The list of name of RPMs to remove (uninstall).
+    :param root: RPM Database root dir or None (use /var/lib/rpm).
+    :param excludes: RPMs which should not be removed and excluded from the
+        RPMs to be removed
+    :param rreqs: See :function:`compute_removed`
+
+    :return: A tuple of ([pname], a list of RPM names excluded including ones
+        excluded as some of their requires are so, [pname], a list of RPM
+        names to be uninstalled along with ``removes`` RPMs)
+
+    >>> rreqs = dict(a=["b"], b=["c"], c=[], d=[])
+    >>> compute_removed_and_excludes(["a", "d"], excludes=["c"], rreqs=rreqs)
+    (['a', 'b', 'c'], ['d'])
+    """
+    if not rreqs:
+        graph = make_dep_graph(root)
+    elif isinstance(rreqs, DepGraph):
+        graph = rreqs
+    else:
+        graph = DepGraph(rreqs)
 
-    return ucat(compute_removed_g(removes, rreqs, acc, excludes))
+    return graph.compute_removed_and_excludes(removes, excludes or ())
 
 
 def guess_os_version_from_rpmfile(rpmfile):
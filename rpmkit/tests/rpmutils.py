@@ -131,4 +131,65 @@ class Test_60_find_updates_g(unittest.TestCase):
 
         self.assertEquals(updates, expected)
 
+
+# {required: [requires]}
+RREQS_0 = dict(a=["b", "c"], b=["d"], c=["d"], d=[], e=["a"], f=[], g=["f"])
+
+
+class Test_70_DepGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = RU.DepGraph(RREQS_0)
+
+    def test_00_init(self):
+        self.assertEquals(self.graph.names, sorted(RREQS_0.keys()))
+        self.assertEquals(self.graph.rreqs[self.graph.index["d"]], ())
+
+    def test_10_compute_removed(self):
+        self.assertEquals(self.graph.compute_removed(["d"]), ['d'])
+        self.assertEquals(self.graph.compute_removed(["b"]), ['b', 'd'])
+        self.assertEquals(self.graph.compute_removed(["e"]),
+                          ['a', 'b', 'c', 'd', 'e'])
+
+    def test_20_compute_removed__excludes(self):
+        self.assertEquals(self.graph.compute_removed(["e", "g"], ["d"]),
+                          ['f', 'g'])
+
+    def test_30_compute_removed__unknown(self):
+        self.assertEquals(self.graph.compute_removed(["x", "x"]), ['x'])
+
+    def test_40_compute_removed_batch(self):
+        removes_list = [["b"], ["e", "g"], ["a", "x"]]
+        self.assertEquals(self.graph.compute_removed_batch(removes_list,
+                                                           ["c"]),
+                          [['b', 'd'], ['f', 'g'], ['x']])
+
+    def test_50_compute_removed__no_leaks(self):
+        excludes = ["d"]
+        self.assertEquals(RU.compute_removed(["e"], rreqs=RREQS_0,
+                                             excludes=excludes), [])
+        self.assertEquals(excludes, ["d"])
+        self.assertEquals(RU.compute_removed(["g"], rreqs=RREQS_0),
+                          ['f', 'g'])
+
+    def test_52_compute_removed_and_excludes(self):
+        excludes = ["d"]
+        (excls, xs) = RU.compute_removed_and_excludes(["e", "g"],
+                                                      excludes=excludes,
+                                                      rreqs=RREQS_0)
+        self.assertEquals(xs, ['f', 'g'])
+        self.assertEquals(excls, ['a', 'b', 'c', 'd', 'e'])
+        self.assertEquals(excludes, ["d"])
+
+    def test_60_list_leaves_and_exclusive_sizes(self):
+        self.assertEquals(self.graph.list_leaves_and_exclusive_sizes(),
+                          [('d', 5), ('f', 2)])
+        self.assertEquals(self.graph.list_leaves_and_exclusive_sizes(["g"]),
+                          [('d', 5)])
+
+    def test_70_list_standalones_by_thresholds(self):
+        res = RU.list_standalones_by_thresholds(rreqs=RREQS_0,
+                                                thresholds=(1, 2, 5))
+        self.assertEquals(res, {1: [], 2: ['f'], 5: ['d', 'f']})
+
 # vim:sw=4:ts=4:et:
@@ -18,6 +18,11 @@ LOG = logging.getLogger("rpmkit.updateinfo.base")
 class Base(object):
     name = 'rpmkit.updateinfo.base'
 
+    # True if this backend uses repo metadata loaded by
+    # rpmkit.updateinfo.repometa, which may be loaded once with the method
+    # 'index' and shared among hosts.
+    uses_repometa = False
+
     def __init__(self, root='/', repos=[], disabled_repos=['*'],
                  workdir=None, cachedir=None, **kwargs):
         """
@@ -123,7 +128,205 @@ def inspect_origin(name, vendor, buildhost, extras=[], extra_names=[],
     return dict(origin=origin, rebuilt=False, replaced=False)
 
 
-class Package(dict):
+try:
+    _intern = intern  # pylint: disable=invalid-name
+except NameError:  # python >= 3.0
+    from sys import intern as _intern
+
+
+def intern_s(val):
+    """
+    Intern given string to share it among package records.
+
+    >>> intern_s("x86_64") is intern_s("".join(["x86", "_64"]))
+    True
+    >>> intern_s(None) is None
+    True
+    """
+    if isinstance(val, str):
+        return _intern(val)
+
+    return val
+
+
+class Record(object):
+    """
+    Base class of dict-compatible records holding their values in __slots__.
+
+    collections.Mapping is not inherited because ABCs in python 2 have no
+    __slots__ and instances of their subclasses have __dict__ always.
+    Subclasses define __getitem__, __iter__ and __len__, and are registered
+    as virtual subclasses of collections.Mapping instead.
+    """
+    __slots__ = ()
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def iterkeys(self):
+        return iter(self)
+
+    def itervalues(self):
+        return (self[key] for key in self)
+
+    def iteritems(self):
+        return ((key, self[key]) for key in self)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+
+        return True
+
+    def __eq__(self, other):
+        if not isinstance(other, collections.Mapping):
+            return NotImplemented
+
+        return dict(self.items()) == dict(other.items())
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+
+class NEVRA(Record):
+    """
+    Compact, read-only mostly, dict-compatible record represents a package.
+
+    Each record holds its values in __slots__ and interned strings instead of
+    a dict per package, so that lists of packages of many hosts can be kept in
+    memory at once. Extra keys given are kept in a dict ``_extras`` only if
+    any.
+
+    >>> p = NEVRA("bash", "4.1.2", "15.el6_5.1", "x86_64", src="bash.src.rpm")
+    >>> p["name"], p["epoch"], p["src"]
+    ('bash', 0, 'bash.src.rpm')
+    >>> p == dict(name="bash", version="4.1.2", release="15.el6_5.1",
+    ...           arch="x86_64", epoch=0, src="bash.src.rpm")
+    True
+    >>> sorted(p.keys())
+    ['arch', 'epoch', 'name', 'release', 'src', 'version']
+    >>> isinstance(p, collections.Mapping), hasattr(p, "__dict__")
+    (True, False)
+    """
+    _keys = ("name", "version", "release", "arch", "epoch")
+    _fields = _keys + ("_extras", )
+    __slots__ = _fields
+
+    def __init__(self, name, version, release, arch, epoch=0, **kwargs):
+        """
+        :param name: Package name
+        """
+        self.name = intern_s(name)
+        self.version = intern_s(version)
+        self.release = intern_s(release)
+        self.arch = intern_s(arch)
+        self.epoch = intern_s(epoch)
+        self._extras = kwargs or None
+
+    def __getitem__(self, key):
+        if key in self._keys:
+            return getattr(self, key)
+
+        if self._extras and key in self._extras:
+            return self._extras[key]
+
+        raise KeyError(key)
+
+    def __setitem__(self, key, val):
+        if key in self._keys:
+            setattr(self, key, intern_s(val))
+        elif self._extras is None:
+            self._extras = {key: val}
+        else:
+            self._extras[key] = val
+
+    def __iter__(self):
+        for key in self._keys:
+            yield key
+
+        if self._extras:
+            for key in self._extras:
+                yield key
+
+    def __len__(self):
+        return len(self._keys) + (len(self._extras) if self._extras else 0)
+
+    def __contains__(self, key):
+        return key in self._keys or bool(self._extras and key in self._extras)
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return (tuple(self[k] for k in self._keys) ==
+                    tuple(other[k] for k in self._keys) and
+                    (self._extras or None) == (other._extras or None))
+
+        return super(NEVRA, self).__eq__(other)
+
+    def __getstate__(self):
+        return tuple(getattr(self, f) for f in self._fields)
+
+    def __setstate__(self, state):
+        for field, val in zip(self._fields, state):
+            setattr(self, field, val)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __str__(self):
+        return "({name}, {version}, {release}, {epoch}, {arch})".format(**self)
+
+    def to_dict(self):
+        """
+        :return: A dict represents this package, e.g. to dump as JSON data
+        """
+        return dict(self)
+
+
+collections.Mapping.register(NEVRA)
+
+_FLAG_REBUILT = 1
+_FLAG_REPLACED = 2
+
+
+class Package(NEVRA):
+    """
+    Compact record represents an installed or update package.
+
+    Origin of the package is kept as an interned string and the rebuilt and
+    replaced flags are packed into an int.
+
+    >>> p = Package("bash", "4.1.2", "15.el6_5.1", "x86_64", 0, "The shell",
+    ...             "Red Hat, Inc.", "x86-001.build.bos.redhat.com")
+    >>> p["origin"], p["rebuilt"], p["replaced"], p.get("originally_from")
+    ('redhat', False, False, None)
+    >>> p["replaced"] = True
+    >>> p.get("replaced")
+    True
+    >>> len(p), len(dict(p))
+    (11, 11)
+    >>> hasattr(p, "__dict__")
+    False
+    """
+    _keys = NEVRA._keys + ("summary", "vendor", "buildhost", "origin",
+                           "rebuilt", "replaced")
+    __slots__ = ("summary", "vendor", "buildhost", "origin", "_flags")
+    _fields = NEVRA._fields + __slots__
 
     def __init__(self, name, version, release, arch, epoch=0, summary=None,
                  vendor=None, buildhost=None, extras=[], extra_names=[],
@@ -131,22 +334,26 @@ class Package(dict):
         """
         :param name: Package name
         """
-        self["name"] = name
-        self["version"] = version
-        self["release"] = release
-        self["arch"] = arch
-        self["epoch"] = epoch
-        self["summary"] = summary
-        self["vendor"] = vendor
-        self["buildhost"] = buildhost
+        super(Package, self).__init__(name, version, release, arch, epoch,
+                                      **kwargs)
+        self.summary = intern_s(summary)
+        self.vendor = intern_s(vendor)
+        self.buildhost = intern_s(buildhost)
 
         d = inspect_origin(name, vendor, buildhost, extras, extra_names)
-        self.update(**d)
+        self.origin = intern_s(d["origin"])
+        self._flags = ((_FLAG_REBUILT if d["rebuilt"] else 0) |
+                       (_FLAG_REPLACED if d["replaced"] else 0))
 
-        for k, v in kwargs.items():
-            self[k] = v
+    def _get_flag(self, flag):
+        return bool(self._flags & flag)
 
-    def __str__(self):
-        return "({name}, {version}, {release}, {epoch}, {arch})" % self
+    def _set_flag(self, flag, val):
+        self._flags = (self._flags | flag) if val else (self._flags & ~flag)
+
+    rebuilt = property(lambda self: self._get_flag(_FLAG_REBUILT),
+                       lambda self, v: self._set_flag(_FLAG_REBUILT, v))
+    replaced = property(lambda self: self._get_flag(_FLAG_REPLACED),
+                        lambda self, v: self._set_flag(_FLAG_REPLACED, v))
 
 # vim:sw=4:ts=4:et:
@@ -10,6 +10,9 @@
 #
 import rpmkit.updateinfo.main as RUM
 import rpmkit.updateinfo.multihosts as RUMS
+import rpmkit.updateinfo.rpmlist
+import rpmkit.updateinfo.service as RUSV
+import rpmkit.utils as U
 import datetime
 import optparse
 import os.path
@@ -17,16 +20,25 @@ import os.path
 
 _TODAY = datetime.datetime.now().strftime("%F")
 _DEFAULTS = dict(path=None, workdir="/tmp/rk-updateinfo-{}".format(_TODAY),
-                 repos=[], multiproc=False, id=None,
+                 repos=[], multiproc=False, jobs=1, timeout=0, id=None,
                  score=0, keywords=RUM.ERRATA_KEYWORDS,
-                 rpms=RUM.CORE_RPMS, period='', cachedir=None, refdir=None,
-                 backend=RUM.DEFAULT_BACKEND, verbosity=0)
+                 rpms=RUM.CORE_RPMS, period=None, monthly=False,
+                 cachedir=None, refdir=None,
+                 backend=RUM.DEFAULT_BACKEND, verbosity=0,
+                 format=RUM.DEFAULT_FORMAT, details=True, trace_out=None,
+                 serve=None, queue_size=RUSV.DEFAULT_QUEUE_SIZE,
+                 cve_map=None, force=False, max_delta=0, readonly=True,
+                 cve_workers=1)
 _USAGE = """\
 %prog [Options...] ROOT
 
-    where ROOT = RPM DB root having var/lib/rpm from the target host or
-                 top dir to hold RPM DB roots of some hosts
-                 [multihosts mode]"""
+    where ROOT = RPM DB root having var/lib/rpm from the target host, dir
+                 having the list of installed RPMs, installed-rpms or
+                 rpm-qa.txt, e.g. extracted sosreport, instead [engine or
+                 repodata backend] or top dir to hold RPM DB roots or such
+                 dirs of some hosts
+                 [multihosts mode]
+       %prog [Options...] --serve ADDRESS -C CACHEDIR -r REPO [-r REPO ...]"""
 
 
 def option_parser(defaults=_DEFAULTS, usage=_USAGE, backends=RUM.BACKENDS):
@@ -42,10 +54,15 @@ def option_parser(defaults=_DEFAULTS, usage=_USAGE, backends=RUM.BACKENDS):
                       "RPM DBs automatically, and please not that any other "
                       "repos are disabled if this option was set.")
     p.add_option("-I", "--id", help="Data ID [None]")
-    # TODO: Disabled until issue of yum vs. multiprocessing module is fixed.
-    # p.add_option("-M", "--multiproc", action="store_true",
-    #             help="Specify this option if you want to analyze data "
-    #                  "in parallel (disabled currently)")
+    p.add_option("-M", "--multiproc", action="store_true",
+                 help="Analyze hosts in parallel with processes as many as "
+                      "CPUs [multihosts mode]. Same as --jobs=<# of CPUs>")
+    p.add_option("-j", "--jobs", type="int",
+                 help="Max number of hosts analyzed in parallel with worker "
+                      "processes [multihosts mode] [%default]")
+    p.add_option("-T", "--timeout", type="int",
+                 help="Timeout in seconds to analyze each host. 0 means no "
+                      "timeout [multihosts mode] [%default]")
     p.add_option("-B", "--backend", choices=backends.keys(),
                  help="Specify backend to get updates and errata. Choices: "
                       "%s [%%default]" % ', '.join(backends.keys()))
@@ -59,15 +76,63 @@ def option_parser(defaults=_DEFAULTS, usage=_USAGE, backends=RUM.BACKENDS):
                       "[%s]" % ', '.join(defaults["keywords"]))
     p.add_option('', "--rpm", dest="rpms", action="append",
                  help="RPM names to filter errata relevant to given RPMs")
-    p.add_option('', "--period",
+    p.add_option('', "--period", action="append",
                  help="Period to filter errata in format of "
                       "YYYY[-MM[-DD]][,YYYY[-MM[-DD]]], "
                       "ex. '2014-10-01,2014-12-31', '2014-01-01'. "
-                      "If end date is omitted, Today will be used instead")
+                      "If end date is omitted, Today will be used instead. "
+                      "You can specify this multiple times to analyze "
+                      "errata in each period")
+    p.add_option('', "--monthly", action="store_true",
+                 help="Split periods into months and analyze errata in "
+                      "each month, ex. --period 2014 --monthly")
     p.add_option("-C", "--cachedir",
                  help="Specify yum repo metadata cachedir [root/var/cache]")
     p.add_option("-R", "--refdir",
-                 help="Output 'delta' result compared to the data in this dir")
+                 help="Output 'delta' result compared to the data in this "
+                      "dir. Multiple dirs separated by comma may be given to "
+                      "compare with all of them, ex. '2014-10,2014-11'")
+    p.add_option("-F", "--format", choices=RUM.FORMATS,
+                 help="Output format of results. Choices: %s [%%default]. "
+                      "xlsx and csv are written row by row to save memory; "
+                      "xlsx requires xlsxwriter" % ', '.join(RUM.FORMATS))
+    p.add_option("", "--no-details", action="store_false", dest="details",
+                 help="Do not dump errata details, which is large")
+    p.add_option("", "--cve-workers", type="int",
+                 help="Number of threads to fetch CVSS metrics of CVEs "
+                      "of errata if --score > 0 [%default]")
+    p.add_option("", "--trace-out",
+                 help="Save wall time, CPU time and peak RSS of each phase "
+                      "of analysis (of each host) to this file in Chrome "
+                      "trace format, which chrome://tracing can load")
+    p.add_option("", "--force", action="store_true",
+                 help="Analyze all hosts even if their installed RPMs, repo "
+                      "metadata and options are not changed since the last "
+                      "run in the same workdir [multihosts mode]")
+    p.add_option("", "--no-chmod", action="store_false", dest="readonly",
+                 help="Do not drop write access perms of RPM DB files of "
+                      "hosts, e.g. to scan hosts on NFS faster "
+                      "[multihosts mode]")
+    p.add_option("", "--max-delta", type="int",
+                 help="Analyze only one host fully in each cluster of hosts "
+                      "of which installed RPMs differ by this number of "
+                      "RPMs at most and analyze others by differences from "
+                      "it, saved in %s. 0 means only hosts having exactly "
+                      "same RPMs are clustered. Backend must be engine or "
+                      "repodata "
+                      "[multihosts mode] [%%default]" % RUMS.DELTA_FILE)
+    p.add_option("", "--serve", metavar="ADDRESS",
+                 help="Run as a service keeps repo metadata loaded and "
+                      "analyzes hosts on requests at ADDRESS, "
+                      "'unix:<socket_path>' or '[<host>:]<port>'. Backend "
+                      "must be engine or repodata and --jobs is the max "
+                      "number of requests analyzed at the same time")
+    p.add_option("", "--queue-size", type="int",
+                 help="Max number of requests waiting to be analyzed "
+                      "[service mode] [%default]")
+    p.add_option("", "--cve-map",
+                 help="JSON file of CVE vs. CVSS data map, {cve: data}, "
+                      "to look up CVSS metrics of CVEs [service mode]")
     p.add_option("-v", "--verbose", action="count", dest="verbosity",
                  help="Verbose mode")
     p.add_option("-D", "--debug", action="store_const", dest="verbosity",
@@ -80,25 +145,46 @@ def main():
     p = option_parser()
     (options, args) = p.parse_args()
 
+    if options.serve:
+        assert options.cachedir, "Cache dir (-C) is needed in service mode"
+        RUM.set_loglevel(options.verbosity)
+        cmap = U.json_load(options.cve_map) if options.cve_map else None
+        svc = RUSV.Service(options.repos, options.cachedir, options.backend,
+                           options.score, options.keywords, options.rpms,
+                           cmap, max(options.jobs, 1), options.queue_size)
+        RUSV.serve(options.serve, svc)
+        return
+
+    if options.format == "xlsx" and RUM.xlsxwriter is None:
+        p.error("xlsxwriter is needed to output results in xlsx format")
+
     root = args[0] if args else raw_input("Host[s] data dir (root) > ")
     assert os.path.exists(root), "Not found RPM DB Root: %s" % root
 
-    period = options.period.split(',') if options.period else ()
+    period = [x.split(",") for x in options.period or []]
+    refdir = options.refdir.split(',') if options.refdir else None
 
-    if os.path.exists(os.path.join(root, "var/lib/rpm")):
+    if os.path.exists(os.path.join(root, "var/lib/rpm")) or \
+            rpmkit.updateinfo.rpmlist.find_rpm_list(root):
         RUM.main(root, options.workdir, options.repos, options.id,
                  options.score, options.keywords, options.rpms, period,
-                 options.cachedir, options.refdir, options.verbosity,
-                 options.backend)
+                 options.cachedir, refdir, options.verbosity,
+                 options.backend, fmt=options.format, details=options.details,
+                 monthly=options.monthly, trace_out=options.trace_out,
+                 workers=options.cve_workers)
     else:
-        # multihosts mode.
-        #
-        # TODO: multiproc mode is disabled and options.multiproc is not passed
-        # to RUMS.main until the issue of yum that its thread locks conflict w/
-        # multiprocessing module is fixed.
+        # multihosts mode. Backends are initialized in worker processes for
+        # each host to avoid conflicts of yum's thread locks and
+        # multiprocessing module.
         RUMS.main(root, options.workdir, options.repos, options.score,
                   options.keywords, options.rpms, period, options.cachedir,
-                  options.refdir, options.verbosity, options.backend)
+                  refdir, options.verbosity, options.multiproc,
+                  options.backend, fmt=options.format,
+                  details=options.details, jobs=options.jobs,
+                  timeout=options.timeout, monthly=options.monthly,
+                  trace_out=options.trace_out, force=options.force,
+                  max_delta=options.max_delta, readonly=options.readonly,
+                  workers=options.cve_workers)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,122 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Cluster hosts by similarity of their installed RPMs.
+
+Each host is compared only with representatives of clusters found so far
+which share some bands of the MinHash sketch of NEVRAs with it, and joins the
+cluster of the most similar one if they differ by `max_delta` NEVRAs at most,
+or becomes the representative of a new cluster.
+
+Sketches are made with one permutation hashing: hashes of NEVRAs are split
+into `size` bins and the minimum of each bin is taken, so that a NEVRA added
+or removed changes one bin at most. Sketches are split into `max_delta` + 1
+bands at least, so that sketches of hosts differ by `max_delta` NEVRAs at
+most share one band at least.
+
+>>> base = frozenset(("p%d" % i, "0", "1", "1", "x86_64") for i in range(50))
+>>> hosts = [("a", base), ("b", base | set([("q", "0", "1", "1", "noarch")])),
+...          ("c", frozenset(("r%d" % i, "0", "1", "1", "x86_64")
+...                          for i in range(50)))]
+>>> cluster(hosts, 2)
+[('a', None), ('b', 'a'), ('c', None)]
+"""
+from __future__ import absolute_import
+
+import collections
+import itertools
+import sys
+
+
+SKETCH_SIZE = 16
+BAND_SIZE = 4
+MAX_CANDIDATES = 4
+
+
+def sizes(max_delta, size=SKETCH_SIZE):
+    """
+    :param max_delta: Max number of NEVRAs differ between hosts in a cluster
+    :param size: Size of sketches at least
+    :return: A tuple of (size of sketches, size of bands) to split sketches
+        into `max_delta` + 1 bands at least
+
+    >>> sizes(3), sizes(11), sizes(0), sizes(20)
+    ((16, 4), (16, 1), (16, 16), (21, 1))
+    """
+    size = max(size, max_delta + 1)
+    return (size, size // (max_delta + 1))
+
+
+def sketch(nevras, size=SKETCH_SIZE):
+    """
+    :param nevras: A set of NEVRA tuples
+    :return: A list of the minimum hashes of `nevras` in each bin
+    """
+    mins = [sys.maxint] * size
+    for val in itertools.imap(hash, nevras):
+        idx = val % size
+        if val < mins[idx]:
+            mins[idx] = val
+
+    return mins
+
+
+def bands(hashes, bsize=BAND_SIZE):
+    """
+    :param hashes: A list of hashes, a sketch
+    :return: A list of (band_index, tuple of hashes in the band)
+
+    >>> bands([1, 2, 3, 4, 5], 2)
+    [(0, (1, 2)), (1, (3, 4)), (2, (5,))]
+    """
+    return [(i, tuple(hashes[i * bsize:(i + 1) * bsize])) for i
+            in range((len(hashes) + bsize - 1) // bsize)]
+
+
+def cluster(hosts, max_delta, size=SKETCH_SIZE, candidates=MAX_CANDIDATES):
+    """
+    :param hosts: A list of (host_id, a frozenset of NEVRAs of installed RPMs)
+    :param max_delta: Max number of NEVRAs differ between hosts in a cluster
+    :param size: Size of sketches of hosts at least, see :function:`sizes`
+    :param candidates: Number of representatives sharing the most bands
+        compared with each host, or more until one differs by `max_delta`
+        NEVRAs at most is found
+
+    :return: A list of (host_id, host_id of the representative of the cluster
+        the host belongs to or None if it's a representative)
+    """
+    (size, bsize) = sizes(max_delta, size)
+    reps = dict()
+    reps_by_band = collections.defaultdict(list)
+    res = []
+
+    for hid, nevras in hosts:
+        hbands = bands(sketch(nevras, size), bsize)
+        counts = collections.Counter(r for b in hbands
+                                     for r in reps_by_band.get(b, ()))
+        best = None
+        for idx, (rid, _count) in enumerate(counts.most_common()):
+            if idx >= candidates and best is not None:
+                break
+
+            rnevras = reps[rid]
+            if abs(len(rnevras) - len(nevras)) > max_delta:
+                continue
+
+            ndiff = len(nevras ^ rnevras)
+            if ndiff <= max_delta and (best is None or ndiff < best[1]):
+                best = (rid, ndiff)
+
+        if best is None:
+            reps[hid] = nevras
+            for band in hbands:
+                reps_by_band[band].append(hid)
+            res.append((hid, None))
+        else:
+            res.append((hid, best[0]))
+
+    return res
+
+# vim:sw=4:ts=4:et:
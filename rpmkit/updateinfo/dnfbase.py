@@ -11,17 +11,30 @@ import collections
 import dnf.conf
 import dnf
 import hawkey
-import itertools
 import logging
-import operator
+import optparse
 import os.path
+import sys
+import threading
+import time
 
 import rpmkit.updateinfo.base
+import rpmkit.updateinfo.repometa
+import rpmkit.updateinfo.trace
+import rpmkit.updateinfo.utils
+import rpmkit.rpmutils
 import rpmkit.utils
 
 
 LOG = logging.getLogger(__name__)
 
+# Max number of sets of errata converted from advisories kept in memory, one
+# for each revision of metadata of repos enabled.
+ERRATA_CACHE_SIZE = 4
+
+_ERRATA_CACHE = collections.OrderedDict()
+_ERRATA_CACHE_LOCK = threading.Lock()
+
 
 def _to_pkg(pkg, extras=[]):
     """
@@ -100,8 +113,8 @@ def _eref_to_pkg(eref):
     else:
         epoch = '0'
 
-    return dict(name=eref.name, arch=eref.arch, evr=eref.evr,
-                epoch=epoch, version=ver, release=rel)
+    return rpmkit.updateinfo.base.NEVRA(eref.name, ver, rel, eref.arch, epoch,
+                                        evr=eref.evr)
 
 
 def hadv_to_errata(hadv):
@@ -132,11 +145,18 @@ def hadv_to_errata(hadv):
     return errata
 
 
+def _evr_key(pkg):
+    """
+    :param pkg: A hawkey.Package object
+    """
+    return rpmkit.rpmutils.evr_key(pkg.epoch, pkg.v, pkg.r)
+
+
 class Base(rpmkit.updateinfo.base.Base):
     name = "rpmkit.updateinfo.dnfbase"
 
     def __init__(self, root='/', repos=[], disabled_repos=['*'],
-                 workdir=None, cacheonly=False, **kwargs):
+                 workdir=None, cacheonly=False, resolve=False, **kwargs):
         """
         Create and initialize dnf.Base or dnf.cli.cli.BaseCli object.
 
@@ -144,6 +164,9 @@ class Base(rpmkit.updateinfo.base.Base):
         :param repos: A list of repos to enable
         :param disabled_repos: A list of repos to disable
         :param workdir: Working dir to save logs and results
+        :param resolve: Resolve the transaction to upgrade all packages in
+            :meth:`prepare` if True. Updates and obsoletes are computed with
+            queries of the sack and it's not needed to list them.
 
         see also: :function:`dnf.automatic.main.main`
 
@@ -165,6 +188,7 @@ class Base(rpmkit.updateinfo.base.Base):
         self.base = dnf.Base(conf)
 
         self.cacheonly = cacheonly
+        self.resolve = resolve
         self._repo_md_ready = False
         self._hpackages = collections.defaultdict(list)
 
@@ -237,12 +261,31 @@ class Base(rpmkit.updateinfo.base.Base):
 
             # It will take some time to get metadata from remote repos.
             # see :method:`run` in :class:`dnf.cli.cli.Cli`.
-            self.base.fill_sack(load_system_repo='auto')
-            self.base.upgrade_all()
-            self.base.resolve()
+            with rpmkit.updateinfo.trace.phase("dnf_fill_sack"):
+                self.base.fill_sack(load_system_repo='auto')
+
+            if self.resolve:
+                with rpmkit.updateinfo.trace.phase("dnf_resolve"):
+                    self.base.upgrade_all()
+                    self.base.resolve()
 
             self._repo_md_ready = True
 
+    def list_resolved_upgrades(self):
+        """
+        List packages to upgrade installed ones in the transaction resolved.
+
+        :return: A list of hawkey.Package
+        """
+        if not self.resolve:
+            raise ValueError("Transaction is not resolved: "
+                             "Base was initialized with resolve=False")
+
+        self.prepare()
+        installed = set((p.name, p.arch) for p in self._list_dnf_installed())
+        return [p for p in self.base.transaction.install_set
+                if (p.name, p.arch) in installed]
+
     def list_installed_impl(self, **kwargs):
         """
         List installed packages.
@@ -260,18 +303,72 @@ class Base(rpmkit.updateinfo.base.Base):
 
         return self._packages["installed"]
 
-    def list_errata_impl(self, **kwargs):
+    def _list_dnf_advisories(self):
+        """
+        List advisories of updates of the installed packages.
+
+        Advisories newer than the oldest one of the installed packages of the
+        same name and arch, e.g. kernel, include the ones newer than the
+        others, so that advisories are queried only once for each name and
+        arch and deduplicated by IDs.
+
+        :return: A list of _hawkey.Advisory objects
+        """
+        if not self._hpackages["errata"]:
+            oldests = collections.OrderedDict()
+            for pkg in self._list_dnf_installed():
+                key = (pkg.name, pkg.arch)
+                other = oldests.get(key)
+                if other is None or _evr_key(pkg) < _evr_key(other):
+                    oldests[key] = pkg
+
+            advs = collections.OrderedDict()
+            for pkg in oldests.values():
+                for adv in pkg.get_advisories(hawkey.GT):
+                    advs.setdefault(adv.id, adv)
+
+            self._hpackages["errata"] = advs.values()
+
+        return self._hpackages["errata"]
+
+    def _repos_revision(self):
+        """
+        :return: A str identifies the revision of metadata of repos enabled,
+            or None if it's not known
+        """
+        return rpmkit.updateinfo.repometa.repodirs_digest(
+            (repo.id, repo.cachedir) for repo in
+            self.base.repos.iter_enabled())
+
+    def list_errata_impl(self, cache_size=ERRATA_CACHE_SIZE, **kwargs):
         """
         List errata.
+
+        Errata converted from advisories are cached for each revision of
+        metadata of repos enabled and shared with the other hosts analyzed
+        in the same process, and each host gets copies of them.
+
+        :param cache_size: Max number of sets of errata cached
         """
         self.prepare()
-        if not self._hpackages["errata"]:
-            ips = self._list_dnf_installed()
-            advs = itertools.chain(*(pkg.get_advisories(hawkey.GT) for pkg
-                                     in ips))
-            advs = rpmkit.utils.uniq(advs, key=operator.attrgetter("id"))
-            self._hpackages["errata"] = advs
-            self._packages["errata"] = [hadv_to_errata(a) for a in advs]
+        if not self._packages["errata"]:
+            advs = self._list_dnf_advisories()
+            rev = self._repos_revision()
+
+            with _ERRATA_CACHE_LOCK:
+                cache = _ERRATA_CACHE.pop(rev, None) or dict()
+                if rev is not None:
+                    _ERRATA_CACHE[rev] = cache
+                    while len(_ERRATA_CACHE) > cache_size:
+                        _ERRATA_CACHE.popitem(last=False)
+
+                for adv in advs:
+                    if adv.id not in cache:
+                        cache[adv.id] = hadv_to_errata(adv)
+
+                errata = [dict(cache[adv.id]) for adv in advs]
+
+            self._packages["errata"] = errata
 
         return self._packages["errata"]
 
@@ -289,4 +386,56 @@ class Base(rpmkit.updateinfo.base.Base):
 
         return self._packages["updates"]  # obosletes in updates.
 
+
+def _nevra(pkg):
+    return (pkg.name, pkg.epoch, pkg.v, pkg.r, pkg.arch)
+
+
+def compare_modes(root='/', repos=[], **kwargs):
+    """
+    List updates with and without resolving the transaction, and compare the
+    time taken and the updates listed with the ones in the transaction.
+
+    :param root: RPM DB root dir
+    :param repos: A list of repos to enable
+    :param kwargs: Extra keyword arguments passed to :class:`Base`
+
+    :return: A dict of the time in seconds to list updates in each mode, the
+        number of updates and lists of NEVRAs of updates not found in the
+        transaction ("not_resolved", e.g. blocked by dependency problems)
+        and packages in the transaction not found in updates ("missing")
+    """
+    res = dict()
+    for resolve in (False, True):
+        base = Base(root, repos, resolve=resolve, **kwargs)
+        start = time.time()
+        base.list_updates()
+        res["resolve" if resolve else "fast"] = time.time() - start
+
+    updates = set(_nevra(p) for p in base._list_dnf_upgrades())
+    resolved = set(_nevra(p) for p in base.list_resolved_upgrades())
+    res["updates"] = len(updates)
+    res["not_resolved"] = sorted(updates - resolved)
+    res["missing"] = sorted(resolved - updates)
+
+    return res
+
+
+def main(argv=sys.argv[1:]):
+    p = optparse.OptionParser("%prog [Options...] [ROOT]")
+    p.set_defaults(repos=[])
+    p.add_option("-r", "--repo", dest="repos", action="append",
+                 help="Repo to enable. It can be given multiple times")
+    (options, args) = p.parse_args(argv)
+
+    res = compare_modes(args[0] if args else '/', options.repos)
+    print(rpmkit.utils.json_dumps(res, indent=2))
+
+    if res["missing"]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
+
 # vim:sw=4:ts=4:et:
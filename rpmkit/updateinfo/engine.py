@@ -0,0 +1,353 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Pure python errata applicability engine without yum nor dnf.
+
+Applicable errata and update RPMs of a host are computed by joining the list
+of installed RPMs against an index made from repo metadata, which maps
+(name, arch) of packages to EVR keys sorted and indexes of errata. The index
+is made only once for each set of repos and shared among hosts, so that
+analyzing a host only needs to read its RPM DB and look up the index with
+bisect for each installed RPM.
+
+Obsoletes are not taken into account, unlike yum and dnf.
+"""
+from __future__ import absolute_import
+
+import bisect
+import collections
+import logging
+import threading
+
+import rpmkit.updateinfo.base
+import rpmkit.updateinfo.repometa
+import rpmkit.updateinfo.rpmlist
+import rpmkit.updateinfo.trace
+import rpmkit.rpmutils
+from rpmkit.globals import _
+
+
+LOG = logging.getLogger(__name__)
+
+INSTALLED_TAGS = ("name", "version", "release", "arch", "epoch", "summary",
+                  "vendor", "buildhost")
+
+_INDEXES = dict()
+_INDEXES_LOCK = threading.Lock()
+
+
+class Index(object):
+    """
+    Index to look up errata and update RPMs applicable to installed RPMs.
+    Do not modify its data.
+
+    - errata: A tuple of errata dicts
+    - errata_by_na: A dict :: {(name, arch): (evr_keys, errata_indexes)} where
+      evr_keys is a sorted tuple of EVR keys of packages in errata and
+      errata_indexes is a tuple of the indexes of errata of these packages
+    - latest: A dict :: {(name, arch): (evr_key, nevra)} of the latest
+      packages in repos
+    - nevras: A frozenset of (name, epoch, version, release, arch) of
+      packages in repos
+    - epochs: A dict :: {(name, version, release, arch): epoch} of packages
+      in repos
+    """
+    __slots__ = ("errata", "errata_by_na", "latest", "nevras", "epochs")
+
+    def __init__(self, rmd):
+        """
+        :param rmd: A rpmkit.updateinfo.repometa.RepoMetadata object
+        """
+        self.errata = rmd.errata
+        self.nevras = frozenset(nevra for nevras in rmd.packages.values()
+                                for nevra in nevras)
+        self.epochs = dict(((n, v, r, a), e) for n, e, v, r, a
+                           in self.nevras)
+
+        self.latest = dict()
+        for na, nevras in rmd.packages.items():
+            self.latest[na] = max((evr_key(*nevra[1:4]), nevra) for nevra
+                                  in nevras)
+
+        self.errata_by_na = dict()
+        for na, pkgs in rmd.errata_by_na.items():
+            ents = sorted((evr_key(e, v, r), idx) for e, v, r, idx in pkgs)
+            self.errata_by_na[na] = (tuple(k for k, _idx in ents),
+                                     tuple(idx for _k, idx in ents))
+
+    def __repr__(self):
+        return ("<Index: %d errata, %d package names>" %
+                (len(self.errata), len(self.latest)))
+
+
+_EVR_KEYS = dict()
+
+
+def evr_key(epoch, version, release, _cache=_EVR_KEYS):
+    """
+    Cached version of :function:`rpmkit.rpmutils.evr_key` as same EVRs are
+    looked up many times among hosts.
+
+    >>> evr_key(0, "1.0", "1") is evr_key(0, "1.0", "1")
+    True
+    """
+    key = _cache.get((epoch, version, release))
+    if key is None:
+        key = _cache[(epoch, version, release)] = \
+            rpmkit.rpmutils.evr_key(epoch, version, release)
+
+    return key
+
+
+def get_index(rmd):
+    """
+    Make an index from repo metadata or get it made already in this process.
+
+    :param rmd: A rpmkit.updateinfo.repometa.RepoMetadata object
+    :return: An Index object
+    """
+    with _INDEXES_LOCK:
+        # Keep rmd with the index to make its id never reused.
+        (_rmd, index) = _INDEXES.get(id(rmd), (None, None))
+        if index is None:
+            with rpmkit.updateinfo.trace.phase("make_index"):
+                index = Index(rmd)
+            _INDEXES[id(rmd)] = (rmd, index)
+            LOG.info(_("Made the index: %r"), index)
+
+    return index
+
+
+def _nevra_values(pkg):
+    """
+    :param pkg: A dict or a tuple of (name, epoch, version, release, arch)
+    :return: A tuple of (name, epoch, version, release, arch)
+    """
+    if isinstance(pkg, collections.Mapping):
+        return (pkg["name"], pkg["epoch"], pkg["version"], pkg["release"],
+                pkg["arch"])
+
+    return pkg
+
+
+def applicable(installed, index):
+    """
+    Join the list of installed RPMs against the index.
+
+    :param installed: A list of dicts or tuples of (name, epoch, version,
+        release, arch) of installed RPMs
+    :param index: An Index object
+
+    :return: A tuple of (a list of applicable errata, a list of NEVRA tuples
+        of the latest update RPMs)
+    """
+    idxs = set()
+    updates = []
+    for pkg in installed:
+        (name, epoch, ver, rel, arch) = _nevra_values(pkg)
+        key = evr_key(epoch, ver, rel)
+        ents = index.errata_by_na.get((name, arch))
+        if ents is not None:
+            (keys, eidxs) = ents
+            idxs.update(eidxs[bisect.bisect_right(keys, key):])
+
+        latest = index.latest.get((name, arch))
+        if latest is not None and latest[0] > key:
+            updates.append(latest[1])
+
+    return ([index.errata[i] for i in sorted(idxs)], updates)
+
+
+def applicable_by_na(installed, index):
+    """
+    Same as :function:`applicable` but keep results for each (name, arch) of
+    installed RPMs, so that results of other hosts having similar installed
+    RPMs can be computed from them, see :function:`applicable_delta`.
+
+    :param installed: A list of dicts or tuples of (name, epoch, version,
+        release, arch) of installed RPMs
+    :param index: An Index object
+
+    :return: A dict :: {(name, arch): (a frozenset of indexes of applicable
+        errata, NEVRA tuple of the latest update RPM or None)} of installed
+        RPMs having any applicable errata or update RPMs
+    """
+    res = dict()
+    for pkg in installed:
+        (name, epoch, ver, rel, arch) = _nevra_values(pkg)
+        key = evr_key(epoch, ver, rel)
+
+        eidxs = ()
+        ents = index.errata_by_na.get((name, arch))
+        if ents is not None:
+            (keys, idxs) = ents
+            eidxs = idxs[bisect.bisect_right(keys, key):]
+
+        update = None
+        latest = index.latest.get((name, arch))
+        if latest is not None and latest[0] > key:
+            update = latest[1]
+
+        if eidxs or update:
+            # Some RPMs of same (name, arch) may be installed, e.g. kernel.
+            (pidxs, pupdate) = res.get((name, arch), (frozenset(), None))
+            res[(name, arch)] = (pidxs.union(eidxs), update or pupdate)
+
+    return res
+
+
+def applicable_delta(installed, diffs, other, index):
+    """
+    Compute applicable errata and update RPMs of a host from the ones of other
+    host having similar installed RPMs, by looking up the index only for
+    (name, arch) of RPMs differ between them.
+
+    :param installed: A set of NEVRA tuples of installed RPMs of the host
+    :param diffs: NEVRA tuples installed only in either of the host or the
+        other host
+    :param other: The result of :function:`applicable_by_na` of the other
+    :param index: An Index object
+
+    :return: Same as :function:`applicable` but the list of update RPMs has
+        no duplicates
+    """
+    nas = set((n, a) for n, _e, _v, _r, a in diffs)
+    res = dict((na, ent) for na, ent in other.items() if na not in nas)
+    res.update(applicable_by_na((p for p in installed if (p[0], p[4]) in nas),
+                                index))
+
+    idxs = set()
+    for eidxs, _update in res.values():
+        idxs.update(eidxs)
+
+    return ([index.errata[i] for i in sorted(idxs)],
+            [u for _eidxs, u in res.values() if u is not None])
+
+
+def _nevra(pkg):
+    """
+    >>> _nevra(dict(name="bash", epoch=None, version="4.1.2",
+    ...             release="15.el6_5.1", arch="x86_64"))
+    ('bash', '0', '4.1.2', '15.el6_5.1', 'x86_64')
+    """
+    return (pkg["name"], str(pkg["epoch"] or 0), pkg["version"],
+            pkg["release"], pkg["arch"])
+
+
+def complement_epochs(pkgs, index):
+    """
+    Complement epochs of installed RPMs not known, e.g. RPMs in lists of
+    installed RPMs without epochs, with the ones of same RPMs in repos, or of
+    the latest RPMs of same name and arch in repos if not found. Otherwise
+    RPMs having non-zero epochs are regarded as older ones.
+
+    :param pkgs: A list of dicts of installed RPMs
+    :param index: An Index object
+    :return: `pkgs` of which epochs are complemented
+    """
+    for pkg in pkgs:
+        if pkg["epoch"] is not None:
+            continue
+
+        (name, arch) = (pkg["name"], pkg["arch"])
+        epoch = index.epochs.get((name, pkg["version"], pkg["release"],
+                                  arch))
+        if epoch is None:
+            latest = index.latest.get((name, arch))
+            epoch = latest[1][1] if latest is not None else 0
+
+        pkg["epoch"] = int(epoch)
+
+    return pkgs
+
+
+def make_packages(pkgs, index):
+    """
+    :param pkgs: A list of dicts of installed RPMs, see `INSTALLED_TAGS`
+    :param index: An Index object
+
+    :return: A list of rpmkit.updateinfo.base.Package objects of which origins
+        are inspected with RPMs not in repos
+    """
+    extra_names = set(p["name"] for p in pkgs if _nevra(p) not in
+                      index.nevras)
+    return [rpmkit.updateinfo.base.Package(extra_names=extra_names, **p)
+            for p in pkgs]
+
+
+class Base(rpmkit.updateinfo.base.Base):
+    name = "rpmkit.updateinfo.engine"
+    uses_repometa = True
+
+    def __init__(self, root='/', repos=[], disabled_repos=['*'], **kwargs):
+        """
+        :param root: RPM DB root dir
+        :param repos: A list of repos to get metadata of
+        :param disabled_repos: Not used, kept for compatibility
+        """
+        super(Base, self).__init__(root, repos, disabled_repos, **kwargs)
+        self._index = None
+
+    def index(self):
+        if self._index is None:
+            rmd = rpmkit.updateinfo.repometa.load(self.repos, self._cachedir)
+            self._index = get_index(rmd)
+
+        return self._index
+
+    def list_installed_impl(self, **kwargs):
+        """
+        List installed packages read from RPM DB directly, or from the list
+        of installed RPMs if the host has no RPM DB, see
+        :mod:`rpmkit.updateinfo.rpmlist`. Epochs of RPMs not in the list are
+        taken from repo metadata, see :function:`complement_epochs`.
+        """
+        if not self._packages["installed"]:
+            index = self.index()
+            rlist = rpmkit.updateinfo.rpmlist.find_rpm_list(self.root)
+            if rlist is None:
+                pkgs = [dict(zip(INSTALLED_TAGS, vals)) for vals in
+                        rpmkit.rpmutils.rpmdb_tag_values_g(self.root,
+                                                           INSTALLED_TAGS)]
+                ips = make_packages(pkgs, index)
+            else:
+                pkgs = rpmkit.updateinfo.rpmlist.load(rlist)
+                ips = make_packages(complement_epochs(pkgs, index), index)
+                for ipkg in ips:
+                    ipkg["replaced"] = False  # Vendors are not known.
+
+            self._packages["installed"] = ips
+
+        return self._packages["installed"]
+
+    def _list_applicables(self):
+        ips = [_nevra(p) for p in self.list_installed()]
+        (errata, updates) = applicable(ips, self.index())
+
+        # Copy errata shared among hosts as host specific data is added.
+        self._packages["errata"] = [dict(e) for e in errata]
+        self._packages["updates"] = \
+            [rpmkit.updateinfo.base.NEVRA(n, v, r, a, e) for n, e, v, r, a
+             in updates]
+
+    def list_errata_impl(self, **kwargs):
+        """
+        List applicable errata.
+        """
+        if not self._packages["errata"]:
+            self._list_applicables()
+
+        return self._packages["errata"]
+
+    def list_updates_impl(self, **kwargs):
+        """
+        List the latest update RPMs.
+        """
+        if not self._packages["updates"]:
+            self._list_applicables()
+
+        return self._packages["updates"]
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,107 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Fingerprints of hosts to skip analysis of hosts not changed since the last
+run.
+
+A fingerprint of a host is a digest of the sorted NEVRAs of its installed
+RPMs, repomd.xml of the repos enabled, which has the revision and checksums
+of metadata, and parameters of the analysis. Fingerprints of hosts analyzed
+are saved in an index in the working dir and results of hosts of which
+fingerprints match the ones saved are reused in the next run.
+
+Repo metadata in the cache dir is not refreshed to compute fingerprints, so
+it should be synced before runs, e.g. with 'yum makecache' or reposync, to
+find updates.
+"""
+from __future__ import absolute_import
+
+import hashlib
+import logging
+import os.path
+import os
+import tempfile
+
+import rpmkit.updateinfo.repodata
+import rpmkit.updateinfo.repometa
+import rpmkit.utils as U
+from rpmkit.globals import _
+
+
+LOG = logging.getLogger(__name__)
+
+INDEX_FILE = "fingerprints.json"
+
+
+def repos_digest(repos, cachedir):
+    """
+    :param repos: A list of repo IDs or dirs
+    :param cachedir: Cache dir holding metadata of repos
+    :return: Digest of repomd.xml of `repos` or None if any of them are not
+        found in `cachedir`
+
+    >>> repos_digest(["not-exist"], "/tmp") is None
+    True
+    """
+    rdirs = ((repo, rpmkit.updateinfo.repometa.find_repo_dir(cachedir,
+                                                             repo) or
+              rpmkit.updateinfo.repodata.find_repodir(repo, cachedir))
+             for repo in repos)
+    return rpmkit.updateinfo.repometa.repodirs_digest(rdirs)
+
+
+def fingerprint(installed_key, repos, cachedir, params=()):
+    """
+    :param installed_key: A str identifies the set of installed RPMs
+    :param repos: A list of repo IDs or dirs enabled
+    :param cachedir: Cache dir holding metadata of repos
+    :param params: Parameters of analysis which repr() is stable
+
+    :return: A str of the fingerprint, or None if metadata of repos are not
+        found and the host should be analyzed always
+    """
+    rdigest = repos_digest(repos, cachedir)
+    if rdigest is None:
+        return None
+
+    return hashlib.sha1('\0'.join((installed_key, rdigest,
+                                   repr(params)))).hexdigest()
+
+
+def index_path(workdir, filename=INDEX_FILE):
+    return os.path.join(workdir, filename)
+
+
+def load_index(workdir):
+    """
+    :param workdir: Working dir to hold the index
+    :return: A dict :: {host_id: fingerprint} saved in the last run
+    """
+    path = index_path(workdir)
+    if not os.path.exists(path):
+        return dict()
+
+    try:
+        return U.json_load(path)["fingerprints"]
+    except (IOError, ValueError, KeyError) as exc:
+        LOG.warn(_("Could not load the fingerprints %s: %s"), path, str(exc))
+        return dict()
+
+
+def save_index(workdir, fingerprints):
+    """
+    :param workdir: Working dir to hold the index
+    :param fingerprints: A dict :: {host_id: fingerprint}
+    """
+    path = index_path(workdir)
+    (fd, tmp) = tempfile.mkstemp(dir=workdir)
+    with os.fdopen(fd, 'w') as out:
+        out.write(U.json_dumps(dict(fingerprints=fingerprints)))
+    os.chmod(tmp, 0o644)
+    os.rename(tmp, path)
+    LOG.debug(_("Saved fingerprints of %d hosts: %s"), len(fingerprints),
+              path)
+
+# vim:sw=4:ts=4:et:
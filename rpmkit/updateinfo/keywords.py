@@ -0,0 +1,259 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Match keywords against errata descriptions.
+
+All keywords of a set are compiled into one regex of a trie of them and
+searched in a pass over each description, instead of searching each keyword
+one by one.
+Keywords found in each errata are cached by its advisory for each keyword
+set, and the cache may be saved and loaded to share it among runs. Keywords
+newly found in worker processes may be taken and passed to the parent process
+to save them at once.
+
+>>> matcher = get_matcher(["crash", "panic", "hang", "kernel panic"])
+>>> matcher.match(dict(advisory="RHBA-2014:0001",
+...                    description="kernel panic and hang"))
+['panic', 'hang', 'kernel panic']
+>>> matcher.match(dict(advisory="RHBA-2014:0002", description="typo"))
+[]
+"""
+from __future__ import absolute_import
+
+import hashlib
+import logging
+import os.path
+import os
+import re
+import tempfile
+import threading
+
+import rpmkit.utils as U
+from rpmkit.globals import _
+
+
+LOG = logging.getLogger(__name__)
+
+CACHE_FILE = "rpmkit-keywords.json"
+
+_MATCHERS = dict()
+_MATCHERS_LOCK = threading.Lock()
+
+# Keywords found in errata :: {keywords_hash: {advisory: [keyword]}}
+_HITS = dict()
+_NEW_HITS = dict()
+_STATE = dict(dirty=False, loaded=set())
+
+
+def keywords_hash(keywords):
+    """
+    :param keywords: A list of keywords
+    :return: Digest of the set of `keywords`
+
+    >>> keywords_hash(["a", "b"]) == keywords_hash(["b", "a", "a"])
+    True
+    """
+    data = '\n'.join(sorted(set(keywords)))
+    if isinstance(data, unicode):
+        data = data.encode("utf-8")
+
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+def _trie_regex(keywords):
+    """
+    :param keywords: A list of keywords
+    :return: Regex pattern string matches the longest keyword at a position
+
+    >>> _trie_regex(["hang", "hard", "ha"])
+    'ha(?:(?:ng|rd))?'
+    """
+    trie = dict()
+    for kwd in keywords:
+        node = trie
+        for char in kwd:
+            node = node.setdefault(char, dict())
+        node[''] = None  # End of keyword.
+
+    def _regex(node):
+        alts = [re.escape(c) + _regex(n) for c, n in sorted(node.items())
+                if c]
+        if not alts:
+            return ''
+
+        pat = alts[0] if len(alts) == 1 else "(?:%s)" % '|'.join(alts)
+        return "(?:%s)?" % pat if '' in node else pat
+
+    return _regex(trie)
+
+
+def _overlaps(kwd, other):
+    """
+    :return: True if some suffix of `kwd` is a prefix of `other`
+
+    >>> _overlaps("hang", "ngx"), _overlaps("hang", "kernel")
+    (True, False)
+    """
+    return any(kwd.endswith(other[:i]) for i in range(1, len(other)))
+
+
+class KeywordMatcher(object):
+
+    def __init__(self, keywords):
+        """
+        :param keywords: A list of keywords
+        """
+        self.keywords = list(keywords)
+        self.digest = keywords_hash(self.keywords)
+        self.hits = _HITS.setdefault(self.digest, dict())
+        self._order = dict((k, i) for i, k in enumerate(self.keywords))
+
+        # The longest keyword is matched at each position, so keywords
+        # contained in it are found with it and keywords may overlap with it
+        # are checked additionally.
+        kws = set(self.keywords)
+        self._regex = re.compile(_trie_regex(kws)) if kws else None
+        self._subs = dict((k, [s for s in kws if s in k]) for k in kws)
+        self._overlaps = dict((k, [o for o in kws if o not in k and
+                                   _overlaps(k, o)]) for k in kws)
+
+    def search(self, text):
+        """
+        :param text: A string to search keywords in
+        :return: A list of keywords found in `text`, in the order of keywords
+        """
+        if self._regex is None:
+            return []
+
+        found = set()
+        matched = set(self._regex.findall(text))
+        for kwd in matched:
+            found.update(self._subs[kwd])
+
+        for kwd in matched:
+            found.update(o for o in self._overlaps[kwd] if o not in found and
+                         o in text)
+
+        return [k for k in self.keywords if k in found]
+
+    def match(self, errata):
+        """
+        :param errata: A dict represents errata
+        :return: A list of keywords found in the description of `errata`
+        """
+        adv = errata.get("advisory")
+        hits = self.hits.get(adv)
+        if hits is None:
+            hits = self.search(errata["description"])
+            if adv is not None:
+                self.hits[adv] = hits
+                _NEW_HITS.setdefault(self.digest, dict())[adv] = hits
+                _STATE["dirty"] = True
+
+        # Cached hits may be found with same keywords in other order.
+        return sorted(hits, key=self._order.get)
+
+
+def get_matcher(keywords):
+    """
+    :param keywords: A list of keywords
+    :return: A KeywordMatcher object made only once for each keyword list
+    """
+    key = tuple(keywords)
+    with _MATCHERS_LOCK:
+        matcher = _MATCHERS.get(key)
+        if matcher is None:
+            matcher = _MATCHERS[key] = KeywordMatcher(keywords)
+
+    return matcher
+
+
+def take_new_hits():
+    """
+    Remove keywords found in errata since the last call and return them, e.g.
+    to pass keywords found in a worker process to the parent process.
+
+    :return: A dict :: {keywords_hash: {advisory: [keyword]}}
+    """
+    with _MATCHERS_LOCK:
+        hits = dict(_NEW_HITS)
+        _NEW_HITS.clear()
+
+    return hits
+
+
+def add_hits(hits):
+    """
+    :param hits: A dict :: {keywords_hash: {advisory: [keyword]}} of keywords
+        found in other processes
+    """
+    if not hits:
+        return
+
+    with _MATCHERS_LOCK:
+        for digest, dhits in hits.items():
+            _HITS.setdefault(digest, dict()).update(dhits)
+        _STATE["dirty"] = True
+
+
+def load_cache(path):
+    """
+    Load keywords found in errata and saved previously. It's loaded only once
+    in a process.
+
+    :param path: Cache file path
+    """
+    if path in _STATE["loaded"] or not os.path.exists(path):
+        return
+
+    try:
+        data = U.json_load(path)
+    except (IOError, ValueError) as exc:
+        LOG.warn(_("Could not load the keywords cache %s: %s"), path,
+                 str(exc))
+        return
+
+    with _MATCHERS_LOCK:
+        for digest, hits in data.items():
+            cache = _HITS.setdefault(digest, dict())
+            for adv, kwds in hits.items():
+                cache.setdefault(adv, kwds)
+
+        _STATE["loaded"].add(path)
+
+
+def save_cache(path):
+    """
+    Save keywords found in errata, merged with the ones saved by others, if
+    new keywords were found since it's saved last time.
+
+    :param path: Cache file path
+    """
+    if not _STATE["dirty"]:
+        return
+
+    try:
+        data = U.json_load(path) if os.path.exists(path) else dict()
+    except (IOError, ValueError):
+        data = dict()  # Broken and overwritten.
+
+    with _MATCHERS_LOCK:
+        for digest, hits in _HITS.items():
+            data.setdefault(digest, dict()).update(hits)
+        _STATE["dirty"] = False
+
+    # Other processes may save it at the same time.
+    try:
+        (fd, tmp) = tempfile.mkstemp(dir=os.path.dirname(path) or os.curdir)
+        with os.fdopen(fd, 'w') as out:
+            out.write(U.json_dumps(data))
+        os.chmod(tmp, 0o644)
+        os.rename(tmp, path)
+        LOG.debug(_("Saved the keywords cache: %s"), path)
+    except (IOError, OSError) as exc:
+        LOG.warn(_("Could not save the keywords cache %s: %s"), path,
+                 str(exc))
+
+# vim:sw=4:ts=4:et:
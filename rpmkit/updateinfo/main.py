@@ -13,6 +13,13 @@ from operator import itemgetter
 
 import rpmkit.updateinfo.yumbase
 import rpmkit.updateinfo.dnfbase
+import rpmkit.updateinfo.engine
+import rpmkit.updateinfo.keywords
+import rpmkit.updateinfo.repodata
+import rpmkit.updateinfo.rpmlist
+import rpmkit.updateinfo.snapshot
+import rpmkit.updateinfo.store
+import rpmkit.updateinfo.trace
 import rpmkit.updateinfo.utils
 import rpmkit.memoize
 import rpmkit.rpmutils
@@ -21,18 +28,26 @@ import rpmkit.swapi
 
 # It looks available in EPEL for RHELs:
 #   https://apps.fedoraproject.org/packages/python-bunch
+import bisect
 import bunch
 import calendar
 import collections
+import csv
 import datetime
 import functools
 import itertools
 import logging
+import multiprocessing.pool
 import os
 import os.path
 import re
 import tablib
 
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
 if os.environ.get("RPMKIT_MEMORY_DEBUG", False):
     try:
         from memory_profiler import profile
@@ -54,7 +69,9 @@ _ERRATA_LIST_FILE = "errata.json"
 _UPDATES_LIST_FILE = "updates.json"
 
 BACKENDS = dict(yum=rpmkit.updateinfo.yumbase.Base,
-                dnf=rpmkit.updateinfo.dnfbase.Base)
+                dnf=rpmkit.updateinfo.dnfbase.Base,
+                engine=rpmkit.updateinfo.engine.Base,
+                repodata=rpmkit.updateinfo.repodata.Base)
 DEFAULT_BACKEND = BACKENDS["yum"]
 
 NEVRA_KEYS = ["name", "epoch", "version", "release", "arch"]
@@ -64,6 +81,12 @@ ERRATA_KEYWORDS = ["crash", "panic", "hang", "SEGV", "segmentation fault",
                    "data corruption"]
 CORE_RPMS = ["kernel", "glibc", "bash", "openssl", "zlib"]
 
+# Output formats of results: xls (default, made in memory w/ tablib),
+# xlsx (streaming, requires xlsxwriter) and csv (streaming, a CSV file per
+# sheet).
+FORMATS = ("xls", "xlsx", "csv")
+DEFAULT_FORMAT = "xls"
+
 
 def set_loglevel(verbosity=0, backend=False):
     """
@@ -118,7 +141,7 @@ def mk_cve_vs_cvss_map():
                 rpmkit.swapi.call("swapi.cve.getAll") if c)
 
 
-def fetch_cve_details(cve, cve_cvss_map={}):
+def fetch_cve_details(cve, cve_cvss_map=None):
     """
     :param cve: A dict represents CVE :: {id:, url:, ...}
     :param cve_cvss_map: A dict :: {cve: cve_and_cvss_data}
@@ -126,7 +149,7 @@ def fetch_cve_details(cve, cve_cvss_map={}):
     :return: A dict represents CVE and its CVSS metrics
     """
     cveid = cve.get("id", cve.get("cve"))
-    dcve = cve_cvss_map.get(cveid)
+    dcve = (cve_cvss_map or {}).get(cveid)
     if dcve:
         cve.update(**dcve)
         return cve
@@ -147,6 +170,63 @@ def fetch_cve_details(cve, cve_cvss_map={}):
     return cve
 
 
+def _cve_id(cve):
+    """
+    >>> _cve_id(dict(id="CVE-2014-0001", cve="CVE-2014-0001"))
+    'CVE-2014-0001'
+    >>> _cve_id(dict(cve="CVE-2014-0002"))
+    'CVE-2014-0002'
+    """
+    return cve.get("id", cve.get("cve"))
+
+
+def complement_cves(errata, cve_cvss_map=None, workers=1):
+    """
+    Complement CVE data of errata with their CVSS metrics. Each unique CVE is
+    looked up only once and the resulting CVE dict is shared among errata.
+
+    :param errata: A list of errata
+    :param cve_cvss_map: A dict :: {cve: cve_and_cvss_data} to look up CVEs
+        before querying them
+    :param workers: Number of threads to fetch the CVEs not in `cve_cvss_map`
+
+    :return: `errata` with CVE data complemented
+
+    >>> es = [dict(cves=[dict(id="CVE-2014-0001", url="http://a/"),
+    ...                  dict(id="CVE-2014-0002", url="http://b/")]),
+    ...       dict(cves=[dict(id="CVE-2014-0001", url="http://a/")])]
+    >>> cmap = {"CVE-2014-0001": dict(cve="CVE-2014-0001", score="5.0"),
+    ...         "CVE-2014-0002": dict(cve="CVE-2014-0002", score="2.0")}
+    >>> es = complement_cves(es, cmap)
+    >>> es[0]["cves"][0] is es[1]["cves"][0]
+    True
+    >>> [c["score"] for c in es[0]["cves"]]
+    ['5.0', '2.0']
+    """
+    cves = collections.OrderedDict()
+    for e in errata:
+        for cve in e.get("cves", []):
+            cves.setdefault(_cve_id(cve), cve)
+
+    LOG.debug(_("Complement %d unique CVEs of %d errata"), len(cves),
+              len(errata))
+    fetch = functools.partial(fetch_cve_details, cve_cvss_map=cve_cvss_map)
+    if workers > 1 and len(cves) > 1:
+        pool = multiprocessing.pool.ThreadPool(workers)
+        try:
+            dcves = pool.map(fetch, cves.values())
+        finally:
+            pool.close()
+    else:
+        dcves = [fetch(cve) for cve in cves.values()]
+
+    dcves = dict(zip(cves.keys(), dcves))
+    for e in errata:
+        e["cves"] = [dcves[_cve_id(cve)] for cve in e.get("cves", [])]
+
+    return errata
+
+
 def _fmt_cve(cve):
     if 'score' in cve:
         return '%(cve)s (score=%(score)s, metrics=%(metrics)s, url=%(url)s)'
@@ -206,35 +286,6 @@ def _make_cell_data(x, key, default="N/A"):
         return ", ".join(v) if isinstance(v, (list, tuple)) else v
 
 
-def make_dataset(list_data, title=None, headers=[], lheaders=[]):
-    """
-    :param list_data: List of data
-    :param title: Dataset title to be used as worksheet's name
-    :param headers: Dataset headers to be used as column headers, etc.
-    :param lheaders: Localized version of `headers`
-    """
-    dataset = tablib.Dataset()
-
-    # TODO: Check title as valid worksheet name, ex. len(title) <= 31.
-    # See also xlwt.Utils.valid_sheet_name.
-    if title:
-        dataset.title = title
-
-    if headers:
-        if lheaders:
-            dataset.headers = [h.replace('_s', '') for h in lheaders]
-        else:
-            dataset.headers = [h.replace('_s', '') for h in headers]
-
-        for x in list_data:
-            dataset.append([_make_cell_data(x, h) for h in headers])
-    else:
-        for x in list_data:
-            dataset.append(x.values())
-
-    return dataset
-
-
 def errata_date(date_s):
     """
     NOTE: Errata issue_date and update_date format: month/day/year,
@@ -345,11 +396,32 @@ def sgroupby(xs, kf, kf2=None):
 def list_updates_from_errata(errata):
     """
     :param errata: A list of errata dict
+    :return: A list of the latest update packages sorted by names
+
+    The latest one for each name is picked in one pass; uniq-ing all updates
+    first is quadratic and dominated the analysis of large errata lists. The
+    first one in order of dicts is picked from the ones of same versions,
+    e.g. i686 one of multilib packages, as sorted unique updates were.
+
+    >>> ups = [dict(name="openssl", epoch=0, version="1.0.1e",
+    ...             release="30.el6", arch=arch) for arch
+    ...        in ("x86_64", "i686")]
+    >>> [u["arch"] for u in list_updates_from_errata([dict(updates=ups)])]
+    ['i686']
     """
-    us = sorted(U.uconcat(e.get("updates", []) for e in errata),
-                key=itemgetter("name"))
-    return [sorted(g, cmp=rpmkit.rpmutils.pcmp, reverse=True)[0]
-            for g in sgroupby(us, itemgetter("name"))]
+    latest = dict()
+    for u in itertools.chain.from_iterable(e.get("updates", []) for e
+                                           in errata):
+        cur = latest.get(u["name"])
+        if cur is None:
+            latest[u["name"]] = u
+            continue
+
+        ret = rpmkit.rpmutils.pcmp(u, cur)
+        if ret > 0 or (ret == 0 and dict(u) < dict(cur)):
+            latest[u["name"]] = u
+
+    return [latest[n] for n in sorted(latest)]
 
 
 def list_latest_errata_groupby_updates(es):
@@ -363,29 +435,30 @@ def list_latest_errata_groupby_updates(es):
 
 def compute_delta(refdir, errata, updates, nevra_keys=NEVRA_KEYS):
     """
-    :param refdir: Dir has reference data files: packages.json, errata.json
-        and updates.json
+    :param refdir: Dir or a list of dirs has reference data files:
+        snapshot.json, or errata.json and updates.json
     :param errata: A list of errata
     :param updates: A list of update packages
+
+    :return: A tuple of errata and updates not found in reference data
     """
-    emsg = "Reference %s not found: %s"
-    assert os.path.exists(refdir), emsg % ("data dir", refdir)
+    ref = rpmkit.updateinfo.snapshot.load_chain(refdir, nevra_keys)
+    LOG.debug(_("Loaded reference errata and updates: %r"), ref)
 
-    ref_es_file = os.path.join(refdir, "errata.json")
-    ref_us_file = os.path.join(refdir, "updates.json")
-    assert os.path.exists(ref_es_file), emsg % ("errata file", ref_es_file)
-    assert os.path.exists(ref_us_file), emsg % ("updates file", ref_us_file)
+    return rpmkit.updateinfo.snapshot.delta(errata, updates, ref, nevra_keys)
 
-    ref_es_data = U.json_load(ref_es_file)
-    ref_us_data = U.json_load(ref_us_file)
-    LOG.debug(_("Loaded reference errata and updates file"))
 
-    ref_eadvs = set(e["advisory"] for e in ref_es_data["data"])
-    ref_nevras = set((p[k] for k in nevra_keys) for p in ref_us_data["data"])
+def errata_keywords(errata, keywords=ERRATA_KEYWORDS):
+    """
+    :param errata: A dict represents errata
+    :param keywords: Keyword list to filter 'important' RHBAs
+
+    :return: A list of keywords found in the description of given errata
 
-    return ([e for e in errata if e["advisory"] not in ref_eadvs],
-            [u for u in updates
-             if (u[k] for k in nevra_keys) not in ref_nevras])
+    >>> errata_keywords(dict(description="kernel may panic or hang"))
+    ['panic', 'hang']
+    """
+    return rpmkit.updateinfo.keywords.get_matcher(keywords).match(errata)
 
 
 def errata_matches_keywords_g(errata, keywords=ERRATA_KEYWORDS):
@@ -396,8 +469,9 @@ def errata_matches_keywords_g(errata, keywords=ERRATA_KEYWORDS):
     :return: A generator to yield errata of which description contains any of
         given keywords
     """
+    matcher = rpmkit.updateinfo.keywords.get_matcher(keywords)
     for e in errata:
-        mks = [k for k in keywords if k in e["description"]]
+        mks = matcher.match(e)
         if mks:
             e["keywords"] = mks
             yield e
@@ -418,33 +492,55 @@ def errata_of_rpms(es, rpms=[], keyfunc=_ekeyfunc):
                   key=keyfunc, reverse=True)
 
 
+def is_higher_score_cve_errata(errata, score=DEFAULT_CVSS_SCORE):
+    """
+    Check if given errata has CVEs of which CVSS scores are greater or equal
+    to ``score`` and complement CVSS info of the errata if so.
+
+    :param errata: A dict represents errata
+    :param score: CVSS base metrics score
+    """
+    # NOTE: Skip older CVEs do not have CVSS base metrics and score.
+    cves = [c for c in errata.get("cves", []) if "score" in c]
+    if cves and any(cve_socre_ge(cve, score) for cve in cves):
+        cvsses_s = ", ".join("{cve} ({score}, {metrics})".format(**c)
+                             for c in cves)
+        cves_s = ", ".join("{cve} ({url})".format(**c) for c in cves)
+        errata["cvsses_s"] = cvsses_s
+        errata["cves_s"] = cves_s
+
+        return True
+
+    return False
+
+
 def higher_score_cve_errata_g(errata, score=DEFAULT_CVSS_SCORE):
     """
     :param errata: A list of errata
     :param score: CVSS base metrics score
     """
     for e in errata:
-        # NOTE: Skip older CVEs do not have CVSS base metrics and score.
-        cves = [c for c in e.get("cves", []) if "score" in c]
-        if cves and any(cve_socre_ge(cve, score) for cve in cves):
-            cvsses_s = ", ".join("{cve} ({score}, {metrics})".format(**c)
-                                 for c in cves)
-            cves_s = ", ".join("{cve} ({url})".format(**c) for c in cves)
-            e["cvsses_s"] = cvsses_s
-            e["cves_s"] = cves_s
-
+        if is_higher_score_cve_errata(e, score):
             yield e
 
 
-def errata_complement_g(errata, updates, score=0):
+def errata_complement_g(errata, updates, score=0, cve_cvss_map=None,
+                        workers=1):
     """
     TODO: What should be complemented?
 
     :param errata: A list of errata
     :param updates: A list of update packages
     :param score: CVSS score
+    :param cve_cvss_map: A dict :: {cve: cve_and_cvss_data}
+    :param workers: Number of threads to fetch CVE data
+
+    see also: :function:`complement_cves`
     """
     unas = set(p2na(u) for u in updates)
+    if score > 0:
+        errata = complement_cves(list(errata), cve_cvss_map, workers)
+
     for e in errata:
         e["id"] = errata_to_int(e)  # Sorting key
         e["updates"] = U.uniq(p for p in e.get("packages", []) if p2na(p)
@@ -455,9 +551,6 @@ def errata_complement_g(errata, updates, score=0):
         # of synopsis of some errata.
         e["synopsis"] = e["synopsis"].strip()
 
-        if score > 0:
-            e["cves"] = [fetch_cve_details(cve) for cve in e.get("cves", [])]
-
         yield e
 
 
@@ -573,9 +666,80 @@ def mk_update_name_vs_advs_map(errata):
                   key=lambda t: len(t[1]), reverse=True)
 
 
+def _sort_by_counts(counts):
+    """
+    :param counts: A dict, {key: count}
+    :return: [(key, count)] sorted by counts (desc) and then keys
+
+    >>> _sort_by_counts(dict(a=1, b=3, c=1))
+    [('b', 3), ('a', 1), ('c', 1)]
+    """
+    return sorted(sorted(counts.items()), key=itemgetter(1), reverse=True)
+
+
+def _sort_by_lengths(kvs):
+    """
+    :param kvs: A dict, {key: [value]}
+    :return: [(key, [value])] sorted by the lengths of values (desc) and then
+        keys
+    """
+    return sorted(sorted(kvs.items()), key=lambda kv: len(kv[1]),
+                  reverse=True)
+
+
+def classify_errata(errata, score=0, keywords=ERRATA_KEYWORDS,
+                    core_rpms=CORE_RPMS):
+    """
+    Classify each errata once, so that errata in periods can be analyzed with
+    the results without matching keywords and CVSS scores again.
+
+    :param errata: A list of applicable errata
+    :param score: CVSS base metrics score
+    :param keywords: Keyword list to filter 'important' RHBAs
+    :param core_rpms: Core RPMs to filter errata by them
+
+    :return: A list of tuples of (errata, type char, a set of update names,
+        errata of core RPMs or not, keywords matched, errata of higher CVSS
+        score or not), or None for errata of unknown types, in the same order
+        as `errata`
+    """
+    core_rpms = frozenset(core_rpms)
+    matcher = rpmkit.updateinfo.keywords.get_matcher(keywords)
+
+    res = []
+    for e in errata:
+        etype = e["advisory"][2]
+        if etype not in ('S', 'B', 'E'):
+            res.append(None)
+            continue
+
+        if etype == 'E':
+            res.append((e, etype, None, False, None, False))
+            continue
+
+        uns = set(u["name"] for u in e["updates"])
+        higher = score > 0 and is_higher_score_cve_errata(e, score)
+        if etype == 'S':
+            res.append((e, etype, uns, False, None, higher))
+            continue
+
+        of_rpms = any(n in core_rpms for n in e["update_names"])
+        mks = matcher.match(e)
+        if mks:
+            e["keywords"] = mks
+
+        res.append((e, etype, uns, of_rpms, mks, higher))
+
+    return res
+
+
 def analyze_errata(errata, updates, score=0, keywords=ERRATA_KEYWORDS,
-                   core_rpms=CORE_RPMS, period=()):
+                   core_rpms=CORE_RPMS, period=(), classified=None):
     """
+    Classify errata in a pass over them; each errata is routed into all of
+    the buckets and counters relevant to it at once, and results are sorted
+    or summarized per bucket afterwards.
+
     :param errata: A list of applicable errata sorted by severity
         if it's RHSA and advisory in ascending sequence
     :param updates: A list of update packages
@@ -584,83 +748,124 @@ def analyze_errata(errata, updates, score=0, keywords=ERRATA_KEYWORDS,
     :param core_rpms: Core RPMs to filter errata by them
     :param period: Period of errata in format of YYYY[-MM[-DD]],
         ex. ("2014-10-01", "2014-11-01")
-    """
-    rhsa = [e for e in errata if e["advisory"][2] == 'S']
-    cri_rhsa = [e for e in rhsa if e.get("severity") == "Critical"]
-    imp_rhsa = [e for e in rhsa if e.get("severity") == "Important"]
-    latest_cri_rhsa = list_latest_errata_groupby_updates(cri_rhsa)
-    latest_imp_rhsa = list_latest_errata_groupby_updates(imp_rhsa)
+    :param classified: Results of :function:`classify_errata` for `errata`
+        made already, or None
+    """
+    ddl = collections.defaultdict
+    if classified is None:
+        classified = classify_errata(errata, score, keywords, core_rpms)
+
+    (rhsa, rhba, rhea) = ([], [], [])
+    rhsa_by_sev = ddl(list)
+    (rhba_by_kwds, rhba_of_rpms) = ([], [])
+    (rhsa_by_score, rhba_by_score) = ([], [])
+
+    # {errata_type: {update_name: [advisory]}}
+    advs_by_uns = dict(S=ddl(list), B=ddl(list), E=ddl(list))
+
+    # {bucket: {update_name: number_of_errata}}
+    n_by_uns = dict(rhsa=ddl(int), rhsa_cri=ddl(int), rhsa_imp=ddl(int),
+                    rhba=ddl(int))
+
+    for ec in classified:
+        if ec is None:
+            continue
+
+        (e, etype, uns, of_rpms, mks, higher) = ec
+        adv = e["advisory"]
+        for un in e.get("update_names", []):
+            advs_by_uns[etype][un].append(adv)
+
+        if etype == 'E':
+            rhea.append(e)
+            continue
+
+        if etype == 'S':
+            rhsa.append(e)
+            sev = e.get("severity")
+            rhsa_by_sev[sev].append(e)
+
+            nkeys = ["rhsa"]
+            if sev == "Critical":
+                nkeys.append("rhsa_cri")
+            elif sev == "Important":
+                nkeys.append("rhsa_imp")
+
+            if higher:
+                rhsa_by_score.append(e)
+        else:
+            rhba.append(e)
+            nkeys = ["rhba"]
 
-    us_of_cri_rhsa = list_updates_from_errata(cri_rhsa)
-    us_of_imp_rhsa = list_updates_from_errata(imp_rhsa)
+            if of_rpms:
+                rhba_of_rpms.append(e)
 
-    rhba = [e for e in errata if e["advisory"][2] == 'B']
+            if mks:
+                rhba_by_kwds.append(((len(mks), e["issue_date"],
+                                      e["update_names"]), of_rpms, e))
 
-    kf = lambda e: (len(e.get("keywords", [])), e["issue_date"],
-                    e["update_names"])
-    rhba_by_kwds = sorted(errata_matches_keywords_g(rhba, keywords),
-                          key=kf, reverse=True)
-    rhba_of_rpms_by_kwds = errata_of_rpms(rhba_by_kwds, core_rpms, kf)
-    rhba_of_rpms = errata_of_rpms(rhba, core_rpms,
-                                  itemgetter("update_names"))
+            if higher:
+                rhba_by_score.append(e)
+
+        for nkey in nkeys:
+            counts = n_by_uns[nkey]
+            for un in uns:
+                counts[un] += 1
+
+    cri_rhsa = rhsa_by_sev["Critical"]
+    imp_rhsa = rhsa_by_sev["Important"]
+
+    # Sort keys of RHBAs by keywords are computed once and shared.
+    rhba_by_kwds.sort(key=itemgetter(0), reverse=True)
+    rhba_of_rpms_by_kwds = [t[2] for t in rhba_by_kwds if t[1]]
+    rhba_by_kwds = [t[2] for t in rhba_by_kwds]
+
+    rhba_of_rpms.sort(key=itemgetter("update_names"), reverse=True)
     latest_rhba_of_rpms = list_latest_errata_groupby_updates(rhba_of_rpms)
 
     if score > 0:
-        rhsa_by_score = list(higher_score_cve_errata_g(rhsa, score))
-        rhba_by_score = list(higher_score_cve_errata_g(rhba, score))
         us_of_rhsa_by_score = list_updates_from_errata(rhsa_by_score)
         us_of_rhba_by_score = list_updates_from_errata(rhba_by_score)
     else:
-        rhsa_by_score = []
-        rhba_by_score = []
         us_of_rhsa_by_score = []
         us_of_rhba_by_score = []
 
-    us_of_rhba_by_kwds = list_updates_from_errata(rhba_by_kwds)
-
-    rhea = [e for e in errata if e["advisory"][2] == 'E']
-
-    rhsa_rate_by_sev = [("Critical", len(cri_rhsa)),
-                        ("Important", len(imp_rhsa)),
-                        ("Moderate",
-                         len([e for e in rhsa
-                              if e.get("severity") == "Moderate"])),
-                        ("Low",
-                         len([e for e in rhsa
-                              if e.get("severity") == "Low"]))]
-
-    n_rhsa_by_pns = list_num_of_es_for_updates(rhsa)
-    n_cri_rhsa_by_pns = list_num_of_es_for_updates(cri_rhsa)
-    n_imp_rhsa_by_pns = list_num_of_es_for_updates(imp_rhsa)
-
-    n_rhba_by_pns = list_num_of_es_for_updates(rhba)
+    rhsa_rate_by_sev = [(k, len(rhsa_by_sev[k])) for k
+                        in ("Critical", "Important", "Moderate", "Low")]
 
     return dict(rhsa=dict(list=rhsa,
                           list_critical=cri_rhsa,
                           list_important=imp_rhsa,
-                          list_latest_critical=latest_cri_rhsa,
-                          list_latest_important=latest_imp_rhsa,
+                          list_latest_critical=(
+                              list_latest_errata_groupby_updates(cri_rhsa)),
+                          list_latest_important=(
+                              list_latest_errata_groupby_updates(imp_rhsa)),
                           list_higher_cvss_score=rhsa_by_score,
-                          list_critical_updates=us_of_cri_rhsa,
-                          list_important_updates=us_of_imp_rhsa,
+                          list_critical_updates=(
+                              list_updates_from_errata(cri_rhsa)),
+                          list_important_updates=(
+                              list_updates_from_errata(imp_rhsa)),
                           list_higher_cvss_updates=us_of_rhsa_by_score,
                           rate_by_sev=rhsa_rate_by_sev,
-                          list_n_by_pnames=n_rhsa_by_pns,
-                          list_n_cri_by_pnames=n_cri_rhsa_by_pns,
-                          list_n_imp_by_pnames=n_imp_rhsa_by_pns,
-                          list_by_packages=mk_update_name_vs_advs_map(rhsa)),
+                          list_n_by_pnames=_sort_by_counts(n_by_uns["rhsa"]),
+                          list_n_cri_by_pnames=(
+                              _sort_by_counts(n_by_uns["rhsa_cri"])),
+                          list_n_imp_by_pnames=(
+                              _sort_by_counts(n_by_uns["rhsa_imp"])),
+                          list_by_packages=_sort_by_lengths(advs_by_uns["S"])),
                 rhba=dict(list=rhba,
                           list_by_kwds=rhba_by_kwds,
                           list_of_core_rpms=rhba_of_rpms,
                           list_latests_of_core_rpms=latest_rhba_of_rpms,
                           list_by_kwds_of_core_rpms=rhba_of_rpms_by_kwds,
                           list_higher_cvss_score=rhba_by_score,
-                          list_updates_by_kwds=us_of_rhba_by_kwds,
+                          list_updates_by_kwds=(
+                              list_updates_from_errata(rhba_by_kwds)),
                           list_higher_cvss_updates=us_of_rhba_by_score,
-                          list_n_by_pnames=n_rhba_by_pns,
-                          list_by_packages=mk_update_name_vs_advs_map(rhba)),
+                          list_n_by_pnames=_sort_by_counts(n_by_uns["rhba"]),
+                          list_by_packages=_sort_by_lengths(advs_by_uns["B"])),
                 rhea=dict(list=rhea,
-                          list_by_packages=mk_update_name_vs_advs_map(rhea)),
+                          list_by_packages=_sort_by_lengths(advs_by_uns["E"])),
                 rate_by_type=[("Security", len(rhsa)),
                               ("Bug", len(rhba)),
                               ("Enhancement", len(rhea))])
@@ -678,16 +883,15 @@ def padding_row(row, mcols):
     return row + [''] * (mcols - len(row))
 
 
-def make_overview_dataset(workdir, data, score=0, keywords=ERRATA_KEYWORDS,
-                          core_rpms=[]):
+def make_overview_rows(data, score=0, keywords=ERRATA_KEYWORDS,
+                       core_rpms=[]):
     """
-    :param workdir: Working dir to dump the result
     :param data: RPMs, Update RPMs and various errata data summarized
     :param score: CVSS base metrics score limit
     :param core_rpms: Core RPMs to filter errata by them
 
-    :return: An instance of tablib.Dataset becomes a worksheet represents the
-        overview of analysys reuslts
+    :return: A list of rows of the overview of analysis results. Rows of only
+        one item are separators.
     """
     rows = [[_("Critical or Important RHSAs (Security Errata)")],
             [_("# of Critical RHSAs"),
@@ -732,8 +936,12 @@ def make_overview_dataset(workdir, data, score=0, keywords=ERRATA_KEYWORDS,
              [_("# of RHSAs"), len(data["errata"]["rhsa"]["list"])],
              [_("# of RHBAs"), len(data["errata"]["rhba"]["list"])],
              [_("# of RHEAs (Enhancement Errata)"),
-              len(data["errata"]["rhea"]["list"])],
-             [_("# of Update RPMs"), len(data["updates"]["list"])],
+              len(data["errata"]["rhea"]["list"])]]
+
+    if "installed" not in data:  # Errata in a period only.
+        return rows
+
+    rows += [[_("# of Update RPMs"), len(data["updates"]["list"])],
              [_("# of Installed RPMs"), len(data["installed"]["list"])],
              [],
              [_("Origin of Installed RPMs")],
@@ -743,20 +951,52 @@ def make_overview_dataset(workdir, data, score=0, keywords=ERRATA_KEYWORDS,
              [_("# of RPMs from other vendors (non Red Hat)"),
               len(data["installed"]["list_from_others"])]]
 
-    headers = (_("Item"), _("Value"), _("Notes"))
-    dataset = tablib.Dataset(headers=headers)
-    dataset.title = _("Overview of analysis results")
+    return rows
 
-    mcols = len(headers)
-    for row in rows:
-        try:
-            if row and len(row) == 1:  # Special case: separator
+
+_OVERVIEW_HEADERS = (_("Item"), _("Value"), _("Notes"))
+
+
+# Worksheet data to dump: `rows` is an iterable (usually a generator) yields
+# each row so that rows are made only when the sheet is written.
+Sheet = collections.namedtuple("Sheet", "name title headers rows")
+
+
+def make_sheet(name, list_data, title, headers, lheaders=[]):
+    """
+    :param name: Sheet name in ASCII used as file name of CSV, etc.
+    :param list_data: List of data
+    :param title: Sheet title (may be localized)
+    :param headers: Keys of data to be used as column headers, etc.
+    :param lheaders: Localized version of `headers`
+
+    :return: A Sheet object whose rows are made lazily
+
+    >>> sheet = make_sheet("a", [dict(a=1, b=["x", "y"])], "A", ("a", "b"))
+    >>> sheet.headers
+    ['a', 'b']
+    >>> list(sheet.rows)
+    [[1, 'x, y']]
+    """
+    rows = ([_make_cell_data(x, h) for h in headers] for x in list_data)
+    return Sheet(name, title, [h.replace('_s', '') for h
+                               in (lheaders or headers)], rows)
+
+
+def sheet_to_dataset(sheet):
+    """
+    :param sheet: A Sheet object
+    :return: An instance of tablib.Dataset
+    """
+    with rpmkit.updateinfo.trace.phase("make_dataset", sheet=sheet.name):
+        dataset = tablib.Dataset(headers=sheet.headers)
+        dataset.title = sheet.title
+
+        for row in sheet.rows:
+            if row and len(row) == 1 and len(sheet.headers) > 1:
                 dataset.append_separator(row[0])
             else:
-                dataset.append(padding_row(row, mcols))
-        except:
-            LOG.error("row=" + str(row))
-            raise
+                dataset.append(padding_row(row, len(sheet.headers)))
 
     return dataset
 
@@ -767,43 +1007,98 @@ def dump_xls(dataset, filepath):
         out.write(book.xls)
 
 
-def dump_results(workdir, rpms, errata, updates, score=0,
-                 keywords=ERRATA_KEYWORDS, core_rpms=[], details=True,
-                 rpmkeys=NEVRA_KEYS, vendor="redhat"):
+def _to_csv_cell(val):
     """
-    :param workdir: Working dir to dump the result
-    :param rpms: A list of installed RPMs
-    :param errata: A list of applicable errata
-    :param updates: A list of update RPMs
-    :param score: CVSS base metrics score
-    :param keywords: Keyword list to filter 'important' RHBAs
-    :param core_rpms: Core RPMs to filter errata by them
-    :param details: Dump details also if True
+    >>> _to_csv_cell(u"abc")
+    'abc'
+    >>> _to_csv_cell(None)
+    ''
+    >>> _to_csv_cell(1)
+    1
     """
-    rpms_rebuilt = [p for p in rpms if p.get("rebuilt", False)]
-    rpms_replaced = [p for p in rpms if p.get("replaced", False)]
-    rpms_from_others = [p for p in rpms if p.get("origin", '') != vendor]
-    rpms_by_vendor = [p for p in rpms if p.get("origin", '') == vendor and
-                      not p.get("rebuilt", False) and
-                      not p.get("replaced", False)]
+    if val is None:
+        return ''
 
-    nps = len(rpms)
-    nus = len(updates)
+    return val.encode("utf-8") if isinstance(val, unicode) else val
 
-    data = dict(errata=analyze_errata(errata, updates, score, keywords,
-                                      core_rpms),
-                installed=dict(list=rpms,
-                               list_rebuilt=rpms_rebuilt,
-                               list_replaced=rpms_replaced,
-                               list_from_others=rpms_from_others,
-                               list_by_vendor=rpms_by_vendor),
-                updates=dict(list=updates,
-                             rate=[(_("packages need updates"), nus),
-                                   (_("packages not need updates"),
-                                    nps - nus)]))
 
-    U.json_dump(data, os.path.join(workdir, "summary.json"))
+def dump_csvs(sheets, outdir):
+    """
+    Dump each sheet into a CSV file in `outdir` row by row.
+
+    :param sheets: A list of Sheet objects
+    :param outdir: Output dir
+    """
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+
+    for sheet in sheets:
+        with rpmkit.updateinfo.trace.phase("write_sheet", sheet=sheet.name):
+            with open(os.path.join(outdir, sheet.name + ".csv"), 'wb') as out:
+                writer = csv.writer(out)
+                writer.writerow([_to_csv_cell(h) for h in sheet.headers])
+                for row in sheet.rows:
+                    writer.writerow([_to_csv_cell(c) for c in row])
 
+
+def dump_xlsx(sheets, filepath):
+    """
+    Dump sheets into a xlsx file row by row with xlsxwriter's constant memory
+    mode.
+
+    :param sheets: A list of Sheet objects
+    :param filepath: Output file path
+    """
+    book = xlsxwriter.Workbook(filepath, dict(constant_memory=True))
+    try:
+        bold = book.add_format(dict(bold=True))
+        for sheet in sheets:
+            with rpmkit.updateinfo.trace.phase("write_sheet",
+                                               sheet=sheet.name):
+                wsheet = book.add_worksheet(sheet.title[:31])
+                wsheet.write_row(0, 0, sheet.headers, bold)
+                for idx, row in enumerate(sheet.rows):
+                    if row and len(row) == 1 and len(sheet.headers) > 1:
+                        wsheet.write_row(idx + 1, 0, row, bold)
+                    else:
+                        wsheet.write_row(idx + 1, 0, row)
+    finally:
+        book.close()
+
+
+def dump_sheets(sheets, filepath, fmt=DEFAULT_FORMAT):
+    """
+    :param sheets: A list of Sheet objects
+    :param filepath: Output file path without extension
+    :param fmt: Output format, see `FORMATS`
+    """
+    assert fmt in FORMATS, "Unknown output format: " + fmt
+
+    if fmt == "xlsx" and xlsxwriter is None:
+        LOG.warn(_("xlsxwriter is not available, dump CSV files in %s/ "
+                   "instead of %s.xlsx"), filepath, filepath)
+        fmt = "csv"
+
+    # Sheets are made lazily while dumping them.
+    sheets = rpmkit.updateinfo.trace.traced_g(sheets, "make_sheet",
+                                              lambda s: dict(sheet=s.name))
+    with rpmkit.updateinfo.trace.phase("dump_sheets", fmt=fmt,
+                                       file=os.path.basename(filepath)):
+        if fmt == "xls":
+            dump_xls([sheet_to_dataset(s) for s in sheets],
+                     filepath + ".xls")
+        elif fmt == "xlsx":
+            dump_xlsx(sheets, filepath + ".xlsx")
+        else:
+            dump_csvs(sheets, filepath)
+
+
+def _summary_sheets_g(data, score=0, keywords=ERRATA_KEYWORDS, core_rpms=[],
+                      rpmkeys=NEVRA_KEYS):
+    """
+    :param data: RPMs, Update RPMs and various errata data summarized
+    :return: A generator yields Sheet objects of errata summary
+    """
     # FIXME: How to keep DRY principle?
     lrpmkeys = [_("name"), _("epoch"), _("version"), _("release"), _("arch")]
 
@@ -817,72 +1112,169 @@ def dump_results(workdir, rpms, errata, updates, score=0,
     lbekeys = (_("advisory"), _("keywords"), _("synopsis"), _("url"),
                _("update_names"))
 
-    ds = [make_overview_dataset(workdir, data, score, keywords, core_rpms),
-          make_dataset((data["errata"]["rhsa"]["list_latest_critical"] +
-                        data["errata"]["rhsa"]["list_latest_important"]),
-                       _("Cri-Important RHSAs (latests)"), sekeys, lsekeys),
-          make_dataset(sorted(data["errata"]["rhsa"]["list_critical"],
-                              key=itemgetter("update_names")) +
-                       sorted(data["errata"]["rhsa"]["list_important"],
-                              key=itemgetter("update_names")),
-                       _("Critical or Important RHSAs"), sekeys, lsekeys),
-          make_dataset(data["errata"]["rhba"]["list_by_kwds_of_core_rpms"],
-                       _("RHBAs (core rpms, keywords)"), bekeys, lbekeys),
-          make_dataset(data["errata"]["rhba"]["list_by_kwds"],
-                       _("RHBAs (keyword)"), bekeys, lbekeys),
-          make_dataset(data["errata"]["rhba"]["list_latests_of_core_rpms"],
-                       _("RHBAs (core rpms, latests)"), bekeys, lbekeys),
-          make_dataset(data["errata"]["rhsa"]["list_critical_updates"],
-                       _("Update RPMs by RHSAs (Critical)"), rpmkeys,
-                       lrpmkeys),
-          make_dataset(data["errata"]["rhsa"]["list_important_updates"],
-                       _("Updates by RHSAs (Important)"), rpmkeys, lrpmkeys),
-          make_dataset(data["errata"]["rhba"]["list_updates_by_kwds"],
-                       _("Updates by RHBAs (Keyword)"), rpmkeys, lrpmkeys)]
+    (rhsa, rhba) = (data["errata"]["rhsa"], data["errata"]["rhba"])
+
+    yield Sheet("overview", _("Overview of analysis results"),
+                list(_OVERVIEW_HEADERS),
+                make_overview_rows(data, score, keywords, core_rpms))
+    yield make_sheet("rhsa_cri_imp_latests",
+                     itertools.chain(rhsa["list_latest_critical"],
+                                     rhsa["list_latest_important"]),
+                     _("Cri-Important RHSAs (latests)"), sekeys, lsekeys)
+    yield make_sheet("rhsa_cri_imp",
+                     itertools.chain(sorted(rhsa["list_critical"],
+                                            key=itemgetter("update_names")),
+                                     sorted(rhsa["list_important"],
+                                            key=itemgetter("update_names"))),
+                     _("Critical or Important RHSAs"), sekeys, lsekeys)
+    yield make_sheet("rhba_core_rpms_kwds", rhba["list_by_kwds_of_core_rpms"],
+                     _("RHBAs (core rpms, keywords)"), bekeys, lbekeys)
+    yield make_sheet("rhba_kwds", rhba["list_by_kwds"],
+                     _("RHBAs (keyword)"), bekeys, lbekeys)
+    yield make_sheet("rhba_core_rpms_latests",
+                     rhba["list_latests_of_core_rpms"],
+                     _("RHBAs (core rpms, latests)"), bekeys, lbekeys)
+    yield make_sheet("updates_rhsa_cri", rhsa["list_critical_updates"],
+                     _("Update RPMs by RHSAs (Critical)"), rpmkeys, lrpmkeys)
+    yield make_sheet("updates_rhsa_imp", rhsa["list_important_updates"],
+                     _("Updates by RHSAs (Important)"), rpmkeys, lrpmkeys)
+    yield make_sheet("updates_rhba_kwds", rhba["list_updates_by_kwds"],
+                     _("Updates by RHBAs (Keyword)"), rpmkeys, lrpmkeys)
 
     if score > 0:
-        cvss_ds = [
-            make_dataset(data["errata"]["rhsa"]["list_higher_cvss_score"],
+        yield make_sheet("rhsa_cvss", rhsa["list_higher_cvss_score"],
                          _("RHSAs (CVSS score >= %.1f)") % score,
                          ("advisory", "severity", "synopsis",
-                         "cves", "cvsses_s", "url"),
+                          "cves", "cvsses_s", "url"),
                          (_("advisory"), _("severity"), _("synopsis"),
-                         _("cves"), _("cvsses_s"), _("url"))),
-            make_dataset(data["errata"]["rhsa"]["list_higher_cvss_score"],
+                          _("cves"), _("cvsses_s"), _("url")))
+        yield make_sheet("rhba_cvss", rhba["list_higher_cvss_score"],
                          _("RHBAs (CVSS score >= %.1f)") % score,
                          ("advisory", "synopsis", "cves", "cvsses_s", "url"),
                          (_("advisory"), _("synopsis"), _("cves"),
-                         _("cvsses_s"), _("url")))]
-        ds.extend(cvss_ds)
+                          _("cvsses_s"), _("url")))
+
+    if "installed" not in data:
+        return
 
     if data["installed"]["list_rebuilt"]:
-        ds.append(make_dataset(data["installed"]["list_rebuilt"],
-                               _("Rebuilt RPMs"), rpmdkeys, lrpmdkeys))
+        yield make_sheet("rebuilt", data["installed"]["list_rebuilt"],
+                         _("Rebuilt RPMs"), rpmdkeys, lrpmdkeys)
 
     if data["installed"]["list_replaced"]:
-        ds.append(make_dataset(data["installed"]["list_replaced"],
-                               _("Replaced RPMs"), rpmdkeys, lrpmdkeys))
+        yield make_sheet("replaced", data["installed"]["list_replaced"],
+                         _("Replaced RPMs"), rpmdkeys, lrpmdkeys)
 
     if data["installed"]["list_from_others"]:
-        ds.append(make_dataset(data["installed"]["list_from_others"],
-                               _("RPMs from other vendors"), rpmdkeys,
-                               lrpmdkeys))
+        yield make_sheet("from_others", data["installed"]["list_from_others"],
+                         _("RPMs from other vendors"), rpmdkeys, lrpmdkeys)
 
-    dump_xls(ds, os.path.join(workdir, "errata_summary.xls"))
 
-    if details:
-        dds = [make_dataset(errata, _("Errata Details"),
-                            ("advisory", "type", "severity", "synopsis",
-                             "description", "issue_date", "update_date", "url",
-                             "cves", "bzs", "update_names"),
-                            (_("advisory"), _("type"), _("severity"),
-                            _("synopsis"), _("description"), _("issue_date"),
-                            _("update_date"), _("url"), _("cves"),
-                            _("bzs"), _("update_names"))),
-               make_dataset(updates, _("Update RPMs"), rpmkeys, lrpmkeys),
-               make_dataset(rpms, _("Installed RPMs"), rpmdkeys, lrpmdkeys)]
+def _details_sheets_g(rpms, errata, updates, rpmkeys=NEVRA_KEYS):
+    """
+    :return: A generator yields Sheet objects of errata details
+    """
+    lrpmkeys = [_("name"), _("epoch"), _("version"), _("release"), _("arch")]
+    rpmdkeys = rpmkeys + ["summary", "vendor", "buildhost"]
+    lrpmdkeys = lrpmkeys + [_("summary"), _("vendor"), _("buildhost")]
+
+    yield make_sheet("errata", errata, _("Errata Details"),
+                     ("advisory", "type", "severity", "synopsis",
+                      "description", "issue_date", "update_date", "url",
+                      "cves", "bzs", "update_names"),
+                     (_("advisory"), _("type"), _("severity"),
+                      _("synopsis"), _("description"), _("issue_date"),
+                      _("update_date"), _("url"), _("cves"),
+                      _("bzs"), _("update_names")))
+    yield make_sheet("updates", updates, _("Update RPMs"), rpmkeys, lrpmkeys)
+    yield make_sheet("installed", rpms, _("Installed RPMs"), rpmdkeys,
+                     lrpmdkeys)
+
+
+def summarize_packages(rpms, updates, vendor="redhat"):
+    """
+    :param rpms: A list of installed RPMs
+    :param updates: A list of update RPMs
+
+    :return: A dict of summary data of installed and update RPMs
+    """
+    rpms_rebuilt = [p for p in rpms if p.get("rebuilt", False)]
+    rpms_replaced = [p for p in rpms if p.get("replaced", False)]
+    rpms_from_others = [p for p in rpms if p.get("origin", '') != vendor]
+    rpms_by_vendor = [p for p in rpms if p.get("origin", '') == vendor and
+                      not p.get("rebuilt", False) and
+                      not p.get("replaced", False)]
+
+    nps = len(rpms)
+    nus = len(updates)
+
+    return dict(installed=dict(list=rpms,
+                               list_rebuilt=rpms_rebuilt,
+                               list_replaced=rpms_replaced,
+                               list_from_others=rpms_from_others,
+                               list_by_vendor=rpms_by_vendor),
+                updates=dict(list=updates,
+                             rate=[(_("packages need updates"), nus),
+                                   (_("packages not need updates"),
+                                    nps - nus)]))
+
+
+def summarize(rpms, errata, updates, score=0, keywords=ERRATA_KEYWORDS,
+              core_rpms=[], vendor="redhat", classified=None):
+    """
+    :param rpms: A list of installed RPMs
+    :param errata: A list of applicable errata
+    :param updates: A list of update RPMs
+    :param score: CVSS base metrics score
+    :param keywords: Keyword list to filter 'important' RHBAs
+    :param core_rpms: Core RPMs to filter errata by them
+    :param classified: See :function:`analyze_errata`
+
+    :return: A dict of summary data of errata, installed and update RPMs
+    """
+    with rpmkit.updateinfo.trace.phase("analyze_errata"):
+        edata = analyze_errata(errata, updates, score, keywords, core_rpms,
+                               classified=classified)
 
-        dump_xls(dds, os.path.join(workdir, "errata_details.xls"))
+    return dict(summarize_packages(rpms, updates, vendor), errata=edata)
+
+
+def dump_results(workdir, rpms, errata, updates, score=0,
+                 keywords=ERRATA_KEYWORDS, core_rpms=[], details=True,
+                 rpmkeys=NEVRA_KEYS, vendor="redhat", fmt=DEFAULT_FORMAT,
+                 store=None, data=None):
+    """
+    :param workdir: Working dir to dump the result
+    :param rpms: A list of installed RPMs
+    :param errata: A list of applicable errata
+    :param updates: A list of update RPMs
+    :param score: CVSS base metrics score
+    :param keywords: Keyword list to filter 'important' RHBAs
+    :param core_rpms: Core RPMs to filter errata by them
+    :param details: Dump details also if True
+    :param fmt: Output format of the summary and the details, see `FORMATS`
+    :param store: An rpmkit.updateinfo.store.ErrataStore object to save errata
+        shared among hosts, or None
+    :param data: Summary data made already, see :function:`summarize`, or
+        None. Installed and update RPMs are not dumped if it has errata data
+        only
+    """
+    if data is None:
+        data = summarize(rpms, errata, updates, score, keywords, core_rpms,
+                         vendor)
+
+    with rpmkit.updateinfo.trace.phase("dump", file="summary.json"):
+        rpmkit.updateinfo.store.dump(data,
+                                     os.path.join(workdir, "summary.json"),
+                                     store)
+
+    # Each sheet is made and written one by one in streaming formats.
+    sheets = _summary_sheets_g(data, score, keywords, core_rpms, rpmkeys)
+    dump_sheets(sheets, os.path.join(workdir, "errata_summary"), fmt)
+
+    if details:
+        sheets = _details_sheets_g(rpms, errata, updates, rpmkeys)
+        dump_sheets(sheets, os.path.join(workdir, "errata_details"), fmt)
 
 
 def get_backend(backend, fallback=rpmkit.updateinfo.yumbase.Base,
@@ -894,7 +1286,7 @@ def get_backend(backend, fallback=rpmkit.updateinfo.yumbase.Base,
 @profile
 def prepare(root, workdir=None, repos=[], did=None, cachedir=None,
             backend=DEFAULT_BACKEND, backends=BACKENDS,
-            nevra_keys=NEVRA_KEYS):
+            nevra_keys=NEVRA_KEYS, readonly=True):
     """
     :param root: Root dir of RPM db, ex. / (/var/lib/rpm)
     :param workdir: Working dir to save results
@@ -903,6 +1295,7 @@ def prepare(root, workdir=None, repos=[], did=None, cachedir=None,
     :param cachedir: A dir to save metadata cache of yum repos
     :param backend: Backend module to use to get updates and errata
     :param backends: Backend list
+    :param readonly: Drop write access perms of RPM DB files if True
 
     :return: A bunch.Bunch object of (Base, workdir, installed_rpms_list)
     """
@@ -925,24 +1318,37 @@ def prepare(root, workdir=None, repos=[], did=None, cachedir=None,
                                cachedir=cachedir))
 
     # pylint: disable=maybe-no-member
-    if not rpmkit.updateinfo.utils.check_rpmdb_root(root):
+    bcls = get_backend(backend, backends=backends)
+    rlist = rpmkit.updateinfo.rpmlist.find_rpm_list(root)
+    if rlist:
+        if not getattr(bcls, "uses_repometa", False):
+            LOG.warn(_("%s: Backend %s does not support the RPM list %s and "
+                       "don't analyze %s"), host.id, bcls.name, rlist, root)
+            return host
+
+    elif not rpmkit.updateinfo.utils.check_rpmdb_root(root, readonly):
         LOG.warn(_("%s: RPM DB not available and don't analyze %s"),
                  host.id, root)
         return host
 
-    base = get_backend(backend)(host.root, host.repos, workdir=host.workdir,
-                                cachedir=cachedir)
+    with rpmkit.updateinfo.trace.phase("init_backend", host=host.id):
+        base = bcls(host.root, host.repos, workdir=host.workdir,
+                    cachedir=cachedir)
     LOG.debug(_("%s: Initialized backend %s"), host.id, base.name)
     host.base = base
 
     LOG.debug(_("%s: Dump Installed RPMs list loaded from %s"),
               host.id, host.root)
-    host.installed = sorted(host.base.list_installed(),
-                            key=itemgetter(*nevra_keys))
+    # Installed RPMs are kept in memory: the backend joins them with errata
+    # and updates, and they are dumped and summarized several times later.
+    # The list the backend keeps is sorted in place instead of copying it.
+    with rpmkit.updateinfo.trace.phase("list_installed", host=host.id):
+        host.installed = host.base.list_installed()
+        host.installed.sort(key=itemgetter(*nevra_keys))
     LOG.info(_("%s: Found %d (rebuilt=%d, replaced=%d) Installed RPMs"),
              host.id, len(host.installed),
-             len([p for p in host.installed if p.get("rebuilt", False)]),
-             len([p for p in host.installed if p.get("replaced", False)]))
+             sum(1 for p in host.installed if p.get("rebuilt", False)),
+             sum(1 for p in host.installed if p.get("replaced", False)))
 
     U.json_dump(dict(data=host.installed, ), rpm_list_path(host.workdir))
     host.available = True
@@ -976,29 +1382,140 @@ def period_to_dates(start_date, end_date=_TODAY):
     return (_d2i(ymd_to_date(start_date)), _d2i(ymd_to_date(end_date, True)))
 
 
+def normalize_periods(period):
+    """
+    :param period: A period in format of YYYY[-MM[-DD]] or a list of them,
+        ex. ("2014-10-01", "2014-11-01"), [("2014-01", ), ("2014-10", )]
+    :return: A list of periods
+
+    >>> normalize_periods(())
+    []
+    >>> normalize_periods(("2014-10-01", "2014-11-01"))
+    [('2014-10-01', '2014-11-01')]
+    >>> normalize_periods([("2014-01", ), ["2014-10", "2014-12"]])
+    [('2014-01',), ('2014-10', '2014-12')]
+    """
+    if not period:
+        return []
+
+    if all(isinstance(x, basestring) for x in period):
+        return [tuple(period)]
+
+    return [tuple(p) for p in period]
+
+
+def split_period_monthly(start_date, end_date):
+    """
+    :param start_date, end_date: Start and end date (not included) of period
+        in int, ex. 20141001
+    :return: A list of (start_date, end_date) of each month in the period
+
+    >>> split_period_monthly(20141015, 20150101)
+    [(20141015, 20141101), (20141101, 20141201), (20141201, 20150101)]
+    >>> split_period_monthly(20141001, 20141020)
+    [(20141001, 20141020)]
+    """
+    periods = []
+    (year, mon) = divmod(start_date // 100, 100)
+    while start_date < end_date:
+        (year, mon) = (year + 1, 1) if mon == 12 else (year, mon + 1)
+        next_date = min(_d2i((year, mon, 1)), end_date)
+        periods.append((start_date, next_date))
+        start_date = next_date
+
+    return periods
+
+
+def errata_date_key(errata):
+    """
+    >>> errata_date_key(dict(issue_date="2014-10-14 00:00:00"))
+    20141014
+    """
+    return _d2i(errata_date(errata["issue_date"]))
+
+
 def errata_in_period(errata, start_date, end_date):
     """
     :param errata: A dict represents errata
     :param start_date, end_date: Start and end date of period,
         (year :: int, month :: int, day :: int)
     """
-    d = _d2i(errata_date(errata["issue_date"]))
+    d = errata_date_key(errata)
 
     return start_date <= d and d < end_date
 
 
+class ErrataByDate(object):
+    """
+    Errata sorted once by their issue dates to find errata in periods with
+    bisect instead of parsing dates of all errata for each period.
+
+    >>> es = [dict(advisory="RHSA-2014:0003", issue_date="2014-12-01"),
+    ...       dict(advisory="RHSA-2014:0002", issue_date="2014-10-14"),
+    ...       dict(advisory="RHBA-2014:0001", issue_date="2014-11-30")]
+    >>> ebd = ErrataByDate(es)
+    >>> [e["advisory"] for e in ebd.in_period(20141101, 20150101)]
+    ['RHSA-2014:0003', 'RHBA-2014:0001']
+    >>> ebd.in_period(20140101, 20141001)
+    []
+    """
+    __slots__ = ("errata", "dates", "indexes")
+
+    def __init__(self, errata):
+        """
+        :param errata: A list of errata
+        """
+        self.errata = errata
+        pairs = sorted((errata_date_key(e), i) for i, e in enumerate(errata))
+        self.dates = [d for d, _i in pairs]
+        self.indexes = [i for _d, i in pairs]
+
+    def indexes_in_period(self, start_date, end_date):
+        """
+        :param start_date, end_date: Start and end date (not included) of
+            period in int, ex. 20141001
+        :return: A list of indexes of errata in the period in ascending order
+        """
+        lo = bisect.bisect_left(self.dates, start_date)
+        hi = bisect.bisect_left(self.dates, end_date)
+
+        return sorted(self.indexes[lo:hi])
+
+    def in_period(self, start_date, end_date):
+        """
+        :param start_date, end_date: See :meth:`indexes_in_period`
+        :return: A list of errata in the period keeping the original order
+        """
+        return [self.errata[i] for i in self.indexes_in_period(start_date,
+                                                               end_date)]
+
+
 @profile
 def analyze(host, score=0, keywords=ERRATA_KEYWORDS, core_rpms=[],
-            period=(), refdir=None, nevra_keys=NEVRA_KEYS):
+            period=(), refdir=None, nevra_keys=NEVRA_KEYS, cve_cvss_map=None,
+            fmt=DEFAULT_FORMAT, details=True, store=None, monthly=False,
+            workers=1, save_keywords=True):
     """
     :param host: host object function :function:`prepare` returns
     :param score: CVSS base metrics score
     :param keywords: Keyword list to filter 'important' RHBAs
     :param core_rpms: Core RPMs to filter errata by them
     :param period: Period of errata in format of YYYY[-MM[-DD]],
-        ex. ("2014-10-01", "2014-11-01")
-    :param refdir: A dir holding reference data previously generated to
-        compute delta (updates since that data)
+        ex. ("2014-10-01", "2014-11-01"), or a list of periods
+    :param refdir: A dir or a list of dirs holding reference data previously
+        generated to compute delta (updates since that data)
+    :param cve_cvss_map: A dict :: {cve: cve_and_cvss_data} to look up CVSS
+        metrics of CVEs instead of fetching them one by one
+    :param fmt: Output format of results, see `FORMATS`
+    :param details: Dump errata details also if True
+    :param store: An rpmkit.updateinfo.store.ErrataStore object to save errata
+        shared among hosts, or None
+    :param monthly: Split periods into months and analyze errata in each
+        month if True
+    :param workers: Number of threads to fetch CVE data of errata
+    :param save_keywords: Save keywords found in errata into the cache in the
+        cache dir if True. Callers analyzing many hosts may save it once
+        instead
     """
     base = host.base
     workdir = host.workdir
@@ -1016,42 +1533,80 @@ def analyze(host, score=0, keywords=ERRATA_KEYWORDS, core_rpms=[],
     # pylint: enable=maybe-no-member
     U.json_dump(metadata.toDict(), os.path.join(workdir, "metadata.json"))
 
-    us = U.uniq(base.list_updates(), key=itemgetter(*nevra_keys))
-    es = base.list_errata()
-    es = U.uniq(errata_complement_g(es, us, score), key=itemgetter("id"),
-                reverse=True)
+    with rpmkit.updateinfo.trace.phase("list_updates", host=host.id):
+        us = U.uniq(base.list_updates(), key=itemgetter(*nevra_keys))
+    with rpmkit.updateinfo.trace.phase("list_errata", host=host.id):
+        es = base.list_errata()
+    with rpmkit.updateinfo.trace.phase("complement", host=host.id):
+        es = U.uniq(errata_complement_g(es, us, score, cve_cvss_map,
+                                        workers),
+                    key=itemgetter("id"), reverse=True)
     LOG.info(_("%s: Found %d Errata, %d Update RPMs"), host.id, len(es),
              len(us))
 
     LOG.debug(_("%s: Dump Errata and Update RPMs list..."), host.id)
-    U.json_dump(dict(data=es, ), errata_list_path(workdir))
-    U.json_dump(dict(data=us, ), updates_file_path(workdir))
+    with rpmkit.updateinfo.trace.phase("dump", host=host.id,
+                                       file="errata.json"):
+        rpmkit.updateinfo.store.dump(dict(data=es, ),
+                                     errata_list_path(workdir), store)
+    with rpmkit.updateinfo.trace.phase("dump", host=host.id,
+                                       file="updates.json"):
+        U.json_dump(dict(data=us, ), updates_file_path(workdir))
+        rpmkit.updateinfo.snapshot.save(workdir, es, us, nevra_keys,
+                                        id=host.id, generated=timestamp)
 
     host.errata = es
     host.updates = us
     ips = host.installed
 
+    # Keywords found in errata are cached in the cache dir among runs.
+    kcache = host.get("cachedir") and \
+        os.path.join(host.cachedir, rpmkit.updateinfo.keywords.CACHE_FILE)
+    if kcache:
+        rpmkit.updateinfo.keywords.load_cache(kcache)
+
     LOG.info(_("%s: Analyze and dump results of errata data in %s"),
              host.id, workdir)
-    dump_results(workdir, ips, es, us, score, keywords, core_rpms)
-
-    if period:
-        (start_date, end_date) = period_to_dates(*period)
+    with rpmkit.updateinfo.trace.phase("dump_results", host=host.id):
+        # Errata are classified once and shared with the ones in periods.
+        classified = classify_errata(es, score, keywords, core_rpms)
+        data = summarize(ips, es, us, score, keywords, core_rpms,
+                         classified=classified)
+        dump_results(workdir, ips, es, us, score, keywords, core_rpms,
+                     details, fmt=fmt, store=store, data=data)
+
+    periods = [period_to_dates(*p) for p in normalize_periods(period)]
+    if monthly:
+        periods = list(itertools.chain.from_iterable(split_period_monthly(*p)
+                                                     for p in periods))
+    if periods:
+        ebd = ErrataByDate(es)
+
+    for start_date, end_date in periods:
         LOG.info(_("%s: Analyze errata in period: %s ~ %s"),
                  host.id, start_date, end_date)
-        pes = [e for e in es if errata_in_period(e, start_date, end_date)]
+        idxs = ebd.indexes_in_period(start_date, end_date)
+        pes = [es[i] for i in idxs]
 
         pdir = os.path.join(workdir, "%s_%s" % (start_date, end_date))
         if not os.path.exists(pdir):
             LOG.debug(_("%s: Creating period working dir %s"), host.id, pdir)
             os.makedirs(pdir)
 
-        dump_results(pdir, ips, pes, us, score, keywords, core_rpms, False)
+        # Installed and update RPMs are same as the above and not dumped.
+        with rpmkit.updateinfo.trace.phase("dump_results", host=host.id,
+                                           period=[start_date, end_date]):
+            pdata = analyze_errata(pes, us, score, keywords, core_rpms,
+                                   classified=[classified[i] for i in idxs])
+            dump_results(pdir, ips, pes, us, score, keywords, core_rpms,
+                         False, fmt=fmt, store=store,
+                         data=dict(errata=pdata))
 
     if refdir:
         LOG.debug(_("%s [delta]: Analyze delta errata data by refering %s"),
                   host.id, refdir)
-        (es, us) = compute_delta(refdir, es, us)
+        with rpmkit.updateinfo.trace.phase("compute_delta", host=host.id):
+            (es, us) = compute_delta(refdir, es, us, nevra_keys)
         LOG.info(_("%s [delta]: Found %d Errata, %d Update RPMs"), host.id,
                  len(es), len(us))
 
@@ -1061,18 +1616,26 @@ def analyze(host, score=0, keywords=ERRATA_KEYWORDS, core_rpms=[],
                       host.id, deltadir)
             os.makedirs(deltadir)
 
-        U.json_dump(dict(data=es, ), errata_list_path(deltadir))
+        rpmkit.updateinfo.store.dump(dict(data=es, ),
+                                     errata_list_path(deltadir), store)
         U.json_dump(dict(data=us, ), updates_file_path(deltadir))
 
         LOG.info(_("%s: Analyze and dump results of delta errata in %s"),
                  host.id, deltadir)
-        dump_results(workdir, ips, es, us, score, keywords, core_rpms)
+        with rpmkit.updateinfo.trace.phase("dump_results", host=host.id,
+                                           delta=True):
+            dump_results(deltadir, ips, es, us, score, keywords, core_rpms,
+                         details, fmt=fmt, store=store)
+
+    if kcache and save_keywords:
+        rpmkit.updateinfo.keywords.save_cache(kcache)
 
 
 def main(root, workdir=None, repos=[], did=None, score=0,
          keywords=ERRATA_KEYWORDS, rpms=CORE_RPMS, period=(),
          cachedir=None, refdir=None, verbosity=0,
-         backend=DEFAULT_BACKEND, backends=BACKENDS):
+         backend=DEFAULT_BACKEND, backends=BACKENDS, fmt=DEFAULT_FORMAT,
+         details=True, monthly=False, trace_out=None, workers=1):
     """
     :param root: Root dir of RPM db, ex. / (/var/lib/rpm)
     :param workdir: Working dir to save results
@@ -1082,18 +1645,33 @@ def main(root, workdir=None, repos=[], did=None, score=0,
     :param keywords: Keyword list to filter 'important' RHBAs
     :param rpms: Core RPMs to filter errata by them
     :param period: Period of errata in format of YYYY[-MM[-DD]],
-        ex. ("2014-10-01", "2014-11-01")
+        ex. ("2014-10-01", "2014-11-01"), or a list of periods
     :param cachedir: A dir to save metadata cache of yum repos
     :param refdir: A dir holding reference data previously generated to
         compute delta (updates since that data)
     :param verbosity: Verbosity level: 0 (default), 1 (verbose), 2 (debug)
     :param backend: Backend module to use to get updates and errata
     :param backends: Backend list
+    :param fmt: Output format of results, see `FORMATS`
+    :param details: Dump errata details also if True
+    :param monthly: Split periods into months if True
+    :param trace_out: Path to save the trace of phases in Chrome trace format
+        or None (do not trace)
+    :param workers: Number of threads to fetch CVE data of errata
     """
     set_loglevel(verbosity)
 
-    host = prepare(root, workdir, repos, did, cachedir, backend, backends)
-    if host.available:
-        analyze(host, score, keywords, rpms, period, refdir)
+    if trace_out:
+        rpmkit.updateinfo.trace.enable()
+    try:
+        host = prepare(root, workdir, repos, did, cachedir, backend,
+                       backends)
+        if host.available:
+            analyze(host, score, keywords, rpms, period, refdir, fmt=fmt,
+                    details=details, monthly=monthly, workers=workers)
+    finally:
+        if trace_out:
+            rpmkit.updateinfo.trace.dump(trace_out)
+            rpmkit.updateinfo.trace.disable()
 
 # vim:sw=4:ts=4:et:
@@ -9,88 +9,141 @@
 #
 from rpmkit.globals import _
 
+import rpmkit.rpmutils
+import rpmkit.updateinfo.base
+import rpmkit.updateinfo.cluster
+import rpmkit.updateinfo.engine
+import rpmkit.updateinfo.fingerprint
+import rpmkit.updateinfo.keywords
 import rpmkit.updateinfo.main as RUM
+import rpmkit.updateinfo.rpmlist
+import rpmkit.updateinfo.snapshot
+import rpmkit.updateinfo.store
+import rpmkit.updateinfo.trace
 import rpmkit.updateinfo.utils
 import rpmkit.utils as U
 
 # It looks available in EPEL for RHELs:
 #   https://apps.fedoraproject.org/packages/python-bunch
 import bunch
+import collections
 import glob
+import hashlib
 import itertools
 import logging
 import multiprocessing
+import multiprocessing.pool
 import operator
 import os
 import os.path
 import shutil
+import signal
+import time
+
+try:
+    from scandir import scandir  # The backport for python < 3.5.
+except ImportError:
+    scandir = getattr(os, "scandir", None)
 
 
 LOG = logging.getLogger("rpmkit.updateinfo")
 
+DELTA_FILE = "delta_from_base.json"
+
+# Number of threads to check RPM DBs of hosts, which is mostly I/O bound,
+# e.g. on NFS, and the interval to report progress of the scan.
+SCAN_WORKERS = 8
+SCAN_PROGRESS = 1000
 
-def hosts_rpmroot_g(hosts_datadir):
+
+def hostdirs_g(hosts_datadir):
+    """
+    :param hosts_datadir: Dir in which rpm db roots of hosts exist
+    :return: A generator to yield a tuple, (host_identity, host_dir)
+    """
+    if scandir is None:
+        for hostdir in glob.glob(os.path.join(hosts_datadir, '*')):
+            if os.path.isdir(hostdir):  # e.g. results of all hosts.
+                yield (os.path.basename(hostdir), hostdir)
+        return
+
+    for entry in scandir(hosts_datadir):
+        if not entry.name.startswith('.') and entry.is_dir():
+            yield (entry.name, entry.path)
+
+
+def _scan_hostdir(args):
+    """
+    :param args: A tuple of (host_identity, host_dir, readonly)
+    :return: A tuple of (host_identity, host_dir, True if RPM DB is
+        available, a list of (log level, message))
+    """
+    (hid, hostdir, readonly) = args
+    if rpmkit.updateinfo.rpmlist.find_rpm_list(hostdir):
+        return (hid, hostdir, True, [])
+
+    (ok, logs) = rpmkit.updateinfo.utils.scan_rpmdb_root(hostdir, readonly)
+    return (hid, hostdir, ok, logs)
+
+
+def hosts_rpmroot_g(hosts_datadir, readonly=True, workers=SCAN_WORKERS,
+                    progress=SCAN_PROGRESS):
     """
     List system names from assessment datadir.
 
     This function expects that assessment data (rpm db files) of each hosts are
     found under $host_identity/ in `datadir`, that is,
-    `datadir`/<host_identity>/var/lib/rpm/Packages exists. If rpm db file[s]
-    are not found for a host, that host will be simply ignored.
+    `datadir`/<host_identity>/var/lib/rpm/Packages exists, or lists of
+    installed RPMs instead, see :mod:`rpmkit.updateinfo.rpmlist`. If rpm db
+    file[s] are not found for a host, that host will be simply ignored.
 
     <host_identity> may be a hostname, host id, fqdn or something to
     identify that host.
 
+    RPM DBs of hosts are checked in `workers` threads and hosts are yielded
+    in the order found as soon as checked, so that callers can start to
+    analyze them before the scan ends.
+
     :param hosts_datadir: Dir in which rpm db roots of hosts exist
+    :param readonly: Drop write access perms of RPM DB files if True
+    :param workers: Number of threads to check RPM DBs of hosts
+    :param progress: Interval to report the number of hosts scanned or 0
     :return: A generator to yield a tuple,
         (host_identity, host_rpmroot or None)
     """
-    for hostdir in glob.glob(os.path.join(hosts_datadir, '*')):
-        if rpmkit.updateinfo.utils.check_rpmdb_root(hostdir):
-            yield (os.path.basename(hostdir), hostdir)
-        else:
-            LOG.warn(_("Failed to find RPM DBs under %s"), hostdir)
-            yield (os.path.basename(hostdir), None)
-
-
-def touch(filepath):
-    open(filepath, 'w').write()
+    args_g = ((hid, hdir, readonly) for hid, hdir
+              in hostdirs_g(hosts_datadir))
+    if workers > 1:
+        pool = multiprocessing.pool.ThreadPool(workers)
+        res_g = pool.imap(_scan_hostdir, args_g)
+    else:
+        pool = None
+        res_g = itertools.imap(_scan_hostdir, args_g)
 
+    count = 0
+    try:
+        for count, (hid, hostdir, ok, logs) in enumerate(res_g, 1):
+            for level, msg in logs:
+                LOG.log(level, msg)
 
-def prepare(hosts_datadir, workdir=None, repos=[], cachedir=None,
-            backend=RUM.DEFAULT_BACKEND, backends=RUM.BACKENDS):
-    """
-    Scan and collect hosts' basic data (installed rpms list, etc.).
+            if ok:
+                yield (hid, hostdir)
+            else:
+                LOG.warn(_("Failed to find RPM DBs under %s"), hostdir)
+                yield (hid, None)
 
-    :param hosts_datadir: Dir in which rpm db roots of hosts exist
-    :param workdir: Working dir to save results
-    :param repos: List of yum repos to get updateinfo data (errata and updtes)
-    :param cachedir: A dir to save metadata cache of yum repos
-    :param backend: Backend module to use to get updates and errata
-    :param backends: Backend list
+            if progress and count % progress == 0:
+                LOG.info(_("Scanned %d hosts in %s"), count, hosts_datadir)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
 
-    :return: A generator to yield a tuple,
-        (host_identity, host_rpmroot or None)
-    """
-    if workdir is None:
-        LOG.info(_("Set workdir to hosts_datadir: %s"), hosts_datadir)
-        workdir = hosts_datadir
-    else:
-        if not os.path.exists(workdir):
-            LOG.debug(_("Creating working dir: %s"), workdir)
-            os.makedirs(workdir)
+    LOG.info(_("Found %d hosts in %s"), count, hosts_datadir)
 
-    for h, root in hosts_rpmroot_g(hosts_datadir):
-        hworkdir = os.path.join(workdir, h)
-        if not hworkdir:
-            os.makedirs(hworkdir)
 
-        if root is None:
-            touch(os.path.join(hworkdir, "RPMDB_NOT_AVAILABLE"))
-            yield bunch.bunchify(dict(id=h, workdir=hworkdir, available=False))
-        else:
-            yield RUM.prepare(root, hworkdir, repos, h, cachedir, backend,
-                              backends)
+def touch(filepath):
+    open(filepath, 'w').close()
 
 
 def p2nevra(p):
@@ -106,6 +159,9 @@ def add_host_to_metadata(workdir, host):
 
     shutil.copy2(metadatafile, metadatafile + ".save")
     metadata = U.json_load(metadatafile)
+    if host in metadata["hosts"]:  # Added in the last run.
+        return
+
     metadata["hosts"].append(host)
     U.json_dump(metadata, metadatafile)
 
@@ -122,25 +178,520 @@ def mk_symlinks_to_results_of_ref_host(href, hsrest):
     for h in hsrest:
         os.chdir(h.workdir)
         href_workdir = os.path.join('..', href.id)  # TODO: Keep consistency.
+        owns = (os.path.basename(RUM.rpm_list_path(h.workdir)), DELTA_FILE)
         LOG.info(_("%s: Make symlinks to results in %s/"), h.id, href_workdir)
         for src in glob.glob(os.path.join(href_workdir, '*.*')):
             dst = os.path.basename(src)
-            if not os.path.exists(dst):
-                LOG.debug("Make a symlink to %s", src)
-                os.symlink(src, dst)
+            if dst in owns:
+                continue
+
+            if os.path.lexists(dst):  # Results made in the last run.
+                os.remove(dst)
+
+            LOG.debug("Make a symlink to %s", src)
+            os.symlink(src, dst)
 
         add_host_to_metadata(href_workdir, h.id)
         os.chdir(orgdir)
 
 
+def cleanup_links(hworkdir):
+    """
+    Remove symlinks to results of other hosts and differences from them made
+    in the last run, not to overwrite results of others through symlinks.
+
+    :param hworkdir: Working dir to save results of the host
+    """
+    for path in glob.glob(os.path.join(hworkdir, '*')):
+        if os.path.islink(path) or os.path.basename(path) == DELTA_FILE:
+            os.remove(path)
+
+
 def analyze(args):
-    RUM.analyze(*args)
+    (args, kwargs) = args
+    RUM.analyze(*args, **kwargs)
+
+
+class AnalysisTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise AnalysisTimeout()
+
+
+def installed_nevras_g(root):
+    """
+    List NEVRAs of installed RPMs straight from the RPM DB or the RPM list
+    without initializing any backends.
+
+    :param root: RPM DB root of the host or dir having the list of installed
+        RPMs, see :function:`rpmkit.updateinfo.rpmlist.find_rpm_list`
+    :return: A generator yields NEVRA tuples of RPMs installed in the host
+    """
+    rlist = rpmkit.updateinfo.rpmlist.find_rpm_list(root)
+    if rlist:
+        return (p2nevra(p) for p in rpmkit.updateinfo.rpmlist.load(rlist))
+
+    return rpmkit.rpmutils.rpmdb_tag_values_g(root, ("name", "epoch",
+                                                     "version", "release",
+                                                     "arch"))
+
+
+def installed_rpms_key(nevras):
+    """
+    :param nevras: An iterable of NEVRA tuples of installed RPMs of a host
+    :return: A str identifies the set of installed RPMs of the host
+
+    >>> (installed_rpms_key([("a", None, "1", "1", "noarch")]) ==
+    ...  installed_rpms_key([("a", 0, "1", "1", "noarch")]))
+    True
+    """
+    nevras = sorted((n, str(e or 0), v, r, a) for n, e, v, r, a in nevras)
+    return hashlib.sha1(repr(nevras)).hexdigest()
+
+
+def host_fingerprint(root, repos, cachedir, installed_key, prepare_args,
+                     analyze_args=(), analyze_kwargs={}):
+    """
+    :param root: RPM DB root of the host
+    :param repos: List of yum repos of the host
+    :param cachedir: A dir holding metadata cache of yum repos or None
+    :param installed_key: A str identifies the set of installed RPMs of the
+        host
+    :return: A str of the fingerprint of the host or None, see
+        :function:`rpmkit.updateinfo.fingerprint.fingerprint`
+    """
+    # Same as the default of rpmkit.updateinfo.base.Base.
+    cachedir = cachedir or os.path.join(root, "var/cache")
+    # Neither of the store and the number of workers changes results.
+    params = (prepare_args[:3], analyze_args,
+              sorted((k, v) for k, v in analyze_kwargs.items()
+                     if k not in ("store", "workers")))
+
+    return rpmkit.updateinfo.fingerprint.fingerprint(installed_key, repos,
+                                                     cachedir, params)
+
+
+def analyze_host(hid, root, workdir, prepare_args, analyze_args=(),
+                 analyze_kwargs={}, timeout=0, claims=None,
+                 prev_fingerprint=None):
+    """
+    Initialize backend for a host, and analyze it. This is run in a worker
+    process in parallel mode and any errors are not propagated to callers so
+    that failures of some hosts do not affect others. Hosts having same
+    installed RPMs as other one's or not changed since the last run are
+    skipped before backends are initialized.
+
+    :param hid: Host identity
+    :param root: RPM DB root of the host
+    :param workdir: Working dir to save results of the host
+    :param prepare_args: Arguments passed to :function:`RUM.prepare`: repos,
+        cachedir, backend, backends and readonly
+    :param analyze_args: Arguments passed to :function:`RUM.analyze`
+    :param analyze_kwargs: Keyword arguments passed to the above
+    :param timeout: Timeout in seconds to prepare and analyze the host or 0
+    :param claims: A dict or dict proxy :: {installed_rpms_key: host_id} to
+        skip analysis of hosts having same installed RPMs as other one's
+    :param prev_fingerprint: Fingerprint of the host saved in the last run
+        to skip analysis of the host if it's not changed, or None
+
+    :return: A dict represents the result: id, workdir, status ('ok',
+        'unchanged', 'same', 'unavailable', 'timeout' or 'failed'), same_as,
+        error, fingerprint, elapsed, trace (events traced if tracing is
+        enabled) and keywords (keywords newly found in errata)
+    """
+    res = dict(id=hid, workdir=workdir, status="ok", same_as=None,
+               error=None, fingerprint=None)
+    start = time.time()
+
+    # Events traced in worker processes are passed back with results.
+    tstart = len(rpmkit.updateinfo.trace.events())
+
+    if timeout:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(timeout)
+    try:
+        with rpmkit.updateinfo.trace.phase("analyze_host", host=hid):
+            (repos, cachedir, backend, backends, readonly) = prepare_args
+            with rpmkit.updateinfo.trace.phase("installed_key", host=hid):
+                key = installed_rpms_key(installed_nevras_g(root))
+
+            ref = hid if claims is None else claims.setdefault(key, hid)
+            if ref == hid:
+                hrepos = repos or \
+                    rpmkit.updateinfo.utils.guess_rhel_repos(root)
+                fpr = host_fingerprint(root, hrepos, cachedir, key,
+                                       prepare_args, analyze_args,
+                                       analyze_kwargs)
+                if fpr and fpr == prev_fingerprint and \
+                        os.path.exists(os.path.join(workdir, "summary.json")):
+                    LOG.info(_("%s: Not changed since the last run"), hid)
+                    res.update(status="unchanged", fingerprint=fpr)
+                else:
+                    host = RUM.prepare(root, workdir, hrepos, hid, cachedir,
+                                       backend, backends, readonly=readonly)
+                    if host.available:
+                        # The keywords cache is saved once by the caller.
+                        RUM.analyze(host, *analyze_args, save_keywords=False,
+                                    **analyze_kwargs)
+                        res["fingerprint"] = fpr
+                    else:
+                        res["status"] = "unavailable"
+            else:
+                res.update(status="same", same_as=ref)
+
+    except AnalysisTimeout:
+        LOG.error(_("%s: Timed out (%d sec)"), hid, timeout)
+        res.update(status="timeout", error="Timed out")
+
+    except Exception as exc:
+        LOG.exception(_("%s: Failed to analyze: %s"), hid, str(exc))
+        res.update(status="failed", error=str(exc))
+
+    finally:
+        if timeout:
+            signal.alarm(0)
+
+    res["elapsed"] = time.time() - start
+    res["trace"] = rpmkit.updateinfo.trace.take(tstart)
+    res["keywords"] = rpmkit.updateinfo.keywords.take_new_hits()
+    return res
+
+
+def _analyze_host(args):
+    """Wrapper of :function:`analyze_host` for multiprocessing.Pool.
+    """
+    rpmkit.updateinfo.trace.take()  # Drop events copied from the parent.
+    res = analyze_host(*args)
+
+    rpmkit.updateinfo.trace.label(args[0])  # Each host in each process.
+    res["trace"].extend(rpmkit.updateinfo.trace.take())
+    return res
+
+
+def preload_repometa(hosts, repos, cachedir, bcls):
+    """
+    Load repo metadata of hosts in advance in the parent process so that
+    worker processes forked later share it instead of loading it for each
+    host.
+
+    :param hosts: A list of (host_identity, host_rpmroot, host_workdir)
+    :param repos: List of yum repos or [] (guess repos from RPM DBs)
+    :param cachedir: A dir holding metadata cache of yum repos
+    :param bcls: Backend class uses repo metadata
+    """
+    for hid, root, _hworkdir in hosts:
+        try:
+            hrepos = repos or rpmkit.updateinfo.utils.guess_rhel_repos(root)
+            bcls(root, hrepos, cachedir=cachedir).index()
+        except Exception as exc:
+            LOG.warn(_("%s: Failed to load repo metadata: %s"), hid,
+                     str(exc))
+
+
+def _installed_nevras(args):
+    """
+    :param args: A tuple of (host_identity, host_rpmroot, host_workdir,
+        repos, cachedir, backend class)
+    :return: A tuple of (host_identity, repos of the host, a frozenset of
+        NEVRAs of installed RPMs or None if failed to list them)
+    """
+    (hid, root, hworkdir, repos, cachedir, bcls) = args
+    try:
+        hrepos = repos or rpmkit.updateinfo.utils.guess_rhel_repos(root)
+        ips = sorted(bcls(root, hrepos, cachedir=cachedir).list_installed(),
+                     key=operator.itemgetter(*RUM.NEVRA_KEYS))
+        U.json_dump(dict(data=ips, ), RUM.rpm_list_path(hworkdir))
+        return (hid, hrepos, frozenset(rpmkit.updateinfo.snapshot.nevra_key(p)
+                                       for p in ips))
+    except Exception as exc:
+        LOG.warn(_("%s: Failed to list installed RPMs: %s"), hid, str(exc))
+        return (hid, repos, None)
+
+
+def cluster_hosts(hosts, repos, cachedir, bcls, max_delta, jobs=1):
+    """
+    Cluster hosts of same repos by similarity of their installed RPMs.
+
+    :param hosts: A list of (host_identity, host_rpmroot, host_workdir)
+    :param repos: List of yum repos or [] (guess repos from RPM DBs)
+    :param cachedir: A dir holding metadata cache of yum repos
+    :param bcls: Backend class uses repo metadata
+    :param max_delta: Max number of NEVRAs differ between hosts in a cluster
+    :param jobs: Max number of processes to list installed RPMs
+
+    :return: A tuple of (a list of hosts to analyze fully, a list of (host,
+        host_identity of its representative, NEVRAs of the host, NEVRAs of
+        the representative, repos of the host))
+    """
+    args = [(hid, root, hworkdir, repos, cachedir, bcls) for hid, root,
+            hworkdir in hosts]
+    if jobs > 1:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            ins = pool.map(_installed_nevras, args)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        ins = [_installed_nevras(a) for a in args]
+
+    groups = collections.defaultdict(list)
+    hrepos = dict()
+    for hid, hrs, nevras in ins:
+        if nevras is not None:  # It will be analyzed fully and fail.
+            groups[tuple(sorted(hrs))].append((hid, nevras))
+            hrepos[hid] = hrs
+
+    refs = dict()
+    nmap = dict()
+    for hs in groups.values():
+        nmap.update(hs)
+        for hid, ref in rpmkit.updateinfo.cluster.cluster(hs, max_delta):
+            if ref is not None:
+                refs[hid] = ref
+
+    return ([h for h in hosts if h[0] not in refs],
+            [(h, refs[h[0]], nmap[h[0]], nmap[refs[h[0]]], hrepos[h[0]])
+             for h in hosts if h[0] in refs])
+
+
+class DeltaBase(rpmkit.updateinfo.base.Base):
+    """
+    Backend gives installed RPMs, errata and update RPMs of a host computed
+    from differences from other host already, see :function:`analyze_delta`.
+    """
+    name = "rpmkit.updateinfo.multihosts.delta"
+
+    def __init__(self, root, repos, installed, errata, updates, **kwargs):
+        """
+        :param installed: A list of installed RPMs
+        :param errata: A list of applicable errata
+        :param updates: A list of update RPMs
+        """
+        super(DeltaBase, self).__init__(root, repos, **kwargs)
+        self._packages.update(installed=installed, errata=errata,
+                              updates=updates)
+
+    def list_installed_impl(self, **kwargs):
+        return []
+
+    def list_updates_impl(self, **kwargs):
+        return []
+
+    def list_errata_impl(self, **kwargs):
+        return []
+
+
+def analyze_delta(hid, root, hworkdir, repos, ref, nevras, ref_nevras,
+                  ref_applicables, index, analyze_args=(), analyze_kwargs={}):
+    """
+    Analyze a host by applying differences of its installed RPMs from the ones
+    of the representative of its cluster to the applicable errata and update
+    RPMs of the representative, and save results and the differences.
+
+    :param hid: Host identity
+    :param root: RPM DB root of the host
+    :param hworkdir: Working dir to save results of the host, which has the
+        list of installed RPMs saved by :function:`cluster_hosts`
+    :param repos: List of yum repos of the host
+    :param ref: Host identity of the representative
+    :param nevras: A frozenset of NEVRAs installed in the host
+    :param ref_nevras: A frozenset of NEVRAs installed in the representative
+    :param ref_applicables: Applicable errata and update RPMs of the
+        representative :function:`rpmkit.updateinfo.engine.applicable_by_na`
+        returns
+    :param index: A rpmkit.updateinfo.engine.Index object of repos
+    :param analyze_args: Arguments passed to :function:`RUM.analyze`
+    :param analyze_kwargs: Keyword arguments passed to the above
+
+    :return: A dict of differences
+    """
+    (es, us) = rpmkit.updateinfo.engine.applicable_delta(nevras,
+                                                         nevras ^ ref_nevras,
+                                                         ref_applicables,
+                                                         index)
+    advs = set(e["advisory"] for e in es)
+    radvs = set(index.errata[i]["advisory"] for eidxs, _u
+                in ref_applicables.values() for i in eidxs)
+    (us, rus) = (set(us), set(u for _e, u in ref_applicables.values()
+                              if u is not None))
+
+    data = dict(base=ref,
+                installed=dict(added=sorted(nevras - ref_nevras),
+                               removed=sorted(ref_nevras - nevras)),
+                errata=dict(added=sorted(advs - radvs),
+                            removed=sorted(radvs - advs)),
+                updates=dict(added=sorted(us - rus),
+                             removed=sorted(rus - us)))
+    U.json_dump(data, os.path.join(hworkdir, DELTA_FILE))
+
+    ips = U.json_load(RUM.rpm_list_path(hworkdir))["data"]
+    # Copy errata shared among hosts as host specific data is added.
+    base = DeltaBase(root, repos, ips, [dict(e) for e in es],
+                     [rpmkit.updateinfo.base.NEVRA(n, v, r, a, e) for
+                      n, e, v, r, a in sorted(us)], workdir=hworkdir)
+    host = bunch.bunchify(dict(id=hid, root=root, workdir=hworkdir,
+                               repos=repos, available=True, installed=ips))
+    host.base = base
+
+    # The keywords cache is saved once by the caller.
+    RUM.analyze(host, *analyze_args, save_keywords=False, **analyze_kwargs)
+    return data
+
+
+def _cve_cvss_map(workdir):
+    """
+    :param workdir: Working dir having results of a host analyzed
+    :return: A dict :: {cve: cve_and_cvss_data} of CVEs of errata of the host
+        to complement CVEs of errata of other hosts without fetching them
+    """
+    es = rpmkit.updateinfo.store.load(RUM.errata_list_path(workdir))["data"]
+    return dict((cve.get("id", cve.get("cve")), cve) for e in es for cve
+                in e.get("cves", []) if "score" in cve)
+
+
+def analyze_deltas_g(deltas, results, cachedir, bcls, analyze_args=(),
+                     analyze_kwargs={}):
+    """
+    Analyze hosts by differences from representatives of their clusters.
+    Applicable errata and update RPMs of each representative are computed
+    only once and the index of repos is looked up only for RPMs differ.
+
+    :param deltas: A list of (host, host_identity of its representative,
+        NEVRAs of the host, NEVRAs of the representative, repos of the host),
+        see :function:`cluster_hosts`
+    :param results: A dict :: {host_id: result} of representatives analyzed
+    :param cachedir: A dir holding metadata cache of yum repos
+    :param bcls: Backend class uses repo metadata
+    :param analyze_args: Arguments passed to :function:`RUM.analyze`
+    :param analyze_kwargs: Keyword arguments passed to the above
+
+    :return: A generator yields results, see :function:`analyze_host`
+    """
+    indexes = dict()  # {repos: index}
+    refs = dict()  # {ref: (applicables, cve_cvss_map)}
+    for (hid, root, hworkdir), ref, nevras, ref_nevras, hrepos in deltas:
+        res = dict(id=hid, workdir=hworkdir, status="delta", same_as=ref,
+                   error=None, fingerprint=None)
+        start = time.time()
+        if nevras == ref_nevras:
+            res["status"] = "same"
+        elif results[ref]["status"] in ("ok", "unchanged", "same"):
+            try:
+                with rpmkit.updateinfo.trace.phase("analyze_delta",
+                                                   host=hid):
+                    rkey = tuple(sorted(hrepos))
+                    if rkey not in indexes:
+                        indexes[rkey] = bcls(root, hrepos,
+                                             cachedir=cachedir).index()
+                    index = indexes[rkey]
+
+                    if ref not in refs:
+                        apps = rpmkit.updateinfo.engine.applicable_by_na(
+                            ref_nevras, index)
+                        # Results of the host the representative is same as.
+                        rwd = results[results[ref]["same_as"] or
+                                      ref]["workdir"]
+                        refs[ref] = (apps, _cve_cvss_map(rwd)
+                                     if analyze_args[0] > 0 else None)
+                    (apps, cmap) = refs[ref]
+
+                    analyze_delta(hid, root, hworkdir, hrepos, ref, nevras,
+                                  ref_nevras, apps, index, analyze_args,
+                                  dict(analyze_kwargs, cve_cvss_map=cmap))
+            except Exception as exc:
+                LOG.exception(_("%s: Failed to analyze: %s"), hid, str(exc))
+                res.update(status="failed", error=str(exc))
+
+        res["elapsed"] = time.time() - start
+        yield res
+
+
+# Time in seconds to wait for workers more than per-host timeout.
+_TIMEOUT_GRACE = 60
+_MAX_WAIT = 60 * 60 * 24 * 365
+
+
+def analyze_hosts_g(hosts, prepare_args, analyze_args, analyze_kwargs,
+                    jobs=1, timeout=0, fingerprints={}):
+    """
+    Analyze hosts one by one or in parallel with `jobs` worker processes. Each
+    worker process is created for each host and initialize its own backend
+    after fork, that is, no backend objects are shared among processes.
+
+    :param hosts: A list or an iterable of (host_identity, host_rpmroot,
+        host_workdir)
+    :param jobs: Max number of worker processes
+    :param timeout: Timeout in seconds to analyze each host or 0
+    :param fingerprints: A dict :: {host_id: fingerprint} saved in the last
+        run to skip analysis of hosts not changed
+    :return: A generator yields results, see :function:`analyze_host`
+    """
+    if jobs <= 1:
+        claims = dict()
+        for hid, root, hworkdir in hosts:
+            yield analyze_host(hid, root, hworkdir, prepare_args,
+                               analyze_args, analyze_kwargs, timeout, claims,
+                               fingerprints.get(hid))
+        return
+
+    mgr = multiprocessing.Manager()
+    claims = mgr.dict()
+    pool = multiprocessing.Pool(jobs, maxtasksperchild=1)
+    hung = False
+    try:
+        ars = [(hid, hworkdir,
+                pool.apply_async(_analyze_host,
+                                 ((hid, root, hworkdir, prepare_args,
+                                   analyze_args, analyze_kwargs, timeout,
+                                   claims, fingerprints.get(hid)), )))
+               for hid, root, hworkdir in hosts]
+
+        for hid, hworkdir, ar in ars:
+            try:
+                yield ar.get(timeout + _TIMEOUT_GRACE if timeout
+                             else _MAX_WAIT)
+            except multiprocessing.TimeoutError:
+                LOG.error(_("%s: Worker did not respond"), hid)
+                hung = True
+                yield dict(id=hid, workdir=hworkdir, status="timeout",
+                           same_as=None, error="Worker did not respond",
+                           fingerprint=None, elapsed=None)
+    finally:
+        if hung:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+        mgr.shutdown()
+
+
+def _hosts_g(hosts_datadir, workdir, readonly=True):
+    """
+    :return: A generator to yield a tuple of (host_identity, host_rpmroot,
+        host_workdir) of hosts of which RPM DBs are available
+    """
+    for hid, root in hosts_rpmroot_g(hosts_datadir, readonly):
+        hworkdir = os.path.join(workdir, hid)
+        if not os.path.exists(hworkdir):
+            os.makedirs(hworkdir)
+
+        if root is None:
+            touch(os.path.join(hworkdir, "RPMDB_NOT_AVAILABLE"))
+        else:
+            cleanup_links(hworkdir)
+            yield (hid, root, hworkdir)
 
 
 def main(hosts_datadir, workdir=None, repos=[], score=-1,
          keywords=RUM.ERRATA_KEYWORDS, rpms=[], period=(), cachedir=None,
          refdir=None, verbosity=0, multiproc=False,
-         backend=RUM.DEFAULT_BACKEND, backends=RUM.BACKENDS):
+         backend=RUM.DEFAULT_BACKEND, backends=RUM.BACKENDS,
+         fmt=RUM.DEFAULT_FORMAT, details=True, jobs=1, timeout=0,
+         monthly=False, trace_out=None, force=False, max_delta=0,
+         readonly=True, workers=1):
     """
     :param hosts_datadir: Dir in which rpm db roots of hosts exist
     :param workdir: Working dir to save results
@@ -149,49 +700,132 @@ def main(hosts_datadir, workdir=None, repos=[], score=-1,
     :param keywords: Keyword list to filter 'important' RHBAs
     :param rpms: Core RPMs to filter errata by them
     :param period: Period of errata in format of YYYY[-MM[-DD]],
-        ex. ("2014-10-01", "2014-11-01")
+        ex. ("2014-10-01", "2014-11-01"), or a list of periods
     :param cachedir: A dir to save metadata cache of yum repos
     :param refdir: A dir holding reference data previously generated to
         compute delta (updates since that data)
     :param verbosity: Verbosity level: 0 (default), 1 (verbose), 2 (debug)
-    :param multiproc: Utilize multiprocessing module to compute results
-        in parallel as much as possible if True
+    :param multiproc: Same as jobs=<number of CPUs> if True and `jobs` is 1
     :param backend: Backend module to use to get updates and errata
     :param backends: Backend list
+    :param fmt: Output format of results, see `RUM.FORMATS`
+    :param details: Dump errata details also if True
+    :param jobs: Max number of hosts analyzed in parallel
+    :param timeout: Timeout in seconds to analyze each host or 0 (no timeout)
+    :param monthly: Split periods into months if True
+    :param trace_out: Path to save the trace of phases of all hosts in Chrome
+        trace format or None (do not trace)
+    :param force: Analyze all hosts even if hosts are not changed since the
+        last run
+    :param max_delta: Analyze only one host fully in each cluster of hosts
+        of which installed RPMs differ by `max_delta` NEVRAs at most and
+        analyze others by differences from it, if > 0 and backend uses repo
+        metadata
+    :param readonly: Drop write access perms of RPM DB files of hosts if True
+    :param workers: Number of threads to fetch CVE data of errata of each host
     """
     RUM.set_loglevel(verbosity)
 
-    all_hosts = list(prepare(hosts_datadir, workdir, repos, cachedir, backend,
-                             backends))
-    hosts = [h for h in all_hosts if h.available]
-
-    LOG.info(_("Analyze %d/%d hosts"), len(hosts), len(all_hosts))
-
-    ilen = lambda h: len(h.installed)
-    hps = lambda h: [p2nevra(p) for p in h.installed]
-    gby = lambda xs, kf: itertools.groupby(sorted(xs, key=kf), kf)
-
-    # Group hosts by installed rpms to degenerate these hosts and avoid to
-    # analyze for same installed RPMs more than once. his :: [[[h]]]
-    his = [[list(g2) for _k2, g2 in gby(g, hps)] for _k, g in gby(hosts, ilen)]
-
-    for hss in his:
-        hset = [(hs[0], hs[1:]) for hs in hss]
-        hsdata = [(h, score, keywords, rpms, period, refdir) for h, _hrest
-                  in hset]
-
-        # Disabled until fixing bugs:
-        # if multiproc:
-        #    pool = multiprocessing.Pool(multiprocessing.cpu_count())
-        #    pool.map(analyze, hsdata)
-        for args in hsdata:
-            analyze(args)
-
-        for h, hsrest in hset:
-            if hsrest:
-                LOG.info(_("Skip to analyze %s as its installed RPMs are "
-                           "exactly same as %s's"),
-                         ','.join(x.id for x in hsrest), h)
-                mk_symlinks_to_results_of_ref_host(h, hsrest)
+    if trace_out:
+        rpmkit.updateinfo.trace.enable()
+
+    try:
+        if workdir is None:
+            LOG.info(_("Set workdir to hosts_datadir: %s"), hosts_datadir)
+            workdir = hosts_datadir
+
+        if multiproc and jobs <= 1:
+            jobs = multiprocessing.cpu_count()
+
+        hosts = _hosts_g(hosts_datadir, workdir, readonly)
+
+        # Errata are shared among hosts and saved only once in this store.
+        sdir = os.path.join(workdir, rpmkit.updateinfo.store.STORE_DIRNAME)
+        store = rpmkit.updateinfo.store.ErrataStore(sdir)
+
+        # Repo metadata is shared only if the cache dir is shared among hosts.
+        bcls = RUM.get_backend(backend, backends=backends)
+        deltas = []
+        if getattr(bcls, "uses_repometa", False) and cachedir:
+            # All hosts are needed in advance.
+            hosts = list(hosts)
+            with rpmkit.updateinfo.trace.phase("preload_repometa"):
+                preload_repometa(hosts, repos, cachedir, bcls)
+
+            if max_delta > 0:
+                with rpmkit.updateinfo.trace.phase("cluster_hosts"):
+                    (hosts, deltas) = cluster_hosts(hosts, repos, cachedir,
+                                                    bcls, max_delta, jobs)
+                LOG.info(_("Analyze %d hosts fully and %d hosts by "
+                           "differences from them"), len(hosts), len(deltas))
+
+        prepare_args = (repos, cachedir, backend, backends, readonly)
+        analyze_args = (score, keywords, rpms, period, refdir)
+        analyze_kwargs = dict(fmt=fmt, details=details, store=store,
+                              monthly=monthly, workers=workers)
+
+        # Worker processes share the keywords cache loaded before forked.
+        kcache = cachedir and \
+            os.path.join(cachedir, rpmkit.updateinfo.keywords.CACHE_FILE)
+        if kcache:
+            rpmkit.updateinfo.keywords.load_cache(kcache)
+
+        LOG.info(_("Analyze hosts with %d job[s]"), jobs)
+        if force:
+            fprs = dict()
+        else:
+            fprs = rpmkit.updateinfo.fingerprint.load_index(workdir)
+
+        results = list(analyze_hosts_g(hosts, prepare_args, analyze_args,
+                                       analyze_kwargs, jobs, timeout, fprs))
+        for res in results:
+            rpmkit.updateinfo.trace.add(res.pop("trace", []))
+            rpmkit.updateinfo.keywords.add_hits(res.pop("keywords", {}))
+
+        rmap = dict((r["id"], r) for r in results)
+        results.extend(analyze_deltas_g(deltas, rmap, cachedir, bcls,
+                                        analyze_args, analyze_kwargs))
+
+        # Hosts having same or similar installed RPMs as other one's were not
+        # analyzed fully.
+        for res in results:
+            if res["status"] not in ("same", "delta"):
+                continue
+
+            ref = rmap[res["same_as"]]
+            if ref["status"] in ("ok", "unchanged", "same"):
+                if res["status"] == "same":
+                    LOG.info(_("Skipped to analyze %s as its installed RPMs "
+                               "are exactly same as %s's"), res["id"],
+                             ref["id"])
+                    mk_symlinks_to_results_of_ref_host(bunch.bunchify(ref),
+                                                       [bunch.bunchify(res)])
+                else:
+                    LOG.info(_("Analyzed %s by differences from %s"),
+                             res["id"], ref["id"])
+            else:
+                res.update(status="failed",
+                           error="Failed to analyze %s having same installed "
+                                 "RPMs" % ref["id"])
+
+        counts = collections.Counter(r["status"] for r in results)
+        LOG.info(_("Analyzed %d hosts: %s"), len(results),
+                 ", ".join("%s=%d" % sc for sc in sorted(counts.items())))
+        U.json_dump(dict(data=results, counts=counts),
+                    os.path.join(workdir, "hosts.json"))
+
+        # Hosts failed to analyze are analyzed again in the next run.
+        fprs = dict((r["id"], r["fingerprint"]) for r in results
+                    if r["status"] in ("ok", "unchanged") and r["fingerprint"])
+        rpmkit.updateinfo.fingerprint.save_index(workdir, fprs)
+
+        if kcache:
+            rpmkit.updateinfo.keywords.save_cache(kcache)
+
+        return results
+    finally:
+        if trace_out:
+            rpmkit.updateinfo.trace.dump(trace_out)
+            rpmkit.updateinfo.trace.disable()
 
 # vim:sw=4:ts=4:et:
@@ -0,0 +1,70 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Backend to get errata and updates from plain local repodata files.
+
+Repos are given as dirs holding repodata/repomd.xml and the files referred
+from it, e.g. mirrors of repos or metadata downloaded with reposync, instead
+of yum or dnf repo IDs. Relative dirs are looked up in the cache dir first
+and then in the current dir.
+
+Metadata files, updateinfo.xml and primary.xml, are decompressed and parsed
+incrementally with rpmkit.updateinfo.repometa, so that memory usage to parse
+them is bounded even if they are huge, and errata and updates applicable are
+computed with rpmkit.updateinfo.engine.
+"""
+from __future__ import absolute_import
+
+import logging
+import os.path
+
+import rpmkit.updateinfo.engine
+import rpmkit.updateinfo.repometa
+from rpmkit.globals import _
+
+
+LOG = logging.getLogger(__name__)
+
+
+def find_repodir(repo, cachedir):
+    """
+    :param repo: Path to the dir of the repo
+    :param cachedir: Dir to look up `repo` in first if it's relative path
+    :return: Absolute path of the dir of the repo or None if not found
+
+    >>> find_repodir("/not/exist", "/tmp") is None
+    True
+    """
+    if os.path.isabs(repo):
+        rdirs = [repo]
+    else:
+        rdirs = [os.path.join(cachedir, repo), os.path.abspath(repo)]
+
+    for rdir in rdirs:
+        if rpmkit.updateinfo.repometa.repomd_files(rdir):
+            return os.path.normpath(rdir)
+
+    return None
+
+
+class Base(rpmkit.updateinfo.engine.Base):
+    name = "rpmkit.updateinfo.repodata"
+
+    def index(self):
+        if self._index is None:
+            rdirs = []
+            for repo in self.repos:
+                rdir = find_repodir(repo, self._cachedir)
+                if rdir is None:
+                    LOG.warn(_("Repodata of %s not found"), repo)
+                else:
+                    rdirs.append(rdir)
+
+            rmd = rpmkit.updateinfo.repometa.load(rdirs, self._cachedir)
+            self._index = rpmkit.updateinfo.engine.get_index(rmd)
+
+        return self._index
+
+# vim:sw=4:ts=4:et:
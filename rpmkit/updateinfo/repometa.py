@@ -0,0 +1,348 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Repo metadata (updateinfo and primary) loaded once and shared among hosts.
+
+Metadata files of repos are parsed incrementally with iterparse and loaded
+into an index, RepoMetadata object, only once for each set of repos in a
+process. The index is never modified after it's made, so that worker
+processes forked after loading it share it with the parent process by
+copy-on-write.
+"""
+from __future__ import absolute_import
+
+import bz2
+import collections
+import contextlib
+import glob
+import gzip
+import hashlib
+import logging
+import os.path
+import threading
+
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+import rpmkit.updateinfo.base
+import rpmkit.updateinfo.trace
+import rpmkit.updateinfo.utils
+from rpmkit.globals import _
+
+
+LOG = logging.getLogger(__name__)
+
+_REGISTRY = dict()
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _open(path):
+    """
+    Open a metadata file which may be compressed. Compressed files are
+    decompressed incrementally while reading.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rb')
+    elif path.endswith(".bz2"):
+        return bz2.BZ2File(path, 'rb')
+    elif path.endswith(".xz"):
+        if lzma is None:
+            raise IOError("Python lzma module is needed to read " + path)
+        return contextlib.closing(lzma.LZMAFile(path, 'rb'))
+    else:
+        return open(path, 'rb')
+
+
+def _localname(tag):
+    """
+    >>> _localname("{http://linux.duke.edu/metadata/common}package")
+    'package'
+    >>> _localname("update")
+    'update'
+    """
+    return tag.rsplit('}', 1)[-1]
+
+
+def _find(elem, name):
+    """Find the child element `name` ignoring XML namespaces.
+    """
+    for child in elem:
+        if _localname(child.tag) == name:
+            return child
+
+    return None
+
+
+def _findattr(elem, name, attr, default=''):
+    child = _find(elem, name)
+    return default if child is None else child.get(attr, default)
+
+
+def _findtext(elem, name, default=''):
+    child = _find(elem, name)
+    if child is None or child.text is None:
+        return default
+
+    return child.text.strip()
+
+
+def iterparse_g(path, name):
+    """
+    Parse XML file incrementally and yield elements of `name`. Elements
+    yielded are cleared after used so that memory usage is bounded even if
+    the file is huge.
+
+    :param path: XML file path, may be compressed with gzip, bzip2 or xz
+    :param name: Local name of elements to yield
+    """
+    with _open(path) as inp:
+        itr = ET.iterparse(inp, events=("start", "end"))
+        (_event, root) = next(itr)
+        for event, elem in itr:
+            if event == "end" and _localname(elem.tag) == name:
+                yield elem
+                root.clear()
+
+
+def _update_to_errata(elem):
+    """
+    :param elem: An 'update' element in updateinfo.xml
+    :return: An errata dict like the one yumbase makes
+    """
+    advisory = _findtext(elem, "id")
+    errata = dict(advisory=advisory, synopsis=_findtext(elem, "title"),
+                  description=_findtext(elem, "description"),
+                  update_date=_findattr(elem, "updated", "date"),
+                  issue_date=_findattr(elem, "issued", "date"),
+                  solution=_findtext(elem, "solution"),
+                  type=elem.get("type", "N/A"),
+                  severity=_findtext(elem, "severity", "N/A"))
+
+    refs = _find(elem, "references")
+    refs = [] if refs is None else list(refs)
+    errata["bzs"] = [dict(id=r.get("id"), title=r.get("title"),
+                          summary=r.get("title"), href=r.get("href"),
+                          url=r.get("href")) for r in refs
+                     if r.get("type") == "bugzilla"]
+    errata["cves"] = [dict(id=r.get("id"), cve=r.get("id"),
+                           title=r.get("title"), href=r.get("href"),
+                           url=r.get("href")) for r in refs
+                      if r.get("type") == "cve"]
+
+    errata["packages"] = [rpmkit.updateinfo.base.NEVRA(p.get("name"),
+                                                       p.get("version"),
+                                                       p.get("release"),
+                                                       p.get("arch"),
+                                                       p.get("epoch", '0'))
+                          for p in elem.iter()
+                          if _localname(p.tag) == "package"]
+    errata["package_names"] = ','.join(sorted(set(p["name"] for p
+                                                  in errata["packages"])))
+
+    if rpmkit.updateinfo.utils.RHERRATA_RE.match(advisory):
+        errata["url"] = rpmkit.updateinfo.utils.errata_url(str(advisory))
+    else:
+        errata["url"] = ''
+
+    return errata
+
+
+def updateinfo_g(path):
+    """
+    :param path: Path to updateinfo.xml[.gz]
+    :return: A generator yields errata dicts
+    """
+    for elem in iterparse_g(path, "update"):
+        yield _update_to_errata(elem)
+
+
+def primary_g(path):
+    """
+    :param path: Path to primary.xml[.gz]
+    :return: A generator yields (name, epoch, version, release, arch) of
+        packages
+    """
+    for elem in iterparse_g(path, "package"):
+        ver = _find(elem, "version")
+        yield (_findtext(elem, "name"), ver.get("epoch", '0'),
+               ver.get("ver"), ver.get("rel"), _findtext(elem, "arch"))
+
+
+def find_repomd(repodir):
+    """
+    :param repodir: Dir holding repomd.xml or repodata/repomd.xml
+    :return: Path to repomd.xml or None if not found
+    """
+    for rdir in (os.path.join(repodir, "repodata"), repodir):
+        repomd = os.path.join(rdir, "repomd.xml")
+        if os.path.exists(repomd):
+            return repomd
+
+    return None
+
+
+def repodirs_digest(repodirs):
+    """
+    :param repodirs: A list of (repo ID, dir holding metadata of the repo or
+        None if not found)
+    :return: Digest of repomd.xml of repos, which has the revision and
+        checksums of metadata, or None if any of them are not found
+
+    >>> repodirs_digest([("not-exist", None)]) is None
+    True
+    """
+    sha1 = hashlib.sha1()
+    for repo, rdir in sorted(repodirs):
+        repomd = rdir and find_repomd(rdir)
+        if not repomd:
+            LOG.debug(_("repomd.xml of %s not found in %s"), repo, rdir)
+            return None
+
+        sha1.update(repo + '\0')
+        with open(repomd) as inp:
+            sha1.update(inp.read())
+
+    return sha1.hexdigest()
+
+
+def repomd_files(repodir):
+    """
+    :param repodir: Dir holding repomd.xml or repodata/repomd.xml
+    :return: A dict :: {metadata_type: path_of_metadata_file}
+    """
+    repomd = find_repomd(repodir)
+    if repomd is None:
+        return dict()
+
+    rdir = os.path.dirname(repomd)
+    files = dict()
+    for elem in iterparse_g(repomd, "data"):
+        loc = _find(elem, "location")
+        if loc is None:
+            continue
+
+        href = loc.get("href")
+        for path in (os.path.join(repodir, href),
+                     os.path.join(rdir, os.path.basename(href))):
+            if os.path.exists(path):
+                files[elem.get("type")] = path
+                break
+
+    return files
+
+
+def find_repo_dir(topdir, repo):
+    """
+    Find the dir holding metadata of `repo` under the cache dir `topdir` of
+    yum or dnf.
+
+    :param topdir: Cache dir, e.g. /var/cache/yum
+    :param repo: Repo ID or path to the dir holding metadata of the repo
+    :return: Path to the dir or None if not found
+    """
+    if os.path.isabs(repo):
+        return repo if repomd_files(repo) else None
+
+    patterns = (repo, "*/*/" + repo, "yum/*/*/" + repo, repo + "-*",
+                "dnf/" + repo + "-*")
+    for pat in patterns:
+        for rdir in sorted(glob.glob(os.path.join(topdir, pat))):
+            if repomd_files(rdir):
+                return rdir
+
+    return None
+
+
+class RepoMetadata(object):
+    """
+    Index of errata and packages of a set of repos. Do not modify its data.
+
+    - errata: A tuple of errata dicts
+    - packages: A dict :: {(name, arch): ((name, epoch, version, release,
+      arch), ...)} of packages in repos
+    - errata_by_na: A dict :: {(name, arch): ((epoch, version, release,
+      index_of_errata), ...)} of packages in errata
+    """
+    __slots__ = ("repos", "errata", "packages", "errata_by_na")
+
+    def __init__(self, repos, errata, packages):
+        """
+        :param repos: Repo IDs
+        :param errata: An iterable yields errata dicts
+        :param packages: An iterable yields NEVRA tuples of packages
+        """
+        self.repos = tuple(repos)
+        self.errata = tuple(errata)
+
+        pkgs = collections.defaultdict(set)
+        for nevra in packages:
+            pkgs[(nevra[0], nevra[4])].add(nevra)
+
+        ebna = collections.defaultdict(list)
+        for idx, errata in enumerate(self.errata):
+            for pkg in errata["packages"]:
+                na = (pkg["name"], pkg["arch"])
+                ebna[na].append((pkg["epoch"], pkg["version"],
+                                 pkg["release"], idx))
+                pkgs[na].add((pkg["name"], pkg["epoch"], pkg["version"],
+                              pkg["release"], pkg["arch"]))
+
+        self.packages = dict((k, tuple(sorted(v))) for k, v in pkgs.items())
+        self.errata_by_na = dict((k, tuple(v)) for k, v in ebna.items())
+
+    def __repr__(self):
+        return ("<RepoMetadata: repos=%s, %d errata, %d package names>" %
+                (','.join(self.repos), len(self.errata), len(self.packages)))
+
+
+def _load(repos, topdir):
+    (errata, packages) = ([], [])
+    for repo in repos:
+        rdir = find_repo_dir(topdir, repo)
+        if rdir is None:
+            LOG.warn(_("Metadata of the repo %s not found in %s"),
+                     repo, topdir)
+            continue
+
+        files = repomd_files(rdir)
+        LOG.debug(_("Loading metadata of the repo %s from %s"), repo, rdir)
+        if "updateinfo" in files:
+            errata.extend(updateinfo_g(files["updateinfo"]))
+        if "primary" in files:
+            packages.extend(primary_g(files["primary"]))
+
+    return RepoMetadata(repos, errata, packages)
+
+
+def load(repos, topdir):
+    """
+    Load metadata of repos or get it loaded already in this process.
+
+    :param repos: A list of repo IDs
+    :param topdir: Cache dir holding metadata of repos
+    :return: A RepoMetadata object
+    """
+    key = (os.path.realpath(topdir), tuple(sorted(repos)))
+    with _REGISTRY_LOCK:
+        rmd = _REGISTRY.get(key)
+        if rmd is None:
+            with rpmkit.updateinfo.trace.phase("load_repometa",
+                                               repos=sorted(repos)):
+                rmd = _REGISTRY[key] = _load(sorted(repos), topdir)
+            LOG.info(_("Loaded repo metadata: %r"), rmd)
+
+    return rmd
+
+# vim:sw=4:ts=4:et:
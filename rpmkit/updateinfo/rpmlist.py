@@ -0,0 +1,130 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Lists of installed RPMs of hosts without RPM DBs.
+
+Hosts of which RPM DBs are not available but lists of installed RPMs are,
+e.g. extracted sosreports having 'installed-rpms' or the output of 'rpm -qa'
+saved, are analyzed with the lists parsed instead of RPM DBs, so that neither
+rpm nor the same version of Berkeley DB as hosts' is needed. Backends using
+repo metadata, engine and repodata, support them.
+
+Each line of lists starts with a RPM label, '%{name}-%{version}-%{release}.
+%{arch}' optionally prefixed with '%{epoch}:', and the rest of the line, e.g.
+the install time in 'installed-rpms', is ignored:
+
+  rpm -qa --qf '%{epoch}:%{name}-%{version}-%{release}.%{arch}\\n' \\
+    > <hosts_datadir>/<host_identity>/rpm-qa.txt
+
+Epochs of RPMs are not known from lists without them, e.g. 'installed-rpms'
+and the output of plain 'rpm -qa', and backends take them from repo metadata.
+"""
+from __future__ import absolute_import
+
+import logging
+import os.path
+import re
+
+import rpmkit.identrpm
+import rpmkit.rpmutils
+from rpmkit.globals import _
+
+
+LOG = logging.getLogger(__name__)
+
+RPM_LIST_FILES = ("installed-rpms", "rpm-qa.txt")
+
+_ARCHS = ("i[3456]86", "x86_64", "ppc64le", "ppc64", "ppc", "ia64", "s390x",
+          "s390", "aarch64", "armv7hl", "noarch")
+_ARCH_REG = re.compile(r"^.+[.-](?P<arch>" + '|'.join(_ARCHS) + r")$")
+
+
+def find_rpm_list(root, filenames=RPM_LIST_FILES):
+    """
+    :param root: Root dir of a host, e.g. an extracted sosreport
+    :param filenames: Basenames of lists of installed RPMs to look up
+    :return: Path to the list of installed RPMs of the host if the host has
+        no RPM DB, or None
+
+    >>> find_rpm_list("/not/exist") is None
+    True
+    """
+    if os.path.exists(os.path.join(root, rpmkit.rpmutils.RPMDB_SUBDIR)):
+        return None
+
+    for fname in filenames:
+        path = os.path.join(root, fname)
+        if os.path.isfile(path):
+            return path
+
+    return None
+
+
+def parse_line(line, arch_reg=_ARCH_REG):
+    """
+    :param line: A line of lists of installed RPMs
+    :return: A dict of name, version, release, arch and epoch of the RPM, or
+        None if the line is a comment or the RPM has no arch, e.g. gpg-pubkey.
+        Epoch is None if it's not in the line.
+
+    >>> p = parse_line("bash-4.1.2-15.el6_5.1.x86_64 Mon Jul 14 17:13:17 2014")
+    >>> sorted(p.items())  # doctest: +NORMALIZE_WHITESPACE
+    [('arch', 'x86_64'), ('epoch', None), ('name', 'bash'),
+     ('release', '15.el6_5.1'), ('version', '4.1.2')]
+    >>> parse_line("1:openssl-1.0.1e-30.el6.ppc64")["epoch"]
+    1
+    >>> p = parse_line("(none):zlib-1.2.3-29.el6.x86_64")
+    >>> p["name"], p["epoch"]
+    ('zlib', 0)
+    >>> parse_line("gpg-pubkey-fd431d51-4ae0493b") is None
+    True
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    label = line.split()[0]
+    epoch = None  # Not known.
+    if label.startswith("(none):"):  # --qf '%{epoch}:...' without epoch.
+        label = label[len("(none):"):]
+        epoch = 0
+
+    pkg = rpmkit.identrpm.parse_rpm_label(label, epoch, arch_reg=arch_reg)
+    if pkg is None or "arch" not in pkg:
+        LOG.debug(_("Skipped the line of RPM list: %s"), line)
+        return None
+
+    return dict(name=pkg["name"], version=pkg["version"],
+                release=pkg["release"], arch=pkg["arch"], epoch=pkg["epoch"])
+
+
+def load(path):
+    """
+    :param path: Path to the list of installed RPMs
+    :return: A list of dicts of installed RPMs, see :function:`parse_line`
+    """
+    with open(path) as lines:
+        pkgs = [p for p in (parse_line(l) for l in lines) if p is not None]
+
+    LOG.debug(_("Loaded %d RPMs from %s"), len(pkgs), path)
+    return pkgs
+
+
+def guess_rhel_version(pkgs):
+    """
+    :param pkgs: A list of dicts of installed RPMs
+    :return: RHEL major version guessed from the version of rpm in `pkgs` or
+        0 if rpm is not found
+
+    >>> guess_rhel_version([dict(name="rpm", version="4.8.0")])
+    6
+    """
+    for pkg in pkgs:
+        if pkg["name"] == "rpm":
+            return rpmkit.rpmutils.rhel_version_from_rpmver(pkg["version"])
+
+    return 0
+
+# vim:sw=4:ts=4:et:
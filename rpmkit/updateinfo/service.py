@@ -0,0 +1,328 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Service mode to analyze hosts on requests.
+
+Repo metadata, the index made from it and CVE data are loaded once and kept
+in memory, so that analyzing a host only needs to look up the index with the
+list of RPMs installed in it.
+
+Requests are JSON objects POST-ed to /analyze over HTTP or a UNIX socket:
+
+- root: RPM DB root dir of the host, or
+- installed: A non-empty list of installed RPMs, [name, epoch, version,
+  release, arch] or dicts of them with optional summary, vendor and buildhost
+- id, repos, score, keywords, core_rpms: Optional, defaults are of the service
+
+and responded the summary data same as summary.json in JSON. GET /status
+returns the status of the service.
+
+Requests are analyzed in `workers` threads at most at the same time and
+waiting requests more than `queue_size` are rejected (503).
+"""
+from __future__ import absolute_import
+
+import BaseHTTPServer
+import SocketServer
+import logging
+import operator
+import os.path
+import os
+import stat
+import threading
+import time
+
+import rpmkit.updateinfo.engine
+import rpmkit.updateinfo.main as RUM
+import rpmkit.utils as U
+from rpmkit.globals import _
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 64
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+def _to_package_dict(pkg):
+    """
+    :param pkg: A list of (name, epoch, version, release, arch) or a dict
+        represents an installed RPM
+
+    >>> sorted(_to_package_dict(["bash", 0, "4.1.2", "15.el6", "x86_64"]))
+    ['arch', 'epoch', 'name', 'release', 'version']
+    """
+    if isinstance(pkg, dict):
+        keys = rpmkit.updateinfo.engine.INSTALLED_TAGS
+        pkg = dict((k, v) for k, v in pkg.items() if k in keys)
+    else:
+        pkg = dict(zip(RUM.NEVRA_KEYS, pkg))
+
+    if any(k not in pkg for k in RUM.NEVRA_KEYS):
+        raise BadRequest("Invalid installed RPM: %r" % (pkg, ))
+
+    return pkg
+
+
+class Service(object):
+
+    def __init__(self, repos, cachedir, backend="engine", score=0,
+                 keywords=RUM.ERRATA_KEYWORDS, core_rpms=RUM.CORE_RPMS,
+                 cve_cvss_map=None, workers=DEFAULT_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        :param repos: A list of repos to get metadata of by default
+        :param cachedir: Cache dir holding metadata of repos
+        :param backend: Backend name uses repo metadata, engine or repodata
+        :param score: CVSS base metrics score by default
+        :param keywords: Keyword list to filter 'important' RHBAs by default
+        :param core_rpms: Core RPMs to filter errata by them by default
+        :param cve_cvss_map: A dict :: {cve: cve_and_cvss_data} or None
+        :param workers: Max number of requests analyzed at the same time
+        :param queue_size: Max number of requests waiting to be analyzed
+        """
+        bcls = RUM.get_backend(backend, fallback=rpmkit.updateinfo.engine.Base)
+        if not bcls.uses_repometa:
+            LOG.warn(_("Backend %s does not keep repo metadata, use %s"),
+                     bcls.name, rpmkit.updateinfo.engine.Base.name)
+            bcls = rpmkit.updateinfo.engine.Base
+
+        self.bcls = bcls
+        self.repos = repos
+        self.cachedir = cachedir
+        self.score = score
+        self.keywords = keywords
+        self.core_rpms = core_rpms
+        self.cve_cvss_map = dict() if cve_cvss_map is None else cve_cvss_map
+        self.workers = workers
+        self.queue_size = queue_size
+
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self.stats = dict(active=0, queued=0, served=0, failed=0,
+                          rejected=0)
+
+    def preload(self, repos=None):
+        """
+        Load repo metadata and make the index of it before requests come.
+        """
+        self.bcls('/', repos or self.repos, cachedir=self.cachedir).index()
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, workers=self.workers,
+                        queue_size=self.queue_size, repos=self.repos,
+                        backend=self.bcls.name)
+
+    def analyze(self, req):
+        """
+        :param req: A dict of the request, see the module doc
+        :return: A dict of the summary data
+        """
+        hid = req.get("id")
+        repos = req.get("repos") or self.repos
+        score = req.get("score", self.score)
+        keywords = req.get("keywords", self.keywords)
+        core_rpms = req.get("core_rpms", self.core_rpms)
+
+        if "installed" in req:
+            # The backend reads the RPM DB of '/' if installed RPMs are empty.
+            if not req["installed"]:
+                raise BadRequest("No installed RPMs were given")
+            base = self.bcls('/', repos, cachedir=self.cachedir)
+            pkgs = [_to_package_dict(p) for p in req["installed"]]
+            base._packages["installed"] = \
+                rpmkit.updateinfo.engine.make_packages(pkgs, base.index())
+        elif "root" in req:
+            root = req["root"]
+            if not os.path.exists(os.path.join(root, "var/lib/rpm")):
+                raise BadRequest("RPM DB not found in %s" % root)
+            base = self.bcls(root, repos, cachedir=self.cachedir)
+        else:
+            raise BadRequest("Neither root nor installed was given")
+
+        ips = base.list_installed()
+        us = U.uniq(base.list_updates(),
+                    key=operator.itemgetter(*RUM.NEVRA_KEYS))
+        es = RUM.errata_complement_g(base.list_errata(), us, score,
+                                     self.cve_cvss_map)
+        es = U.uniq(es, key=operator.itemgetter("id"), reverse=True)
+
+        # Keep CVE data fetched for this request for later requests.
+        if score > 0:
+            for cve in (c for e in es for c in e.get("cves", [])
+                        if "score" in c):
+                self.cve_cvss_map.setdefault(RUM._cve_id(cve), cve)
+
+        LOG.info(_("%s: Found %d Errata, %d Update RPMs"), hid, len(es),
+                 len(us))
+        data = RUM.summarize(ips, es, us, score, keywords, core_rpms)
+        data["id"] = hid
+        return data
+
+    def submit(self, req):
+        """
+        Analyze the request after waiting for other requests analyzed.
+
+        :param req: A dict of the request, see the module doc
+        :return: A dict of the summary data
+        """
+        with self._lock:
+            if self.stats["queued"] >= self.queue_size:
+                self.stats["rejected"] += 1
+                raise ServiceBusy("Too many requests waiting: %d" %
+                                  self.stats["queued"])
+            self.stats["queued"] += 1
+
+        with self._slots:
+            with self._lock:
+                self.stats["queued"] -= 1
+                self.stats["active"] += 1
+
+            failed = True
+            try:
+                data = self.analyze(req)
+                failed = False
+                return data
+            finally:
+                with self._lock:
+                    self.stats["active"] -= 1
+                    self.stats["failed" if failed else "served"] += 1
+
+
+class RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def address_string(self):
+        # client_address of UNIX socket connections is not (host, port).
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return self.server.server_address
+
+    def log_message(self, format, *args):
+        LOG.debug("%s: %s", self.address_string(), format % args)
+
+    def _respond(self, code, data):
+        content = U.json_dumps(data)
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == "/status":
+            self._respond(200, self.server.service.status())
+        else:
+            self._respond(404, dict(error="Not found: %s" % self.path))
+
+    def do_POST(self):
+        if self.path.rstrip('/') != "/analyze":
+            self._respond(404, dict(error="Not found: %s" % self.path))
+            return
+
+        start = time.time()
+        try:
+            size = int(self.headers.get("Content-Length", 0))
+            if size <= 0 or size > MAX_REQUEST_SIZE:
+                raise BadRequest("Invalid Content-Length: %d" % size)
+
+            req = U.json.loads(self.rfile.read(size))
+            if not isinstance(req, dict):
+                raise BadRequest("Request must be a JSON object")
+        except ValueError as exc:
+            self._respond(400, dict(error=str(exc)))
+            return
+
+        try:
+            data = self.server.service.submit(req)
+        except BadRequest as exc:
+            self._respond(400, dict(error=str(exc)))
+            return
+        except ServiceBusy as exc:
+            self._respond(503, dict(error=str(exc)))
+            return
+        except Exception as exc:
+            LOG.exception(_("Failed to analyze: %s"), str(exc))
+            self._respond(500, dict(error=str(exc)))
+            return
+
+        LOG.info(_("%s: Analyzed in %.3f sec"), data["id"],
+                 time.time() - start)
+        self._respond(200, data)
+
+
+class HTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class UnixHTTPServer(SocketServer.ThreadingMixIn,
+                     SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(address, service, handler=RequestHandler):
+    """
+    :param address: "unix:<socket_path>" or "[<host>:]<port>"
+    :param service: A Service object
+    :return: A server object which serves requests with `service`
+
+    >>> make_server("foo:bar", None)  # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    ValueError: Invalid address: foo:bar
+    >>> make_server("unix:/", None)  # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    ValueError: Not a UNIX socket: /
+    """
+    if address.startswith("unix:"):
+        path = address[len("unix:"):]
+        if os.path.exists(path):
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise ValueError("Not a UNIX socket: %s" % path)
+            os.remove(path)  # Left by the server run previously.
+        server = UnixHTTPServer(path, handler)
+    else:
+        (host, port) = address.rsplit(':', 1) if ':' in address else \
+            ("localhost", address)
+        if not port.isdigit():
+            raise ValueError("Invalid address: %s" % address)
+        server = HTTPServer((host, int(port)), handler)
+
+    server.service = service
+    return server
+
+
+def serve(address, service):
+    """
+    Serve requests with `service` at `address` until interrupted.
+
+    :param address: "unix:<socket_path>" or "[<host>:]<port>"
+    :param service: A Service object
+    """
+    service.preload()
+    server = make_server(address, service)
+    LOG.info(_("Serving at %s: workers=%d, queue_size=%d"), address,
+             service.workers, service.queue_size)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if isinstance(server, UnixHTTPServer):
+            os.remove(server.server_address)
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,235 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Compact snapshots of errata and update RPMs to compute deltas.
+
+Each analysis run saves a snapshot holding only the advisory IDs and the
+NEVRAs of update RPMs found, and deltas against one or more previous
+snapshots are computed with set operations on interned tuples.
+"""
+from __future__ import absolute_import
+
+import collections
+import logging
+import os.path
+import threading
+
+import rpmkit.updateinfo.base
+import rpmkit.utils as U
+from rpmkit.globals import _
+
+
+LOG = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "snapshot.json"
+NEVRA_KEYS = ("name", "epoch", "version", "release", "arch")
+
+# Max number of snapshots loaded and kept in memory at the same time.
+CACHE_SIZE = 8
+
+_CACHE = collections.OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def _intern(val):
+    """
+    >>> _intern(u"x86_64") is _intern("x86_64")
+    True
+    >>> _intern(0)
+    '0'
+    """
+    if not isinstance(val, str):
+        val = unicode(val).encode("utf-8")
+
+    return rpmkit.updateinfo.base.intern_s(val)
+
+
+def nevra_key(pkg, nevra_keys=NEVRA_KEYS):
+    """
+    :param pkg: A dict or a list/tuple represents a package
+    :return: A tuple of interned (name, epoch, version, release, arch)
+
+    >>> nevra_key(dict(name="bash", epoch=0, version="4.1.2",
+    ...                release="15.el6_5.1", arch="x86_64"))
+    ('bash', '0', '4.1.2', '15.el6_5.1', 'x86_64')
+    >>> nevra_key([u"bash", u"0", u"4.1.2", u"15.el6_5.1", u"x86_64"])
+    ('bash', '0', '4.1.2', '15.el6_5.1', 'x86_64')
+    """
+    if isinstance(pkg, (list, tuple)):
+        return tuple(_intern(x) for x in pkg)
+
+    return tuple(_intern(pkg[k]) for k in nevra_keys)
+
+
+class Snapshot(object):
+    """
+    Set of advisory IDs and update NEVRAs.
+
+    >>> s0 = Snapshot(["RHSA-2014:0001"], [("a", "0", "1", "1", "noarch")])
+    >>> s1 = Snapshot(["RHBA-2014:0002"], [("b", "0", "1", "1", "noarch")])
+    >>> s2 = merge([s0, s1])
+    >>> sorted(s2.advisories)
+    ['RHBA-2014:0002', 'RHSA-2014:0001']
+    >>> len(s2.nevras)
+    2
+    """
+    __slots__ = ("advisories", "nevras")
+
+    def __init__(self, advisories=(), nevras=()):
+        self.advisories = frozenset(_intern(a) for a in advisories)
+        self.nevras = frozenset(nevra_key(p) for p in nevras)
+
+    def __repr__(self):
+        return "<Snapshot: %d advisories, %d nevras>" % (len(self.advisories),
+                                                         len(self.nevras))
+
+
+def make(errata, updates, nevra_keys=NEVRA_KEYS):
+    """
+    :param errata: A list of errata
+    :param updates: A list of update packages
+    :return: A Snapshot object
+    """
+    return Snapshot((e["advisory"] for e in errata),
+                    (nevra_key(u, nevra_keys) for u in updates))
+
+
+def merge(snapshots):
+    """
+    :param snapshots: A list of Snapshot objects
+    :return: A Snapshot object holding all of the data in `snapshots`
+    """
+    if len(snapshots) == 1:
+        return snapshots[0]
+
+    snap = Snapshot()
+    snap.advisories = frozenset().union(*(s.advisories for s in snapshots))
+    snap.nevras = frozenset().union(*(s.nevras for s in snapshots))
+    return snap
+
+
+def snapshot_path(workdir, filename=SNAPSHOT_FILE):
+    """
+    :param workdir: Working dir to save results
+    """
+    return os.path.join(workdir, filename)
+
+
+def save(workdir, errata, updates, nevra_keys=NEVRA_KEYS, **metadata):
+    """
+    Save a snapshot of errata and updates found in `workdir`.
+
+    :param workdir: Working dir to save results
+    :param errata: A list of errata
+    :param updates: A list of update packages
+    :param metadata: Extra metadata to save with, e.g. id, generated
+    :return: The path of the snapshot file saved
+    """
+    snap = make(errata, updates, nevra_keys)
+    path = snapshot_path(workdir)
+    data = dict(advisories=sorted(snap.advisories),
+                updates=[list(n) for n in sorted(snap.nevras)],
+                metadata=metadata)
+    U.json_dump(data, path)
+    LOG.debug(_("Saved the snapshot: %s"), path)
+
+    return path
+
+
+def _mtimes(refdir):
+    """
+    :param refdir: Dir holding the snapshot or reference data
+    :return: A tuple of mtimes of the snapshot and the full errata and update
+        lists in `refdir`, None for ones not found
+    """
+    paths = (snapshot_path(refdir), os.path.join(refdir, "errata.json"),
+             os.path.join(refdir, "updates.json"))
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None
+                 for p in paths)
+
+
+def _load(refdir, nevra_keys=NEVRA_KEYS):
+    """
+    Load a snapshot from `refdir`. Fall back to the full errata and update
+    lists dumped in `refdir` by older versions if a snapshot is not found.
+    """
+    path = snapshot_path(refdir)
+    if os.path.exists(path):
+        data = U.json_load(path)
+        return Snapshot(data["advisories"], data["updates"])
+
+    emsg = "Reference %s not found: %s"
+    ref_es_file = os.path.join(refdir, "errata.json")
+    ref_us_file = os.path.join(refdir, "updates.json")
+    assert os.path.exists(ref_es_file), emsg % ("errata file", ref_es_file)
+    assert os.path.exists(ref_us_file), emsg % ("updates file", ref_us_file)
+
+    LOG.debug(_("Snapshot not found, load errata and updates in %s"), refdir)
+    return make(U.json_load(ref_es_file)["data"],
+                U.json_load(ref_us_file)["data"], nevra_keys)
+
+
+def load(refdir, nevra_keys=NEVRA_KEYS, cache_size=CACHE_SIZE):
+    """
+    Load a snapshot from `refdir`. Snapshots loaded recently are kept in
+    memory and shared so that comparing many hosts against same reference
+    loads it only once.
+
+    :param refdir: Dir holding the snapshot or reference data
+    :return: A Snapshot object
+    """
+    assert os.path.exists(refdir), "Reference data dir not found: " + refdir
+
+    key = (os.path.realpath(refdir), _mtimes(refdir), tuple(nevra_keys))
+
+    with _CACHE_LOCK:
+        snap = _CACHE.pop(key, None)
+        if snap is None:
+            snap = _load(refdir, nevra_keys)
+            LOG.debug(_("Loaded the snapshot from %s: %r"), refdir, snap)
+
+        _CACHE[key] = snap
+        while len(_CACHE) > cache_size:
+            _CACHE.popitem(last=False)
+
+    return snap
+
+
+def load_chain(refdirs, nevra_keys=NEVRA_KEYS):
+    """
+    :param refdirs: A dir or a list of dirs holding snapshots
+    :return: A Snapshot object merged from all of snapshots in `refdirs`
+    """
+    if isinstance(refdirs, basestring):
+        refdirs = [refdirs]
+
+    return merge([load(d, nevra_keys) for d in refdirs])
+
+
+def delta(errata, updates, ref, nevra_keys=NEVRA_KEYS):
+    """
+    :param errata: A list of errata
+    :param updates: A list of update packages
+    :param ref: A Snapshot object to compare with
+    :return: A tuple of errata and updates not found in `ref`
+
+    >>> ref = Snapshot(["RHSA-2014:0001"], [("a", "0", "1", "1", "noarch")])
+    >>> es = [dict(advisory="RHSA-2014:0001"),
+    ...       dict(advisory="RHBA-2014:0002")]
+    >>> us = [dict(name="a", epoch=0, version="1", release="1",
+    ...            arch="noarch"),
+    ...       dict(name="a", epoch=0, version="2", release="1",
+    ...            arch="noarch")]
+    >>> (des, dus) = delta(es, us, ref)
+    >>> [e["advisory"] for e in des]
+    ['RHBA-2014:0002']
+    >>> [u["version"] for u in dus]
+    ['2']
+    """
+    return ([e for e in errata if e["advisory"] not in ref.advisories],
+            [u for u in updates
+             if nevra_key(u, nevra_keys) not in ref.nevras])
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,216 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Content-addressed store of errata shared among hosts.
+
+Each distinct errata is saved only once in the store, as
+<store>/<advisory>@<digest>.json, and results of hosts only keep references
+to them (advisory, ref and host specific data like updates). The digest is
+computed from the errata content, so a revised errata gets a new entry.
+
+>>> import rpmkit.tests.common as C
+>>> workdir = C.setup_workdir()
+>>> store = ErrataStore(os.path.join(workdir, "store"))
+>>> errata = dict(advisory="RHSA-2014:0001", description="...",
+...               update_names=["bash"])
+>>> rec = store.dehydrate(errata)
+>>> sorted(rec.keys())
+['advisory', 'ref', 'update_names']
+>>> store.rehydrate(rec) == errata
+True
+>>> C.cleanup_workdir(workdir)
+"""
+from __future__ import absolute_import
+
+import collections
+import hashlib
+import logging
+import os.path
+import os
+import tempfile
+
+import rpmkit.utils as U
+from rpmkit.globals import _
+
+
+LOG = logging.getLogger(__name__)
+
+STORE_DIRNAME = ".errata"
+
+# Keys of errata data specific to each host and kept in host's results.
+HOST_KEYS = ("id", "updates", "update_names", "keywords", "cvsses_s",
+             "cves_s")
+
+
+def is_errata(obj):
+    """
+    Errata may be dict-compatible records other than dicts, e.g.
+    rpmkit.updateinfo.yumbase.Errata.
+
+    >>> is_errata(dict(advisory="RHBA-2014:0001", synopsis="..."))
+    True
+    >>> is_errata(dict(name="bash"))
+    False
+    """
+    return isinstance(obj, collections.Mapping) and "advisory" in obj and \
+        "ref" not in obj
+
+
+def is_errata_ref(obj):
+    """
+    >>> is_errata_ref(dict(advisory="RHBA-2014:0001", ref="RHBA-2014:0001@0"))
+    True
+    """
+    return isinstance(obj, collections.Mapping) and "advisory" in obj and \
+        "ref" in obj
+
+
+class ErrataStore(object):
+
+    def __init__(self, topdir, host_keys=HOST_KEYS):
+        """
+        :param topdir: Top dir of the store
+        :param host_keys: Keys of errata data specific to each host
+        """
+        self.topdir = topdir
+        self.host_keys = host_keys
+        self._refs = set()  # refs known to be saved already.
+        self._cache = dict()
+
+    def path(self, ref):
+        return os.path.join(self.topdir, ref + ".json")
+
+    def put(self, errata):
+        """
+        Save the errata content not specific to hosts if it's not saved yet.
+
+        :param errata: An errata dict
+        :return: Reference to the errata content saved
+        """
+        content = dict((k, v) for k, v in errata.items() if k not in
+                       self.host_keys)
+        data = U.json_dumps(content, sort_keys=True)
+        ref = "%s@%s" % (errata["advisory"],
+                         hashlib.sha1(data).hexdigest()[:16])
+
+        if ref in self._refs:
+            return ref
+
+        path = self.path(ref)
+        if not os.path.exists(path):
+            if not os.path.exists(self.topdir):
+                try:
+                    os.makedirs(self.topdir)
+                except OSError:  # Made by other process in the meanwhile.
+                    pass
+
+            # Write a temporal file and rename it to keep it atomic as other
+            # processes may save the same errata at the same time.
+            (fd, tmp) = tempfile.mkstemp(dir=self.topdir)
+            with os.fdopen(fd, 'w') as out:
+                out.write(data)
+            os.chmod(tmp, 0o644)
+            os.rename(tmp, path)
+            LOG.debug(_("Saved errata: %s"), ref)
+
+        self._refs.add(ref)
+        return ref
+
+    def get(self, ref):
+        """
+        :param ref: Reference to the errata content
+        :return: A dict represents the errata content
+        """
+        content = self._cache.get(ref)
+        if content is None:
+            content = self._cache[ref] = U.json_load(self.path(ref))
+
+        return content
+
+    def dehydrate(self, obj, _memo=None):
+        """
+        Save errata found in `obj` recursively and replace them with
+        references to them.
+
+        :param obj: An errata dict or a list or a dict contains errata
+        :return: Copy of `obj` of which errata were replaced with references
+        """
+        if _memo is None:
+            _memo = dict()  # Same errata appear many times in results.
+
+        if is_errata(obj):
+            rec = _memo.get(id(obj))
+            if rec is None:
+                rec = dict((k, obj[k]) for k in self.host_keys if k in obj)
+                rec["advisory"] = obj["advisory"]
+                rec["ref"] = self.put(obj)
+                _memo[id(obj)] = rec
+
+            return rec
+
+        if isinstance(obj, dict):
+            return dict((k, self.dehydrate(v, _memo)) for k, v in obj.items())
+
+        if isinstance(obj, (list, tuple)):
+            return [self.dehydrate(x, _memo) for x in obj]
+
+        return obj
+
+    def rehydrate(self, obj):
+        """
+        Restore errata referred in `obj` recursively.
+
+        :param obj: An errata reference or a list or a dict contains them
+        :return: Copy of `obj` of which references were replaced with errata
+        """
+        if is_errata_ref(obj):
+            errata = dict(self.get(obj["ref"]))
+            errata.update((k, v) for k, v in obj.items() if k != "ref")
+            return errata
+
+        if isinstance(obj, dict):
+            return dict((k, self.rehydrate(v)) for k, v in obj.items())
+
+        if isinstance(obj, list):
+            return [self.rehydrate(x) for x in obj]
+
+        return obj
+
+
+def dump(data, filepath, store=None):
+    """
+    Dump `data` contains errata into `filepath` in JSON format. Errata are
+    saved in `store` and referred from the file if `store` is given.
+
+    :param data: Data to dump, a dict
+    :param filepath: Output file path
+    :param store: An ErrataStore object or None
+    """
+    if store is not None:
+        data = store.dehydrate(data)
+        sdir = os.path.relpath(store.topdir, os.path.dirname(filepath))
+        data["errata_store"] = sdir
+
+    U.json_dump(data, filepath)
+
+
+def load(filepath, rehydrate=True):
+    """
+    Load data from `filepath` dumped by :function:`dump`.
+
+    :param filepath: Input file path
+    :param rehydrate: Restore errata from the store referred if True
+    :return: Loaded data
+    """
+    data = U.json_load(filepath)
+    sdir = data.pop("errata_store", None)
+
+    if sdir is None or not rehydrate:
+        return data
+
+    topdir = os.path.join(os.path.dirname(os.path.realpath(filepath)), sdir)
+    return ErrataStore(topdir).rehydrate(data)
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,42 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.base as TT
+
+import collections
+import pickle
+import unittest
+
+
+class Test_10_Package(unittest.TestCase):
+
+    def setUp(self):
+        self.pkg = TT.Package("bash", "4.1.2", "15.el6_5.1", "x86_64", 0,
+                              "The shell", "Red Hat, Inc.",
+                              "x86-001.build.bos.redhat.com",
+                              src="bash.src.rpm")
+
+    def test_10_no_dict(self):
+        self.assertFalse(hasattr(self.pkg, "__dict__"))
+        self.assertFalse(hasattr(TT.NEVRA("bash", "4.1.2", "1", "x86_64"),
+                                 "__dict__"))
+
+    def test_20_mapping(self):
+        self.assertTrue(isinstance(self.pkg, collections.Mapping))
+        self.assertEquals(dict(self.pkg)["src"], "bash.src.rpm")
+        self.assertEquals(sorted(self.pkg.keys()), sorted(dict(self.pkg)))
+        self.assertEquals(self.pkg.get("not_exist", 1), 1)
+        self.assertTrue("origin" in self.pkg)
+        self.assertFalse("not_exist" in self.pkg)
+        self.assertEquals(self.pkg, dict(self.pkg))
+        self.assertEquals(dict(self.pkg), self.pkg)
+        self.assertNotEquals(self.pkg, dict(self.pkg, name="zsh"))
+
+    def test_30_pickle(self):
+        pkg = pickle.loads(pickle.dumps(self.pkg, pickle.HIGHEST_PROTOCOL))
+        self.assertEquals(pkg, self.pkg)
+        self.assertEquals(pkg["origin"], "redhat")
+
+# vim:sw=4:ts=4:et:
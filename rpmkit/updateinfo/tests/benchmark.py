@@ -0,0 +1,211 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+"""Benchmark rpmkit.updateinfo with synthetic workloads.
+
+Each case at each scale is run in a new worker process, so that its peak RSS
+is not affected by others, and its wall time, CPU time and peak RSS are
+measured with rpmkit.updateinfo.trace. Results are printed or saved in JSON:
+
+  python -m rpmkit.updateinfo.tests.benchmark -s 1000,10000 -o bench.json
+
+Scale is the number of errata, or the number of hosts in the case
+cluster_hosts.
+"""
+import rpmkit.updateinfo.engine
+import rpmkit.updateinfo.main as RUM
+import rpmkit.updateinfo.multihosts as RUMS
+import rpmkit.updateinfo.trace
+import rpmkit.updateinfo.tests.fixtures as F
+import rpmkit.updateinfo.tests.repometa as R
+import rpmkit.tests.common as C
+import rpmkit.utils as U
+
+import collections
+import datetime
+import functools
+import multiprocessing
+import optparse
+import os.path
+import os
+import platform
+import sys
+import unittest
+
+
+DEFAULT_SCALES = (1000, 10000, 100000)
+NRPMS = 1000  # Number of RPMs installed in each host.
+MAX_DELTA = 11  # Hosts differ from their profiles by 11 NEVRAs at most.
+
+
+def _complement(errata, updates, cmap):
+    return list(RUM.errata_complement_g(errata, updates, 4.0, cmap))
+
+
+def _dump_results(workdir, ips, errata, updates):
+    try:
+        RUM.dump_results(workdir, ips, errata, updates, 4.0, fmt="csv")
+    finally:
+        C.cleanup_workdir(workdir)
+
+
+def _cluster_hosts(workdir, hosts):
+    try:
+        RUMS.cluster_hosts(hosts, ["rhel-6"], workdir,
+                           rpmkit.updateinfo.engine.Base, MAX_DELTA)
+    finally:
+        C.cleanup_workdir(workdir)
+
+
+def _mk_errata(scale, seed=0):
+    """
+    :return: A tuple of (errata, update RPMs, CVE vs. CVSS map)
+    """
+    errata = F.mk_errata(scale, scale // 10 + 10, seed)
+    updates = U.uniq(u for e in errata for u in e["updates"])
+    return (errata, updates, F.mk_cve_cvss_map(errata))
+
+
+def setup_errata_complement_g(scale, seed=0):
+    return functools.partial(_complement, *_mk_errata(scale, seed))
+
+
+def setup_analyze_errata(scale, seed=0):
+    (errata, updates, cmap) = _mk_errata(scale, seed)
+    return functools.partial(RUM.analyze_errata,
+                             _complement(errata, updates, cmap), updates, 4.0)
+
+
+def setup_dump_results(scale, seed=0):
+    (errata, updates, cmap) = _mk_errata(scale, seed)
+    errata = _complement(errata, updates, cmap)
+    return functools.partial(_dump_results, C.setup_workdir(),
+                             F.mk_installed(NRPMS, seed), errata, updates)
+
+
+def setup_cluster_hosts(scale, seed=0):
+    """
+    Hosts are listed from the lists of their installed RPMs and clustered
+    with the backend using repo metadata same as multihosts.main does.
+    """
+    workdir = C.setup_workdir()
+    R.mk_repo(os.path.join(workdir, "rhel-6"))
+
+    hosts = F.mk_hosts(scale, NRPMS // 4, scale // 100 + 1, 0.1, seed)
+    hdir = F.mk_hosts_datadir(os.path.join(workdir, "hosts"), hosts)
+    odir = os.path.join(workdir, "out")
+
+    args = []
+    for hid, _ips in hosts:
+        os.makedirs(os.path.join(odir, hid))
+        args.append((hid, os.path.join(hdir, hid), os.path.join(odir, hid)))
+
+    return functools.partial(_cluster_hosts, workdir, args)
+
+
+CASES = collections.OrderedDict((("errata_complement_g",
+                                  setup_errata_complement_g),
+                                 ("analyze_errata", setup_analyze_errata),
+                                 ("dump_results", setup_dump_results),
+                                 ("cluster_hosts", setup_cluster_hosts)))
+
+
+def run_case(args):
+    """
+    :param args: A tuple of (case name, scale, random seed)
+    :return: A dict of the result
+    """
+    (name, scale, seed) = args
+    trace = rpmkit.updateinfo.trace
+
+    func = CASES[name](scale, seed)
+
+    trace.enable()
+    with trace.phase(name, scale=scale):
+        func()
+
+    evs = trace.take()
+    trace.disable()
+
+    ev = evs.pop()  # The case itself is recorded last.
+    phases = collections.defaultdict(float)
+    for sev in evs:
+        phases[sev["name"]] += sev["dur"] / 1000.0
+
+    return dict(case=name, scale=scale, wall_ms=ev["dur"] / 1000.0,
+                cpu_ms=ev["args"]["cpu_ms"],
+                maxrss_kb=ev["args"]["maxrss_kb"],
+                maxrss_delta_kb=ev["args"]["maxrss_delta_kb"],
+                phases=phases)
+
+
+def run(cases=CASES.keys(), scales=DEFAULT_SCALES, seed=0, label=None):
+    """
+    :param cases: A list of case names, see `CASES`
+    :param scales: A list of scales
+    :param seed: Random seed
+    :param label: Label of this run, e.g. release version, or None
+    :return: A dict of results and the environment
+    """
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    try:
+        results = [pool.apply(run_case, ((name, scale, seed), ))
+                   for scale in scales for name in cases]
+    finally:
+        pool.close()
+        pool.join()
+
+    return dict(label=label, python=platform.python_version(),
+                platform=platform.platform(), cpus=multiprocessing.cpu_count(),
+                generated=datetime.datetime.now().strftime("%F %T"),
+                seed=seed, results=results)
+
+
+def option_parser():
+    p = optparse.OptionParser("%prog [Options...]")
+    p.set_defaults(cases=None, scales=','.join(str(s) for s in
+                                               DEFAULT_SCALES),
+                   seed=0, label=None, output=None)
+
+    p.add_option("-c", "--case", dest="cases", action="append",
+                 choices=CASES.keys(),
+                 help="Case to run. It can be given multiple times. "
+                      "Choices: %s [all]" % ', '.join(CASES.keys()))
+    p.add_option("-s", "--scales", help="Comma separated scales [%default]")
+    p.add_option("", "--seed", type="int", help="Random seed [%default]")
+    p.add_option("-L", "--label", help="Label of this run, e.g. version")
+    p.add_option("-o", "--output", help="Output file [stdout]")
+    return p
+
+
+def main(argv=sys.argv[1:]):
+    (options, _args) = option_parser().parse_args(argv)
+
+    scales = [int(s) for s in options.scales.split(',')]
+    res = run(options.cases or CASES.keys(), scales, options.seed,
+              options.label)
+
+    if options.output:
+        U.json_dump(res, options.output)
+    else:
+        print(U.json_dumps(res, indent=2))
+
+
+class Test_10_run(unittest.TestCase):
+
+    def test_10_run_case(self):
+        for name in CASES:
+            res = run_case((name, 20, 0))
+            self.assertEquals(res["case"], name)
+            self.assertTrue(res["wall_ms"] >= 0)
+            self.assertTrue(res["maxrss_kb"] > 0)
+
+        self.assertFalse(rpmkit.updateinfo.trace.is_enabled())
+
+
+if __name__ == '__main__':
+    main()
+
+# vim:sw=4:ts=4:et:
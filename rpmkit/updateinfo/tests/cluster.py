@@ -0,0 +1,103 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.cluster as TT
+import rpmkit.updateinfo.engine
+import rpmkit.updateinfo.main as RUM
+import rpmkit.updateinfo.multihosts
+import rpmkit.updateinfo.repometa
+import rpmkit.updateinfo.snapshot
+import rpmkit.updateinfo.tests.engine as E
+import rpmkit.updateinfo.tests.fixtures as F
+import rpmkit.updateinfo.tests.repometa as R
+import rpmkit.tests.common as C
+import rpmkit.utils as U
+
+import os.path
+import unittest
+
+
+def _nevras(ips):
+    return frozenset(rpmkit.updateinfo.snapshot.nevra_key(p) for p in ips)
+
+
+class Test_10_cluster(unittest.TestCase):
+
+    def test_10_cluster(self):
+        hosts = [(hid, _nevras(ips)) for hid, ips in
+                 F.mk_hosts(200, 300, nprofiles=5, variance=0.2)]
+        nmap = dict(hosts)
+        # Hosts differ from their profiles by 11 NEVRAs at most.
+        res = TT.cluster(hosts, 11)
+
+        reps = [hid for hid, ref in res if ref is None]
+        self.assertEquals(len(reps), 5)
+        for hid, ref in res:
+            if ref is not None:
+                self.assertTrue(len(nmap[hid] ^ nmap[ref]) <= 11)
+
+    def test_20_cluster__no_similar_hosts(self):
+        hosts = [(hid, _nevras(ips)) for hid, ips in
+                 F.mk_hosts(20, 300, nprofiles=5, variance=1.0)]
+        res = TT.cluster(hosts, 0)
+        self.assertEquals(len([r for _h, r in res if r is None]), 20)
+
+    def test_30_cluster__many_differences(self):
+        base = frozenset(("p%d" % i, "0", "1", "1", "x86_64") for i
+                         in range(4))
+        # Each host differs from the first host by 11 NEVRAs and from the
+        # others by 22 NEVRAs.
+        nevras = lambda i: frozenset(("q%d.%d" % (i, j), "0", "1", "1",
+                                      "noarch") for j in range(11))
+        hosts = [("host-0", base)] + [("host-%d" % i, base | nevras(i))
+                                      for i in range(1, 50)]
+        res = TT.cluster(hosts, 11)
+        self.assertEquals([r for _h, r in res], [None] + ["host-0"] * 49)
+
+
+class Test_20_analyze_delta(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        R.mk_repo(os.path.join(self.workdir, "rhel-6"))
+        rmd = rpmkit.updateinfo.repometa.load(["rhel-6"], self.workdir)
+        self.index = rpmkit.updateinfo.engine.get_index(rmd)
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_analyze_delta(self):
+        ref = frozenset(E.INSTALLED)
+        bash = ("bash", "0", "4.1.2", "15.el6", "x86_64")
+        nevras = frozenset([bash] + E.INSTALLED[1:])
+
+        # The list of installed RPMs is saved by cluster_hosts.
+        hworkdir = os.path.join(self.workdir, "b")
+        os.makedirs(hworkdir)
+        pkgs = [dict(name=n, epoch=e, version=v, release=r, arch=a) for
+                n, e, v, r, a in sorted(nevras)]
+        ips = rpmkit.updateinfo.engine.make_packages(pkgs, self.index)
+        U.json_dump(dict(data=ips, ), RUM.rpm_list_path(hworkdir))
+
+        apps = rpmkit.updateinfo.engine.applicable_by_na(ref, self.index)
+        data = rpmkit.updateinfo.multihosts.analyze_delta(
+            "b", hworkdir, hworkdir, ["rhel-6"], "a", nevras, ref, apps,
+            self.index, (0, [], [], (), None), dict(fmt="csv", details=False))
+        self.assertEquals(data["errata"],
+                          dict(added=[], removed=["RHSA-2014:1293"]))
+        self.assertEquals(data["updates"], dict(added=[], removed=[bash]))
+        self.assertEquals(data["installed"]["added"], [bash])
+
+        path = os.path.join(hworkdir, rpmkit.updateinfo.multihosts.DELTA_FILE)
+        self.assertEquals(U.json_load(path)["base"], "a")
+
+        # Results of the host itself are saved in its working dir.
+        es = U.json_load(RUM.errata_list_path(hworkdir))["data"]
+        self.assertEquals([e["advisory"] for e in es], ["RHSA-2014:1652"])
+        path = os.path.join(hworkdir, "summary.json")
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.islink(path))
+
+# vim:sw=4:ts=4:et:
@@ -7,12 +7,40 @@ import rpmkit.updateinfo.dnfbase as TT
 import rpmkit.updateinfo.utils as RUU
 import rpmkit.tests.common as C
 
+import datetime
 import os.path
 import os
 import shutil
 import unittest
 
 
+class _Advisory(object):
+    """Fake _hawkey.Advisory object."""
+
+    def __init__(self, aid):
+        self.id = aid
+        self.title = "Important: %s" % aid
+        self.description = "Description of %s" % aid
+        self.updated = datetime.datetime(2015, 1, 1)
+        self.type = TT.hawkey.ADVISORY_SECURITY
+        self.references = []
+        self.packages = []
+
+
+class _Package(object):
+    """Fake hawkey.Package object."""
+
+    def __init__(self, name, version, advisories=[], arch="x86_64"):
+        (self.name, self.v, self.r, self.arch, self.epoch) = \
+            (name, version, "1.el6", arch, 0)
+        self.advisories = advisories
+        self.queried = 0
+
+    def get_advisories(self, cmp_type):
+        self.queried += 1
+        return self.advisories
+
+
 if RUU.is_rhel_or_fedora():
     class Test_10_Base(unittest.TestCase):
 
@@ -43,4 +71,66 @@ if RUU.is_rhel_or_fedora():
             es = self.base.list_errata()
             self.assertTrue(isinstance(es, list))
 
+        def test_50_list_updates__resolve(self):
+            base = TT.Base(self.workdir, resolve=True)
+            self.assertEquals(sorted(base.list_updates()),
+                              sorted(self.base.list_updates()))
+            self.assertTrue(isinstance(base.list_resolved_upgrades(), list))
+
+
+class Test_20_Base__errata(unittest.TestCase):
+
+    def setUp(self):
+        TT._ERRATA_CACHE.clear()
+        self.advs = [_Advisory("RHSA-2015:%04d" % i) for i in range(3)]
+
+    def tearDown(self):
+        TT._ERRATA_CACHE.clear()
+
+    def _base(self, installed, rev="rev-0"):
+        base = TT.Base()
+        base._repo_md_ready = True
+        base._hpackages["installed"] = installed
+        base._repos_revision = lambda: rev
+        return base
+
+    def _installed(self):
+        return [_Package("kernel", "2.6.32", self.advs[:2]),
+                _Package("kernel", "2.6.33", self.advs[1:2]),
+                _Package("bash", "4.1.2", self.advs[1:])]
+
+    def test_10_list_errata__dedup(self):
+        ips = self._installed()
+        es = self._base(ips).list_errata()
+
+        self.assertEquals([e["advisory"] for e in es],
+                          [a.id for a in self.advs])
+        self.assertEquals([p.queried for p in ips], [1, 0, 1])
+
+    def test_20_list_errata__copies(self):
+        converted = []
+        hadv_to_errata = TT.hadv_to_errata
+        try:
+            TT.hadv_to_errata = lambda a: converted.append(a.id) or \
+                hadv_to_errata(a)
+            es = self._base(self._installed()).list_errata()
+            es2 = self._base(self._installed()).list_errata()
+        finally:
+            TT.hadv_to_errata = hadv_to_errata
+
+        self.assertEquals(sorted(converted), [a.id for a in self.advs])
+        self.assertEquals(es, es2)
+        self.assertFalse(any(e is e2 for e, e2 in zip(es, es2)))
+
+        es[0]["keywords"] = ["crash"]
+        cache = TT._ERRATA_CACHE["rev-0"]
+        self.assertFalse("keywords" in es2[0])
+        self.assertFalse("keywords" in cache[es[0]["advisory"]])
+
+    def test_30_list_errata__lru(self):
+        for rev in ("rev-0", "rev-1", "rev-2", "rev-1", None):
+            self._base(self._installed(), rev).list_errata(cache_size=2)
+
+        self.assertEquals(list(TT._ERRATA_CACHE), ["rev-2", "rev-1"])
+
 # vim:sw=4:ts=4:et:
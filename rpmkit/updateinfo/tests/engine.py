@@ -0,0 +1,127 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.engine as TT
+import rpmkit.updateinfo.base
+import rpmkit.updateinfo.repometa
+import rpmkit.updateinfo.tests.repometa as R
+import rpmkit.tests.common as C
+
+import os.path
+import unittest
+
+
+# (name, epoch, version, release, arch) of RPMs installed.
+INSTALLED = [("bash", "0", "4.1.2", "1.el6", "x86_64"),
+             ("zlib", "0", "1.2.3", "29.el6", "x86_64"),
+             ("openssl", "0", "1.0.1e", "15.el6", "x86_64"),
+             ("foo", "0", "1.0", "1", "noarch")]
+
+
+class Test_10_applicable(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        R.mk_repo(os.path.join(self.workdir, "rhel-6"))
+        rmd = rpmkit.updateinfo.repometa.load(["rhel-6"], self.workdir)
+        self.index = TT.get_index(rmd)
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_get_index(self):
+        self.assertEquals(len(self.index.errata), len(R.ERRATA))
+        self.assertEquals(self.index.latest[("bash", "x86_64")][1],
+                          ("bash", "0", "4.1.2", "15.el6", "x86_64"))
+        rmd = rpmkit.updateinfo.repometa.load(["rhel-6"], self.workdir)
+        self.assertTrue(TT.get_index(rmd) is self.index)
+
+    def test_20_applicable(self):
+        (es, ups) = TT.applicable(INSTALLED, self.index)
+
+        self.assertEquals([e["advisory"] for e in es],
+                          ["RHSA-2014:1293", "RHSA-2014:1652"])
+        self.assertEquals(ups,
+                          [("bash", "0", "4.1.2", "15.el6", "x86_64"),
+                           ("openssl", "0", "1.0.1e", "30.el6", "x86_64")])
+
+    def test_30_applicable__up_to_date(self):
+        ips = [R.PACKAGES[1], R.PACKAGES[3]]
+        self.assertEquals(TT.applicable(ips, self.index), ([], []))
+
+    def test_40_applicable_delta(self):
+        ref = frozenset(INSTALLED)
+        other = TT.applicable_by_na(ref, self.index)
+        bash = ("bash", "0", "4.1.2", "15.el6", "x86_64")
+        for ips in (ref, (ref - set(INSTALLED[:1])) | set([bash]),
+                    ref - set(INSTALLED[2:3]),
+                    ref | set([("bash", "0", "4.1.2", "0.el6", "x86_64")])):
+            (es, ups) = TT.applicable_delta(ips, ips ^ ref, other,
+                                            self.index)
+            (es2, ups2) = TT.applicable(ips, self.index)
+            self.assertEquals(es, es2)
+            self.assertEquals(sorted(ups), sorted(set(ups2)))
+
+
+class Test_20_Base(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        R.mk_repo(os.path.join(self.workdir, "yum/x86_64/6Server/rhel-6"))
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_list_errata_and_updates(self):
+        base = TT.Base(self.workdir, ["rhel-6"], cachedir=self.workdir)
+        base._packages["installed"] = \
+            [rpmkit.updateinfo.base.Package(n, v, r, a, e) for n, e, v, r, a
+             in INSTALLED]
+
+        es = base.list_errata()
+        self.assertEquals([e["advisory"] for e in es],
+                          ["RHSA-2014:1293", "RHSA-2014:1652"])
+        self.assertFalse(es[0] is base.index().errata[0])
+        self.assertEquals([(u["name"], u["release"]) for u in
+                           base.list_updates()],
+                          [("bash", "15.el6"), ("openssl", "30.el6")])
+
+    def test_20_list_installed__rpm_list(self):
+        with open(os.path.join(self.workdir, "rpm-qa.txt"), 'w') as out:
+            for name, epoch, version, release, arch in INSTALLED:
+                label = "%s-%s-%s.%s" % (name, version, release, arch)
+                out.write("%s:%s\n" % (epoch, label))
+
+        base = TT.Base(self.workdir, ["rhel-6"], cachedir=self.workdir)
+        ips = base.list_installed()
+        self.assertEquals(sorted(TT._nevra(p) for p in ips), sorted(INSTALLED))
+        self.assertFalse(any(p["replaced"] for p in ips))
+        self.assertEquals([e["advisory"] for e in base.list_errata()],
+                          ["RHSA-2014:1293", "RHSA-2014:1652"])
+
+    def test_30_list_installed__rpm_list_without_epochs(self):
+        pkgs = [R._pkg("openssl", "1.0.1e", "30.el6", epoch="1"),
+                R._pkg("bash", "4.1.2", epoch="1"),
+                R._pkg("bash", "4.1.2", "15.el6", epoch="1")]
+        R.mk_repo(os.path.join(self.workdir, "yum/x86_64/6Server/rhel-6"),
+                  [], pkgs)
+        with open(os.path.join(self.workdir, "installed-rpms"), 'w') as out:
+            out.write("openssl-1.0.1e-30.el6.x86_64 Mon Jul 14 2014\n"
+                      "bash-4.1.2-1.el6.x86_64 Mon Jul 14 2014\n"
+                      "zlib-1.2.3-29.el6.x86_64 Mon Jul 14 2014\n")
+
+        base = TT.Base(self.workdir, ["rhel-6"], cachedir=self.workdir)
+        ips = base.list_installed()
+        self.assertEquals(sorted(TT._nevra(p) for p in ips),
+                          [("bash", "1", "4.1.2", "1.el6", "x86_64"),
+                           ("openssl", "1", "1.0.1e", "30.el6", "x86_64"),
+                           ("zlib", "0", "1.2.3", "29.el6", "x86_64")])
+        self.assertEquals([p["name"] for p in ips if TT._nevra(p) not in
+                           base.index().nevras], ["zlib"])
+        self.assertEquals([(u["name"], u["epoch"], u["release"]) for u in
+                           base.list_updates()],
+                          [("bash", "1", "15.el6")])
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,50 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.fingerprint as TT
+import rpmkit.updateinfo.tests.repometa as R
+import rpmkit.tests.common as C
+
+import os.path
+import unittest
+
+
+class Test_10_fingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.repodir = R.mk_repo(os.path.join(self.workdir, "rhel-6"))
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_fingerprint(self):
+        fpr = TT.fingerprint("abc", ["rhel-6"], self.workdir, (4.0, ))
+
+        self.assertEquals(fpr, TT.fingerprint("abc", ["rhel-6"],
+                                              self.workdir, (4.0, )))
+        self.assertNotEquals(fpr, TT.fingerprint("abd", ["rhel-6"],
+                                                 self.workdir, (4.0, )))
+        self.assertNotEquals(fpr, TT.fingerprint("abc", ["rhel-6"],
+                                                 self.workdir, (0, )))
+
+        # Repo metadata was updated.
+        repomd = os.path.join(self.repodir, "repodata", "repomd.xml")
+        open(repomd, 'a').write("\n")
+        self.assertNotEquals(fpr, TT.fingerprint("abc", ["rhel-6"],
+                                                 self.workdir, (4.0, )))
+
+    def test_20_fingerprint__repo_not_found(self):
+        self.assertTrue(TT.fingerprint("abc", ["rhel-6", "rhel-7"],
+                                       self.workdir) is None)
+
+    def test_30_save_and_load_index(self):
+        self.assertEquals(TT.load_index(self.workdir), {})
+
+        fprs = dict(host_0="abc", host_1="def")
+        TT.save_index(self.workdir, fprs)
+        self.assertEquals(TT.load_index(self.workdir), fprs)
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,206 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+"""Generators of synthetic workloads: installed RPMs, errata and fleets.
+
+Distributions are rough approximations of RHEL errata: about a third of
+errata are RHSAs with CVEs and severities, and package names are chosen with
+a skewed (Zipf like) popularity so that some packages such as kernel get
+much more errata than others.
+
+>>> es = mk_errata(20)
+>>> len(es), all(e["updates"] for e in es)
+(20, True)
+>>> ips = mk_installed(50)
+>>> len(ips), ips[0]["name"]
+(50, 'kernel')
+>>> hosts = mk_hosts(10, 30, nprofiles=2)
+>>> len(hosts), len(set(id(ips) for _hid, ips in hosts)) <= 10
+(10, True)
+"""
+import rpmkit.updateinfo.base
+import rpmkit.updateinfo.main as RUM
+
+import datetime
+import os.path
+import os
+import random
+
+
+ERRATA_TYPES = (('S', 35), ('B', 50), ('E', 15))
+RHSA_SEVERITIES = (("Critical", 10), ("Important", 35), ("Moderate", 40),
+                   ("Low", 15))
+WORDS = ["fix", "update", "memory", "leak", "crash", "panic", "hang",
+         "SEGV", "data corruption", "performance", "issue", "service"]
+
+_START_DATE = datetime.date(2013, 1, 1)
+
+
+def _weighted_choice(rnd, choices):
+    """
+    :param rnd: A random.Random object
+    :param choices: A list of (value, weight)
+    """
+    x = rnd.uniform(0, sum(w for _v, w in choices))
+    for val, weight in choices:
+        x -= weight
+        if x <= 0:
+            return val
+
+    return choices[-1][0]
+
+
+def package_names(npkgs):
+    """
+    :param npkgs: Number of package names
+    :return: A list of package names, core RPMs first
+
+    >>> package_names(7)
+    ['kernel', 'glibc', 'bash', 'openssl', 'zlib', 'pkg0', 'pkg1']
+    """
+    ncore = min(npkgs, len(RUM.CORE_RPMS))
+    return RUM.CORE_RPMS[:ncore] + ["pkg%d" % i for i in
+                                    range(npkgs - ncore)]
+
+
+def _zipf_choice(rnd, names):
+    """
+    Choose a name; the i-th name is chosen with weight about 1 / (i + 1).
+    """
+    return names[min(int(len(names) ** rnd.random()) - 1, len(names) - 1)]
+
+
+def mk_errata(nerrata=100, npkgs=300, seed=0):
+    """
+    Generate a list of synthetic (complemented) errata.
+
+    :param nerrata: Number of errata to generate
+    :param npkgs: Number of distinct update package names
+    :param seed: Random seed
+    """
+    rnd = random.Random(seed)
+    names = package_names(npkgs)
+    es = []
+
+    for i in range(nerrata):
+        etype = _weighted_choice(rnd, ERRATA_TYPES)
+        nups = rnd.randint(1, 4)
+        uns = sorted(set(_zipf_choice(rnd, names) for _i in range(nups)))
+        ups = [dict(name=n, epoch=0, version="1.%d" % rnd.randint(0, 9),
+                    release="%d.el6" % rnd.randint(1, 9), arch="x86_64")
+               for n in uns]
+        ncves = rnd.randint(1, 5) if etype == 'S' else 0
+        cves = [dict(cve="CVE-%d-%04d" % (rnd.randint(2010, 2014),
+                                          rnd.randint(0, 9999)),
+                     url="http://example.com/", metrics="AV:N",
+                     score="%.1f" % rnd.uniform(0, 10))
+                for _i in range(ncves)]
+        date = _START_DATE + datetime.timedelta(days=rnd.randint(0, 730))
+        desc = ' '.join(rnd.choice(WORDS) for _i in range(8))
+
+        e = dict(advisory="RH%sA-%d:%04d" % (etype, date.year, i),
+                 synopsis="Synthetic errata %d" % i, description=desc,
+                 issue_date=date.strftime("%Y-%m-%d"),
+                 update_date=date.strftime("%Y-%m-%d"),
+                 severity=(_weighted_choice(rnd, RHSA_SEVERITIES)
+                           if etype == 'S' else "N/A"),
+                 cves=cves, bzs=[], packages=ups, updates=ups,
+                 update_names=uns)
+        es.append(e)
+
+    return es
+
+
+def mk_cve_cvss_map(errata):
+    """
+    :param errata: A list of errata :function:`mk_errata` made
+    :return: A dict :: {cve: cve_and_cvss_data} of CVEs of `errata`
+    """
+    return dict((c["cve"], dict(c)) for e in errata for c in e["cves"])
+
+
+def mk_installed(nrpms=1000, seed=0, vendor="Red Hat, Inc."):
+    """
+    Generate a list of synthetic installed RPMs older than any updates
+    :function:`mk_errata` makes. Some of them are built by others.
+
+    :param nrpms: Number of RPMs
+    :param seed: Random seed
+    :return: A list of rpmkit.updateinfo.base.Package objects
+    """
+    rnd = random.Random(seed)
+    ips = []
+    for name in package_names(nrpms):
+        (pvendor, bhost) = (vendor, "x86-001.build.bos.redhat.com")
+        if rnd.random() < 0.05:
+            (pvendor, bhost) = ("Example, Inc.", "build.example.com")
+
+        ips.append(rpmkit.updateinfo.base.Package(name, "1.0", "1.el6",
+                                                  "x86_64", 0,
+                                                  "Synthetic " + name,
+                                                  pvendor, bhost))
+    return ips
+
+
+def mk_hosts(nhosts=100, nrpms=1000, nprofiles=10, variance=0.1, seed=0):
+    """
+    Generate a synthetic fleet. Hosts are built from a few profiles and most
+    of them have exactly same installed RPMs as its profile's, and others have
+    some more RPMs or some RPMs updated.
+
+    :param nhosts: Number of hosts
+    :param nrpms: Number of RPMs installed in each profile
+    :param nprofiles: Number of profiles
+    :param variance: Ratio of hosts differ from their profiles
+    :param seed: Random seed
+    :return: A list of (host_id, installed RPMs); lists of installed RPMs of
+        hosts same as their profiles are shared
+    """
+    rnd = random.Random(seed)
+    base = mk_installed(nrpms + nprofiles * 10, seed)
+    profiles = [sorted(rnd.sample(base, nrpms),
+                       key=lambda p: p["name"]) for _i in range(nprofiles)]
+
+    hosts = []
+    for i in range(nhosts):
+        ips = profiles[i % nprofiles]
+        if rnd.random() < variance:
+            ips = list(ips)
+            for _j in range(rnd.randint(1, 5)):
+                k = rnd.randrange(len(ips))
+                p = ips[k]
+                ips[k] = rpmkit.updateinfo.base.Package(
+                    p["name"], "1.0", "%d.el6" % rnd.randint(2, 9), p["arch"],
+                    p["epoch"], p["summary"], p["vendor"], p["buildhost"])
+            ips.append(rpmkit.updateinfo.base.Package("extra%d" % i, "1.0",
+                                                      "1", "noarch", 0))
+        hosts.append(("host-%05d" % i, ips))
+
+    return hosts
+
+
+def mk_hosts_datadir(topdir, hosts):
+    """
+    Make a dir for each host in `topdir` and write the list of its installed
+    RPMs into rpm-qa.txt in it, so that hosts can be analyzed from the dirs,
+    see :mod:`rpmkit.updateinfo.rpmlist`.
+
+    :param topdir: Top dir to make hosts' dirs in
+    :param hosts: A list of (host_id, installed RPMs), see :function:`mk_hosts`
+    :return: `topdir`
+    """
+    for hid, ips in hosts:
+        hdir = os.path.join(topdir, hid)
+        if not os.path.exists(hdir):
+            os.makedirs(hdir)
+
+        with open(os.path.join(hdir, "rpm-qa.txt"), 'w') as out:
+            for pkg in ips:
+                out.write("%(epoch)s:%(name)s-%(version)s-%(release)s."
+                          "%(arch)s\n" % pkg)
+
+    return topdir
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,83 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.keywords as TT
+import rpmkit.tests.common as C
+import rpmkit.utils as U
+
+import os.path
+import random
+import unittest
+
+
+KEYWORDS = ["crash", "panic", "hang", "SEGV", "segmentation fault",
+            "data corruption", "fault", "data", "kernel panic", "an"]
+
+
+class Test_10_KeywordMatcher(unittest.TestCase):
+
+    def test_10_search__same_as_substring_search(self):
+        rnd = random.Random(0)
+        words = KEYWORDS + ["kernel", "segmentation", "change", "x", "y"]
+        matcher = TT.KeywordMatcher(KEYWORDS)
+
+        for _i in range(500):
+            text = ' '.join(rnd.choice(words) for _j in range(6))
+            self.assertEquals(matcher.search(text),
+                              [k for k in KEYWORDS if k in text])
+
+    def test_20_search__no_keywords(self):
+        self.assertEquals(TT.KeywordMatcher([]).search("crash"), [])
+
+    def test_30_get_matcher(self):
+        self.assertTrue(TT.get_matcher(KEYWORDS) is
+                        TT.get_matcher(list(KEYWORDS)))
+
+
+class Test_20_cache(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.path = os.path.join(self.workdir, TT.CACHE_FILE)
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_save_and_load_cache(self):
+        kwds = ["Test_20_cache", "hang"]
+        digest = TT.keywords_hash(kwds)
+        errata = dict(advisory="RHBA-2015:0001", description="may hang")
+
+        self.assertEquals(TT.get_matcher(kwds).match(errata), ["hang"])
+        TT.save_cache(self.path)
+        self.assertTrue(os.path.exists(self.path))
+
+        TT._HITS[digest].clear()
+        TT.load_cache(self.path)
+        self.assertEquals(TT._HITS[digest], {"RHBA-2015:0001": ["hang"]})
+
+        # Hits cached are used instead of searching the description again.
+        errata["description"] = "no keywords"
+        self.assertEquals(TT.get_matcher(kwds).match(errata), ["hang"])
+
+    def test_20_take_new_hits_and_add_hits(self):
+        kwds = ["Test_20_cache_20", "crash"]
+        digest = TT.keywords_hash(kwds)
+        errata = dict(advisory="RHBA-2015:0002", description="may crash")
+
+        TT.take_new_hits()
+        self.assertEquals(TT.get_matcher(kwds).match(errata), ["crash"])
+        hits = TT.take_new_hits()
+        self.assertEquals(hits, {digest: {"RHBA-2015:0002": ["crash"]}})
+        self.assertEquals(TT.take_new_hits(), {})
+
+        # Hits passed from other processes are saved with others.
+        TT._HITS[digest].clear()
+        TT.add_hits(hits)
+        TT.save_cache(self.path)
+        self.assertEquals(U.json_load(self.path)[digest],
+                          {"RHBA-2015:0002": ["crash"]})
+
+# vim:sw=4:ts=4:et:
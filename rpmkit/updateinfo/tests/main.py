@@ -0,0 +1,156 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.main as TT
+import rpmkit.updateinfo.tests.fixtures as F
+import rpmkit.tests.common as C
+
+import csv
+import os
+import os.path
+import unittest
+
+
+class Test_10_analyze_errata(unittest.TestCase):
+
+    def setUp(self):
+        self.errata = F.mk_errata(300)
+
+    def test_10_buckets(self):
+        res = TT.analyze_errata(self.errata, [], 4.0)
+        (rhsa, rhba, rhea) = (res["rhsa"], res["rhba"], res["rhea"])
+
+        self.assertEquals(sum(n for _t, n in res["rate_by_type"]),
+                          len(self.errata))
+        self.assertEquals(sum(n for _s, n in rhsa["rate_by_sev"]),
+                          len(rhsa["list"]))
+        self.assertTrue(all(e["severity"] == "Critical" for e
+                            in rhsa["list_critical"]))
+        self.assertTrue(all(e["advisory"].startswith("RHEA") for e
+                            in rhea["list"]))
+        self.assertTrue(all(e["keywords"] for e in rhba["list_by_kwds"]))
+        self.assertTrue(all(e in rhba["list_by_kwds"] for e
+                            in rhba["list_by_kwds_of_core_rpms"]))
+        self.assertTrue(all("cvsses_s" in e for e
+                            in rhsa["list_higher_cvss_score"]))
+
+    def test_20_counts(self):
+        res = TT.analyze_errata(self.errata, [])
+        rhsa = res["rhsa"]
+        counts = dict(rhsa["list_n_by_pnames"])
+
+        for name, n in counts.items():
+            self.assertEquals(n, len([e for e in rhsa["list"]
+                                      if name in e["update_names"]]))
+
+        for name, advs in rhsa["list_by_packages"]:
+            self.assertEquals(len(advs), counts[name])
+
+        ns = [n for _name, n in rhsa["list_n_by_pnames"]]
+        self.assertEquals(ns, sorted(ns, reverse=True))
+
+    def test_30_classified(self):
+        classified = TT.classify_errata(self.errata, 4.0)
+        self.assertEquals(len(classified), len(self.errata))
+
+        ebd = TT.ErrataByDate(self.errata)
+        for start, end in TT.split_period_monthly(20130101, 20150101):
+            idxs = ebd.indexes_in_period(start, end)
+            pes = [self.errata[i] for i in idxs]
+            res = TT.analyze_errata(pes, [], 4.0, classified=[classified[i]
+                                                              for i in idxs])
+            self.assertEquals(res, TT.analyze_errata(pes, [], 4.0))
+
+
+class Test_20_dump_results(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.errata = F.mk_errata(100)
+        self.updates = [u for e in self.errata for u in e["updates"]]
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_csv(self):
+        TT.dump_results(self.workdir, [], self.errata, self.updates, 4.0,
+                        fmt="csv")
+
+        sdir = os.path.join(self.workdir, "errata_summary")
+        self.assertTrue(os.path.exists(os.path.join(sdir, "overview.csv")))
+        self.assertTrue(os.path.exists(os.path.join(sdir, "rhsa_cvss.csv")))
+
+        path = os.path.join(self.workdir, "errata_details", "errata.csv")
+        rows = list(csv.reader(open(path)))
+        self.assertEquals(len(rows), len(self.errata) + 1)  # + headers
+
+    def test_20_csv__no_details(self):
+        TT.dump_results(self.workdir, [], self.errata, self.updates,
+                        details=False, fmt="csv")
+        self.assertFalse(os.path.exists(os.path.join(self.workdir,
+                                                     "errata_details")))
+
+    def test_30_csv__errata_only(self):
+        data = dict(errata=TT.analyze_errata(self.errata, self.updates))
+        TT.dump_results(self.workdir, [], self.errata, self.updates,
+                        details=False, fmt="csv", data=data)
+
+        summary = TT.U.json_load(os.path.join(self.workdir, "summary.json"))
+        self.assertEquals(sorted(summary), ["errata"])
+
+        path = os.path.join(self.workdir, "errata_summary", "overview.csv")
+        rows = list(csv.reader(open(path)))
+        self.assertFalse(any("# of Installed RPMs" in r for r in rows))
+
+
+class Test_30_ErrataByDate(unittest.TestCase):
+
+    def test_10_in_period(self):
+        errata = F.mk_errata(500)
+        ebd = TT.ErrataByDate(errata)
+        periods = TT.split_period_monthly(*TT.period_to_dates("2013",
+                                                              "2015-01"))
+        self.assertEquals(len(periods), 25)
+
+        for start, end in periods:
+            self.assertEquals(ebd.in_period(start, end),
+                              [e for e in errata if
+                               TT.errata_in_period(e, start, end)])
+
+        self.assertEquals(sum(len(ebd.in_period(*p)) for p in periods),
+                          len(errata))
+
+
+class Test_40_list_updates_from_errata(unittest.TestCase):
+
+    def test_10_multilib(self):
+        def _up(arch, release="30.el6"):
+            return dict(name="openssl", epoch=0, version="1.0.1e",
+                        release=release, arch=arch)
+
+        errata = [dict(updates=[_up("x86_64", "15.el6"),
+                                _up("i686", "15.el6")]),
+                  dict(updates=[_up("x86_64"), _up("i686")]),
+                  dict(updates=[_up("i686"), _up("x86_64")])]
+
+        # Same as the first one in the sorted unique updates of same names.
+        ups = sorted(TT.U.uconcat(e["updates"] for e in errata))
+        ref = sorted(ups, cmp=TT.rpmkit.rpmutils.pcmp, reverse=True)[0]
+
+        for es in (errata, errata[::-1]):
+            self.assertEquals(TT.list_updates_from_errata(es), [ref])
+            self.assertEquals(ref["arch"], "i686")
+
+
+if os.environ.get("RPMKIT_BENCHMARK", False):
+    class Test_90_analyze_errata_benchmark(unittest.TestCase):
+
+        def test_10_20k_errata(self):
+            errata = F.mk_errata(20000, 3000)
+            (_res, elapsed) = TT.U.timeit(TT.analyze_errata, errata, [], 4.0)
+            # It took about 45 secs before errata were classified in a pass.
+            self.assertTrue(elapsed.total_seconds() < 10, str(elapsed))
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,112 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.multihosts as TT
+import rpmkit.updateinfo.engine
+import rpmkit.updateinfo.tests.engine as E
+import rpmkit.updateinfo.tests.repometa as R
+import rpmkit.updateinfo.trace
+import rpmkit.tests.common as C
+
+import os.path
+import os
+import unittest
+
+
+class Test_10_hosts_rpmroot_g(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        for hid in ("host_%02d" % i for i in range(20)):
+            os.makedirs(os.path.join(self.workdir, hid, "var/cache"))
+
+        os.makedirs(os.path.join(self.workdir, ".hidden"))
+        open(os.path.join(self.workdir, "hosts.json"), 'w').close()
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_hosts_rpmroot_g(self):
+        for workers in (1, 4):
+            res = sorted(TT.hosts_rpmroot_g(self.workdir, workers=workers,
+                                            progress=5))
+            self.assertEquals(res, [("host_%02d" % i, None) for i
+                                    in range(20)])
+
+
+class _Broken(rpmkit.updateinfo.engine.Base):
+
+    def __init__(self, *args, **kwargs):
+        raise RuntimeError("Backend must not be initialized")
+
+
+class Test_15_analyze_host(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.root = os.path.join(self.workdir, "host_00")
+        self.hworkdir = os.path.join(self.workdir, "out")
+        self.cachedir = os.path.join(self.workdir, "cache")
+        R.mk_repo(os.path.join(self.cachedir, "rhel-6"))
+
+        os.makedirs(self.root)
+        with open(os.path.join(self.root, "rpm-qa.txt"), 'w') as out:
+            for name, epoch, version, release, arch in E.INSTALLED:
+                out.write("%s:%s-%s-%s.%s\n" % (epoch, name, version,
+                                                release, arch))
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_installed_nevras_g__rpm_list(self):
+        self.assertEquals(TT.installed_rpms_key(TT.installed_nevras_g(
+                          self.root)), TT.installed_rpms_key(E.INSTALLED))
+
+    def test_20_analyze_host__unchanged(self):
+        pargs = (["rhel-6"], self.cachedir, "engine",
+                 dict(engine=rpmkit.updateinfo.engine.Base), True)
+        aargs = (0, [], [], (), None)
+        akwargs = dict(fmt="csv", details=False)
+        res = TT.analyze_host("host_00", self.root, self.hworkdir, pargs,
+                              aargs, akwargs)
+        self.assertEquals(res["status"], "ok", res["error"])
+        self.assertTrue(res["fingerprint"])
+
+        # Skipped before the backend is initialized.
+        pargs = pargs[:3] + (dict(engine=_Broken), True)
+        res2 = TT.analyze_host("host_00", self.root, self.hworkdir, pargs,
+                               aargs, akwargs,
+                               prev_fingerprint=res["fingerprint"])
+        self.assertEquals(res2["status"], "unchanged", res2["error"])
+
+        # Hosts having same RPMs are also skipped before that.
+        claims = dict()
+        claims[TT.installed_rpms_key(E.INSTALLED)] = "host_01"
+        res3 = TT.analyze_host("host_00", self.root, self.hworkdir, pargs,
+                               aargs, akwargs, claims=claims)
+        self.assertEquals(res3["status"], "same", res3["error"])
+        self.assertEquals(res3["same_as"], "host_01")
+
+
+class Test_20_main(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.hostsdir = os.path.join(self.workdir, "hosts")
+        os.makedirs(os.path.join(self.hostsdir, "host_00"))
+
+    def tearDown(self):
+        rpmkit.updateinfo.trace.disable()
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_main__trace_out(self):
+        trace_out = os.path.join(self.workdir, "trace.json")
+        res = TT.main(self.hostsdir, os.path.join(self.workdir, "out"),
+                      trace_out=trace_out)
+        self.assertEquals(res, [])
+        self.assertTrue(os.path.exists(trace_out))
+        self.assertFalse(rpmkit.updateinfo.trace.is_enabled())
+
+# vim:sw=4:ts=4:et:
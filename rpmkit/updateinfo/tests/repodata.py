@@ -0,0 +1,50 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.repodata as TT
+import rpmkit.updateinfo.base
+import rpmkit.updateinfo.tests.engine as E
+import rpmkit.updateinfo.tests.repometa as R
+import rpmkit.tests.common as C
+
+import os.path
+import unittest
+
+
+class Test_10_Base(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.repodir = R.mk_repo(os.path.join(self.workdir, "mirror/rhel-6"))
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def _base(self, repos):
+        base = TT.Base(self.workdir, repos, cachedir=self.workdir)
+        base._packages["installed"] = \
+            [rpmkit.updateinfo.base.Package(n, v, r, a, e) for n, e, v, r, a
+             in E.INSTALLED]
+        return base
+
+    def test_10_find_repodir(self):
+        self.assertEquals(TT.find_repodir("mirror/rhel-6", self.workdir),
+                          self.repodir)
+        self.assertEquals(TT.find_repodir(self.repodir, "/"), self.repodir)
+        self.assertTrue(TT.find_repodir("rhel-6", self.workdir) is None)
+
+    def test_20_list_errata_and_updates(self):
+        base = self._base(["mirror/rhel-6"])
+
+        self.assertEquals([e["advisory"] for e in base.list_errata()],
+                          ["RHSA-2014:1293", "RHSA-2014:1652"])
+        self.assertEquals([u["name"] for u in base.list_updates()],
+                          ["bash", "openssl"])
+
+    def test_30_list_errata__abspath(self):
+        base = self._base([self.repodir])
+        self.assertEquals(len(base.list_errata()), 2)
+
+# vim:sw=4:ts=4:et:
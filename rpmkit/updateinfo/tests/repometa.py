@@ -0,0 +1,174 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.repometa as TT
+import rpmkit.tests.common as C
+
+import gzip
+import os.path
+import os
+import unittest
+
+
+REPOMD_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<repomd xmlns="http://linux.duke.edu/metadata/repo">
+  <data type="primary">
+    <location href="repodata/0123-primary.xml.gz"/>
+  </data>
+  <data type="updateinfo">
+    <location href="repodata/4567-updateinfo.xml.gz"/>
+  </data>
+</repomd>
+"""
+
+PRIMARY_PKG = """
+<package type="rpm">
+  <name>%(name)s</name>
+  <arch>%(arch)s</arch>
+  <version epoch="%(epoch)s" ver="%(version)s" rel="%(release)s"/>
+  <summary>Summary of %(name)s</summary>
+</package>"""
+
+UPDATE = """
+<update from="security@redhat.com" status="final" type="%(type)s"
+        version="1">
+  <id>%(advisory)s</id>
+  <title>%(synopsis)s</title>
+  <severity>%(severity)s</severity>
+  <issued date="%(issue_date)s"/>
+  <updated date="%(issue_date)s"/>
+  <description>Description of %(advisory)s</description>
+  <references>
+    <reference href="https://bugzilla.redhat.com/1" id="1"
+               title="bug 1" type="bugzilla"/>%(cves)s
+  </references>
+  <pkglist>
+    <collection short="rhel">
+      <name>rhel</name>%(packages)s
+    </collection>
+  </pkglist>
+</update>"""
+
+UPDATE_PKG = """
+      <package arch="%(arch)s" epoch="%(epoch)s" name="%(name)s"
+               release="%(release)s" src="%(name)s.src.rpm"
+               version="%(version)s">
+        <filename>%(name)s.rpm</filename>
+      </package>"""
+
+UPDATE_CVE = """
+    <reference href="https://access.redhat.com/security/cve/%(cve)s"
+               id="%(cve)s" title="%(cve)s" type="cve"/>"""
+
+
+def _pkg(name, version, release="1.el6", arch="x86_64", epoch="0"):
+    return dict(name=name, epoch=epoch, version=version, release=release,
+                arch=arch)
+
+
+# Packages in repos and errata.
+PACKAGES = [_pkg("bash", "4.1.2"), _pkg("bash", "4.1.2", "15.el6"),
+            _pkg("zlib", "1.2.3"), _pkg("zlib", "1.2.3", "29.el6"),
+            _pkg("openssl", "1.0.1e", "30.el6"),
+            _pkg("openssl", "1.0.1e", "30.el6", "i686"),
+            _pkg("kernel", "2.6.32", "504.el6")]
+
+ERRATA = [dict(advisory="RHSA-2014:1293", type="security",
+               synopsis="Critical: bash security update",
+               severity="Critical", issue_date="2014-09-24",
+               cves=["CVE-2014-6271"], packages=[PACKAGES[1]]),
+          dict(advisory="RHBA-2014:1234", type="bugfix",
+               synopsis="zlib bug fix update", severity="",
+               issue_date="2014-09-01", cves=[], packages=[PACKAGES[3]]),
+          dict(advisory="RHSA-2014:1652", type="security",
+               synopsis="Moderate: openssl security update",
+               severity="Moderate", issue_date="2014-10-16",
+               cves=["CVE-2014-3566", "CVE-2014-3513"],
+               packages=PACKAGES[4:6])]
+
+
+def mk_repo(repodir, errata=ERRATA, packages=PACKAGES):
+    """
+    Make a fake repo has repomd.xml, updateinfo.xml.gz and primary.xml.gz.
+    """
+    mdir = os.path.join(repodir, "repodata")
+    if not os.path.exists(mdir):
+        os.makedirs(mdir)
+
+    open(os.path.join(mdir, "repomd.xml"), 'w').write(REPOMD_XML)
+
+    with gzip.open(os.path.join(mdir, "0123-primary.xml.gz"), 'wb') as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                  '<metadata xmlns="http://linux.duke.edu/metadata/common" '
+                  'packages="%d">' % len(packages))
+        for pkg in packages:
+            out.write(PRIMARY_PKG % pkg)
+        out.write("\n</metadata>\n")
+
+    with gzip.open(os.path.join(mdir, "4567-updateinfo.xml.gz"), 'wb') as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n<updates>')
+        for e in errata:
+            cves = ''.join(UPDATE_CVE % dict(cve=c) for c in e["cves"])
+            pkgs = ''.join(UPDATE_PKG % p for p in e["packages"])
+            out.write(UPDATE % dict(e, cves=cves, packages=pkgs))
+        out.write("\n</updates>\n")
+
+    return repodir
+
+
+class Test_10_parse(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.repodir = mk_repo(os.path.join(self.workdir, "rhel-6"))
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_repomd_files(self):
+        files = TT.repomd_files(self.repodir)
+        self.assertEquals(sorted(files.keys()), ["primary", "updateinfo"])
+        self.assertTrue(all(os.path.exists(f) for f in files.values()))
+
+    def test_20_updateinfo_g(self):
+        path = TT.repomd_files(self.repodir)["updateinfo"]
+        es = list(TT.updateinfo_g(path))
+
+        self.assertEquals([e["advisory"] for e in es],
+                          [e["advisory"] for e in ERRATA])
+        self.assertEquals(es[0]["severity"], "Critical")
+        self.assertEquals(es[0]["issue_date"], "2014-09-24")
+        self.assertEquals([c["cve"] for c in es[2]["cves"]],
+                          ERRATA[2]["cves"])
+        self.assertEquals([p["arch"] for p in es[2]["packages"]],
+                          ["x86_64", "i686"])
+        self.assertEquals(es[0]["url"],
+                          "http://rhn.redhat.com/errata/RHSA-2014-1293.html")
+
+    def test_30_primary_g(self):
+        path = TT.repomd_files(self.repodir)["primary"]
+        self.assertEquals(list(TT.primary_g(path))[0],
+                          ("bash", "0", "4.1.2", "1.el6", "x86_64"))
+
+
+class Test_20_load(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        mk_repo(os.path.join(self.workdir, "yum/x86_64/6Server/rhel-6"))
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_load(self):
+        rmd = TT.load(["rhel-6"], self.workdir)
+
+        self.assertEquals(len(rmd.errata), len(ERRATA))
+        self.assertEquals(len(rmd.packages[("bash", "x86_64")]), 2)
+        self.assertEquals(rmd.errata_by_na[("openssl", "i686")],
+                          (("0", "1.0.1e", "30.el6", 2), ))
+        self.assertTrue(TT.load(["rhel-6"], self.workdir) is rmd)
+
+# vim:sw=4:ts=4:et:
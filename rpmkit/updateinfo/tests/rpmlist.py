@@ -0,0 +1,46 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.rpmlist as TT
+import rpmkit.tests.common as C
+
+import os.path
+import os
+import unittest
+
+
+# Excerpt of installed-rpms in sosreports.
+INSTALLED_RPMS = """\
+bash-4.1.2-15.el6_5.1.x86_64                                Mon Jul 14 2014
+gpg-pubkey-fd431d51-4ae0493b                                Mon Jul 14 2014
+openssl-1.0.1e-15.el6.x86_64                                Mon Jul 14 2014
+rpm-4.8.0-37.el6.x86_64                                     Mon Jul 14 2014
+"""
+
+
+class Test_10_load(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.path = os.path.join(self.workdir, "installed-rpms")
+        open(self.path, 'w').write(INSTALLED_RPMS)
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_find_rpm_list(self):
+        self.assertEquals(TT.find_rpm_list(self.workdir), self.path)
+
+        os.makedirs(os.path.join(self.workdir, "var/lib/rpm"))
+        self.assertTrue(TT.find_rpm_list(self.workdir) is None)
+
+    def test_20_load(self):
+        pkgs = TT.load(self.path)
+        self.assertEquals([(p["name"], p["release"]) for p in pkgs],
+                          [("bash", "15.el6_5.1"), ("openssl", "15.el6"),
+                           ("rpm", "37.el6")])
+        self.assertEquals(TT.guess_rhel_version(pkgs), 6)
+
+# vim:sw=4:ts=4:et:
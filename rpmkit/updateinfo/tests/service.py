@@ -0,0 +1,124 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.service as TT
+import rpmkit.updateinfo.tests.engine as E
+import rpmkit.updateinfo.tests.repometa as R
+import rpmkit.tests.common as C
+import rpmkit.utils as U
+
+import httplib
+import os.path
+import socket
+import threading
+import unittest
+
+
+class Test_10_Service(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        R.mk_repo(os.path.join(self.workdir, "rhel-6"))
+        self.service = TT.Service(["rhel-6"], self.workdir, workers=1,
+                                  queue_size=1)
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_submit(self):
+        data = self.service.submit(dict(id="host-0", installed=E.INSTALLED))
+
+        self.assertEquals(data["id"], "host-0")
+        rhsa = data["errata"]["rhsa"]["list"]
+        self.assertEquals(sorted(e["advisory"] for e in rhsa),
+                          ["RHSA-2014:1293", "RHSA-2014:1652"])
+        self.assertEquals(len(data["installed"]["list"]), len(E.INSTALLED))
+        self.assertEquals(len(data["updates"]["list"]), 2)
+        self.assertEquals(self.service.status()["served"], 1)
+
+    def test_20_submit__bad_request(self):
+        self.assertRaises(TT.BadRequest, self.service.submit, dict(id="x"))
+        self.assertRaises(TT.BadRequest, self.service.submit,
+                          dict(installed=[["bash", "0"]]))
+        self.assertRaises(TT.BadRequest, self.service.submit,
+                          dict(installed=[]))
+        self.assertEquals(self.service.status()["failed"], 3)
+
+    def test_30_submit__busy(self):
+        self.service.stats["queued"] = 1  # A request is waiting.
+        self.assertRaises(TT.ServiceBusy, self.service.submit,
+                          dict(installed=E.INSTALLED))
+        self.assertEquals(self.service.status()["rejected"], 1)
+
+
+class Test_20_server(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        R.mk_repo(os.path.join(self.workdir, "rhel-6"))
+        service = TT.Service(["rhel-6"], self.workdir)
+        service.preload()
+
+        self.server = TT.make_server("localhost:0", service)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        C.cleanup_workdir(self.workdir)
+
+    def _request(self, method, path, body=None):
+        conn = httplib.HTTPConnection(*self.server.server_address)
+        try:
+            conn.request(method, path, body)
+            resp = conn.getresponse()
+            return (resp.status, U.json.loads(resp.read()))
+        finally:
+            conn.close()
+
+    def test_10_analyze(self):
+        req = U.json_dumps(dict(id="host-0", installed=E.INSTALLED))
+        (status, data) = self._request("POST", "/analyze", req)
+
+        self.assertEquals(status, 200)
+        self.assertEquals(len(data["errata"]["rhsa"]["list"]), 2)
+
+        (status, data) = self._request("GET", "/status")
+        self.assertEquals(status, 200)
+        self.assertEquals(data["served"], 1)
+
+    def test_20_analyze__bad_request(self):
+        (status, data) = self._request("POST", "/analyze", "[]")
+        self.assertEquals(status, 400)
+        self.assertTrue("error" in data)
+
+
+class Test_30_make_server__unix(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.path = os.path.join(self.workdir, "service.sock")
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_not_a_socket(self):
+        open(self.path, 'w').write("data\n")
+        self.assertRaises(ValueError, TT.make_server, "unix:" + self.path,
+                          None)
+        self.assertEquals(open(self.path).read(), "data\n")
+
+    def test_20_socket_left(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)  # Left by the server run previously.
+        sock.close()
+
+        server = TT.make_server("unix:" + self.path, None)
+        server.server_close()
+        self.assertEquals(server.server_address, self.path)
+
+# vim:sw=4:ts=4:et:
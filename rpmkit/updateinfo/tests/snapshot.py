@@ -0,0 +1,83 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.snapshot as TT
+import rpmkit.tests.common as C
+import rpmkit.utils as U
+
+import os.path
+import unittest
+
+
+def _mk_data(advs, vers):
+    es = [dict(advisory=a) for a in advs]
+    us = [dict(name="bash", epoch=0, version=v, release="1.el6",
+               arch="x86_64") for v in vers]
+    return (es, us)
+
+
+class Test_10_save_and_load(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.refdirs = [os.path.join(self.workdir, d) for d in ("0", "1")]
+        for d in self.refdirs:
+            os.makedirs(d)
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_save_and_load(self):
+        (es, us) = _mk_data(["RHSA-2014:0001"], ["4.1"])
+        path = TT.save(self.refdirs[0], es, us, id="host-0")
+        self.assertTrue(os.path.exists(path))
+
+        snap = TT.load(self.refdirs[0])
+        self.assertEquals(snap.advisories, frozenset(["RHSA-2014:0001"]))
+        self.assertEquals(snap.nevras,
+                          frozenset([("bash", "0", "4.1", "1.el6",
+                                      "x86_64")]))
+        self.assertTrue(TT.load(self.refdirs[0]) is snap)
+
+    def test_20_load__fallback_to_full_lists(self):
+        (es, us) = _mk_data(["RHSA-2014:0001"], ["4.1"])
+        U.json_dump(dict(data=es), os.path.join(self.refdirs[0],
+                                                "errata.json"))
+        U.json_dump(dict(data=us), os.path.join(self.refdirs[0],
+                                                "updates.json"))
+        snap = TT.load(self.refdirs[0])
+        self.assertEquals(snap.advisories, frozenset(["RHSA-2014:0001"]))
+        self.assertEquals(len(snap.nevras), 1)
+
+    def test_22_load__fallback_updated(self):
+        es_path = os.path.join(self.refdirs[0], "errata.json")
+        (es, us) = _mk_data(["RHSA-2014:0001"], ["4.1"])
+        U.json_dump(dict(data=es), es_path)
+        U.json_dump(dict(data=us), os.path.join(self.refdirs[0],
+                                                "updates.json"))
+        self.assertEquals(TT.load(self.refdirs[0]).advisories,
+                          frozenset(["RHSA-2014:0001"]))
+
+        (es, _us) = _mk_data(["RHBA-2014:0002"], [])
+        U.json_dump(dict(data=es), es_path)
+        mtime = os.path.getmtime(es_path) + 10
+        os.utime(es_path, (mtime, mtime))
+
+        snap = TT.load(self.refdirs[0])
+        self.assertEquals(snap.advisories, frozenset(["RHBA-2014:0002"]))
+
+    def test_30_delta__chain(self):
+        TT.save(self.refdirs[0], *_mk_data(["RHSA-2014:0001"], ["4.1"]))
+        TT.save(self.refdirs[1], *_mk_data(["RHBA-2014:0002"], ["4.2"]))
+
+        (es, us) = _mk_data(["RHSA-2014:0001", "RHBA-2014:0002",
+                             "RHEA-2014:0003"], ["4.1", "4.2", "4.3"])
+        ref = TT.load_chain(self.refdirs)
+        (des, dus) = TT.delta(es, us, ref)
+
+        self.assertEquals([e["advisory"] for e in des], ["RHEA-2014:0003"])
+        self.assertEquals([u["version"] for u in dus], ["4.3"])
+
+# vim:sw=4:ts=4:et:
@@ -0,0 +1,84 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.store as TT
+import rpmkit.updateinfo.yumbase
+import rpmkit.tests.common as C
+
+import glob
+import os.path
+import unittest
+
+
+def _mk_errata(advisory, update_names):
+    return dict(advisory=advisory, synopsis="Synopsis of " + advisory,
+                description="Description of " + advisory,
+                update_names=update_names)
+
+
+class Test_10_ErrataStore(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        self.store = TT.ErrataStore(os.path.join(self.workdir,
+                                                 TT.STORE_DIRNAME))
+
+    def tearDown(self):
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_dump_and_load__shared_among_hosts(self):
+        es0 = [_mk_errata("RHSA-2014:0001", ["bash"]),
+               _mk_errata("RHBA-2014:0002", ["zlib"])]
+        es1 = [_mk_errata("RHSA-2014:0001", ["bash", "bash-doc"])]
+
+        for hid, es in (("host-0", es0), ("host-1", es1)):
+            hdir = os.path.join(self.workdir, hid)
+            os.makedirs(hdir)
+            TT.dump(dict(data=es), os.path.join(hdir, "errata.json"),
+                    self.store)
+
+        self.assertEquals(len(glob.glob(os.path.join(self.store.topdir,
+                                                     "*.json"))), 2)
+
+        for hid, es in (("host-0", es0), ("host-1", es1)):
+            path = os.path.join(self.workdir, hid, "errata.json")
+            self.assertEquals(TT.load(path)["data"], es)
+
+            refs = TT.load(path, False)["data"]
+            self.assertTrue(all(TT.is_errata_ref(r) for r in refs))
+
+    def test_20_put__revised_errata(self):
+        errata = _mk_errata("RHSA-2014:0001", ["bash"])
+        ref0 = self.store.put(errata)
+
+        errata["description"] = "Revised description"
+        ref1 = self.store.put(errata)
+
+        self.assertNotEquals(ref0, ref1)
+        self.assertEquals(self.store.get(ref1)["description"],
+                          "Revised description")
+
+    def test_30_dump_and_load__yumbase_errata(self):
+        nmd = dict(update_id="RHBA-2015:0001", title="bash bug fix",
+                   description="...", updated="2015-01-01",
+                   issued="2015-01-01", solution="...", type="bugfix",
+                   references=[dict(id="1", title="bug", type="bugzilla")],
+                   pkglist=[dict(packages=[dict(name="bash", epoch="0",
+                                                version="4.1.2",
+                                                release="29.el6",
+                                                arch="x86_64")])])
+        errata = rpmkit.updateinfo.yumbase.Errata(nmd)
+        errata["update_names"] = ["bash"]
+
+        path = os.path.join(self.workdir, "errata.json")
+        TT.dump(dict(data=[errata]), path, self.store)
+
+        refs = TT.load(path, False)["data"]
+        self.assertTrue(TT.is_errata_ref(refs[0]))
+        self.assertEquals(refs[0]["update_names"], ["bash"])
+        self.assertFalse("description" in refs[0])
+        self.assertEquals(TT.load(path)["data"], [errata.to_dict()])
+
+# vim:sw=4:ts=4:et:
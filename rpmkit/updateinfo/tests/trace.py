@@ -0,0 +1,68 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato at redhat.com>
+# License: GPLv3+
+#
+import rpmkit.updateinfo.trace as TT
+import rpmkit.updateinfo.main as RUM
+import rpmkit.updateinfo.tests.fixtures as F
+import rpmkit.tests.common as C
+import rpmkit.utils as U
+
+import os.path
+import unittest
+
+
+class Test_10_trace(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = C.setup_workdir()
+        TT.enable()
+
+    def tearDown(self):
+        TT.disable()
+        C.cleanup_workdir(self.workdir)
+
+    def test_10_take_and_add(self):
+        with TT.phase("a"):
+            pass
+        start = len(TT.events())
+        with TT.phase("b"):
+            pass
+
+        evs = TT.take(start)
+        self.assertEquals([e["name"] for e in evs], ["b"])
+        self.assertEquals([e["name"] for e in TT.events()], ["a"])
+
+        TT.add(evs)
+        self.assertEquals([e["name"] for e in TT.events()], ["a", "b"])
+
+    def test_20_dump_results(self):
+        errata = F.mk_errata(50)
+        updates = [u for e in errata for u in e["updates"]]
+        RUM.dump_results(self.workdir, [], errata, updates, fmt="csv",
+                         details=False)
+
+        path = os.path.join(self.workdir, "trace.json")
+        TT.dump(path)
+        evs = U.json_load(path)["traceEvents"]
+        names = set(e["name"] for e in evs)
+
+        for name in ("analyze_errata", "dump", "dump_sheets", "make_sheet",
+                     "write_sheet"):
+            self.assertTrue(name in names, name)
+
+        self.assertTrue(all(e["ph"] == 'X' and e["dur"] >= 0 for e in evs))
+
+    def test_30_maxrss_delta(self):
+        with TT.phase("alloc"):
+            data = "x" * (64 << 20)  # 64 MB more than the peak so far.
+        with TT.phase("free"):
+            del data
+
+        (alloc, free) = [e["args"] for e in TT.events()]
+        self.assertTrue(alloc["maxrss_delta_kb"] >= (32 << 10))
+        self.assertEquals(free["maxrss_delta_kb"], 0)
+        self.assertEquals(free["maxrss_kb"], alloc["maxrss_kb"])
+
+# vim:sw=4:ts=4:et:
@@ -12,12 +12,46 @@ import rpmkit.updateinfo.yumbase as TT
 import rpmkit.updateinfo.utils as RUU
 import rpmkit.tests.common as C
 
+import collections
+import gc
 import os.path
 import os
+import pickle
 import shutil
+import sys
+import types
 import unittest
 
 
+def _nmd(advisory="RHBA-2015:0001"):
+    pkg = dict(name="bash", version="4.1.2", release="29.el6", epoch="0",
+               arch="x86_64")
+    return dict(update_id=advisory, title="bash bug fix",
+                description="Description", updated="2015-01-01",
+                issued="2015-01-01", solution="Solution", type="bugfix",
+                references=[dict(id="1", title="bug", type="bugzilla"),
+                            dict(id="CVE-2015-0001", type="cve",
+                                 href="https://access.redhat.com/cve")],
+                pkglist=[dict(packages=[pkg])])
+
+
+def _deep_size(obj):
+    """
+    :return: Size in bytes of `obj` and objects referred from it
+    """
+    (seen, objs, size) = (set(), [obj], 0)
+    while objs:
+        obj = objs.pop()
+        if id(obj) in seen or isinstance(obj, (type, types.ModuleType)):
+            continue
+
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        objs.extend(gc.get_referents(obj))
+
+    return size
+
+
 if RUU.is_rhel_or_fedora():
     class Test_10_Base(unittest.TestCase):
 
@@ -53,4 +87,46 @@ if RUU.is_rhel_or_fedora():
             pkgs = self.base.list_updates()
             self.assertTrue(isinstance(pkgs, list))
 
+
+class Test_20_Errata(unittest.TestCase):
+
+    def test_10_mapping(self):
+        errata = TT.Errata(_nmd())
+        self.assertFalse(hasattr(errata, "__dict__"))
+        self.assertTrue(isinstance(errata, collections.Mapping))
+        self.assertTrue("cves" in errata)
+        self.assertEquals(errata.get("keywords", []), [])
+
+        errata["keywords"] = ["crash"]
+        self.assertEquals(errata["keywords"], ["crash"])
+        self.assertEquals(errata, errata.to_dict())
+        self.assertEquals(len(errata), 14)
+
+    def test_20_release_notice_after_conversion(self):
+        nmd = _nmd()
+        errata = TT.Errata(nmd)
+        self.assertTrue(any(r is nmd for r in gc.get_referents(errata)))
+
+        errata["cves"] = []  # Not converted but not needed.
+        dict(errata)
+        self.assertFalse(any(r is nmd for r in gc.get_referents(errata)))
+        self.assertEquals(errata["cves"], [])
+        self.assertEquals(errata["package_names"], "bash")
+
+    def test_30_pickle(self):
+        errata = TT.Errata(_nmd())
+        errata["packages"]  # Partially converted.
+        copy = pickle.loads(pickle.dumps(errata, pickle.HIGHEST_PROTOCOL))
+        self.assertEquals(copy, errata)
+        self.assertEquals(copy["cves"][0]["cve"], "CVE-2015-0001")
+
+    def test_40_memory(self):
+        nmds = [_nmd("RHBA-2015:%04d" % i) for i in range(1000)]
+        es = [TT.Errata(nmd) for nmd in nmds]
+        for errata in es:
+            errata.to_dict()
+
+        # Notices are not kept after errata were converted.
+        self.assertTrue(_deep_size(es) < _deep_size((es, nmds)) * 0.7)
+
 # vim:sw=4:ts=4:et:
@@ -0,0 +1,181 @@
+#
+# Copyright (C) 2015 Red Hat, Inc.
+# Red Hat Author(s): Satoru SATOH <ssato@redhat.com>
+# License: GPLv3+
+#
+"""Phase level tracing of wall time, CPU time and peak RSS.
+
+Phases are recorded as complete ('X') events of Chrome trace format, which
+may be loaded into chrome://tracing or Perfetto UI, only if tracing is
+enabled. Recording phases costs almost nothing if it's disabled.
+
+Peak RSS is of the process and getrusage(2) cannot tell the peak of each
+phase, so that events have the peak RSS of the process at the end of the
+phase (maxrss_kb) and how much the phase raised it (maxrss_delta_kb), which
+is zero if the phase used less memory than the phases before.
+
+>>> enable()
+>>> with phase("test", host="host-0"):
+...     xs = list(traced_g(range(3), "item"))
+>>> [e["name"] for e in events()]
+['item', 'item', 'item', 'test']
+>>> sorted(events()[-1]["args"].keys())
+['cpu_ms', 'host', 'maxrss_delta_kb', 'maxrss_kb']
+>>> disable()
+>>> with phase("test"):
+...     pass
+>>> events()
+[]
+"""
+from __future__ import absolute_import
+
+import contextlib
+import logging
+import os
+import resource
+import threading
+import time
+
+import rpmkit.utils as U
+from rpmkit.globals import _
+
+
+LOG = logging.getLogger(__name__)
+
+_CATEGORY = "rk-updateinfo"
+
+# A list of events if tracing is enabled or None.
+_EVENTS = None
+
+
+def enable():
+    global _EVENTS
+    if _EVENTS is None:
+        _EVENTS = []
+
+
+def disable():
+    global _EVENTS
+    _EVENTS = None
+
+
+def is_enabled():
+    return _EVENTS is not None
+
+
+def events():
+    """
+    :return: A list of events recorded
+    """
+    return [] if _EVENTS is None else _EVENTS
+
+
+def take(start=0):
+    """
+    Remove events recorded after `start` and return them, e.g. to pass
+    events recorded in a worker process to the parent process.
+
+    :param start: Number of events recorded before
+    :return: A list of events
+    """
+    if _EVENTS is None:
+        return []
+
+    evs = _EVENTS[start:]
+    del _EVENTS[start:]
+    return evs
+
+
+def add(evs):
+    """
+    :param evs: A list of events recorded in other processes
+    """
+    if _EVENTS is not None:
+        _EVENTS.extend(evs)
+
+
+def _usage():
+    """
+    :return: A tuple of (CPU time in sec, peak RSS in KB) of this process
+    """
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return (ru.ru_utime + ru.ru_stime, ru.ru_maxrss)
+
+
+def _record(name, start, usage_start, args):
+    (cpu, maxrss) = _usage()
+    args.update(cpu_ms=int((cpu - usage_start[0]) * 1000), maxrss_kb=maxrss,
+                maxrss_delta_kb=maxrss - usage_start[1])
+    _EVENTS.append(dict(name=name, cat=_CATEGORY, ph='X',
+                        ts=int(start * 1000000),
+                        dur=int((time.time() - start) * 1000000),
+                        pid=os.getpid(),
+                        tid=threading.current_thread().ident, args=args))
+
+
+@contextlib.contextmanager
+def phase(name, **args):
+    """
+    Record wall time, CPU time and peak RSS of the phase run in this context.
+
+    :param name: Phase name
+    :param args: Extra data to record with, e.g. host=<host_id>
+    """
+    if _EVENTS is None:
+        yield
+        return
+
+    (start, usage) = (time.time(), _usage())
+    try:
+        yield
+    finally:
+        _record(name, start, usage, args)
+
+
+def traced_g(iterable, name, key=None, **args):
+    """
+    Record the time to make each item of `iterable`, e.g. a generator yields
+    data made lazily.
+
+    :param iterable: An iterable object
+    :param name: Phase name
+    :param key: A callable returns a dict of extra data of each item or None
+    """
+    if _EVENTS is None:
+        for item in iterable:
+            yield item
+        return
+
+    itr = iter(iterable)
+    while True:
+        (start, usage) = (time.time(), _usage())
+        try:
+            item = next(itr)
+        except StopIteration:
+            return
+
+        iargs = dict(args)
+        if key is not None:
+            iargs.update(key(item))
+
+        _record(name, start, usage, iargs)
+        yield item
+
+
+def label(name):
+    """
+    Label this process in the trace, e.g. with the host identity.
+    """
+    if _EVENTS is not None:
+        _EVENTS.append(dict(name="process_name", ph='M', pid=os.getpid(),
+                            args=dict(name=name)))
+
+
+def dump(filepath):
+    """
+    Dump events recorded into `filepath` in Chrome trace format.
+    """
+    U.json_dump(dict(traceEvents=events(), displayTimeUnit="ms"), filepath)
+    LOG.info(_("Dumped the trace: %s"), filepath)
+
+# vim:sw=4:ts=4:et:
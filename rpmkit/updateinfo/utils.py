@@ -8,6 +8,7 @@
 # PARTICULAR PURPOSE. You should have received a copy of GPLv3 along with this
 # software; if not, see http://www.gnu.org/licenses/gpl.html
 #
+import rpmkit.updateinfo.rpmlist
 import rpmkit.rpmutils
 
 import codecs
@@ -74,7 +75,7 @@ def fileopen(path, flag='r', encoding="utf-8"):
     return codecs.open(path, flag, encoding)
 
 
-def _is_bsd_hashdb(dbpath):
+def _is_bsd_hashdb(dbpath, warn=logging.warn):
     """
     TODO: Is this enough to check if given file ``dbpath`` is RPM DB file ?
     And also, maybe some db files should be opened w/ bsddb.btopen instead of
@@ -90,7 +91,7 @@ def _is_bsd_hashdb(dbpath):
 
         bsddb.hashopen(dbpath, 'r')
     except:
-        logging.warn("Not a Berkley DB?: %s" % dbpath)
+        warn("Not a Berkley DB?: %s" % dbpath)
         return False
 
     return True
@@ -109,37 +110,62 @@ _RPM_DB_FILENAMES = ["Packages", "Basenames", "Dirnames", "Installtid", "Name",
                      "Obsoletename", "Providename", "Requirename"]
 
 
-def check_rpmdb_root(root, readonly=True, dbnames=_RPM_DB_FILENAMES):
+def scan_rpmdb_root(root, readonly=True, dbnames=_RPM_DB_FILENAMES):
     """
+    Check RPM DB files like :function:`check_rpmdb_root` but list them at
+    once instead of stat-ing each, and return log messages instead of
+    logging them, so that it can be called in threads of a process forking
+    other processes.
+
     :param root: The pivot root directry where target's RPM DB files exist.
     :param readonly: Ensure RPM DB files readonly.
-    :return: True if necessary setup was done w/ success else False
+    :return: A tuple of (True if necessary setup was done w/ success else
+        False, a list of (log level, message))
     """
     assert root != "/",  "Do not run this for host system's RPM DB!"
 
     rpmdbdir = os.path.join(root, RPMDB_SUBDIR)
+    logs = []
 
-    if not os.path.exists(rpmdbdir):
-        logging.error("RPM DB dir %s does not exist!" % rpmdbdir)
-        return False
+    try:
+        dbfiles = set(os.listdir(rpmdbdir))
+    except OSError:
+        logs.append((logging.ERROR,
+                     "RPM DB dir %s does not exist!" % rpmdbdir))
+        return (False, logs)
 
     pkgdb = os.path.join(rpmdbdir, "Packages")
-    if not _is_bsd_hashdb(pkgdb):
-        logging.error("%s does not look a RPM DB (Packages) file!" % pkgdb)
-        return False
+    if not _is_bsd_hashdb(pkgdb, lambda m: logs.append((logging.WARN, m))):
+        logs.append((logging.ERROR,
+                     "%s does not look a RPM DB (Packages) file!" % pkgdb))
+        return (False, logs)
 
     for dbn in dbnames:
-        dbpath = os.path.join(rpmdbdir, dbn)
-
-        if not os.path.exists(dbpath):
+        if dbn not in dbfiles:
             # NOTE: It's not an error at once.
-            logging.info("RPM DB %s looks missing" % dbn)
+            logs.append((logging.INFO, "RPM DB %s looks missing" % dbn))
+            continue
 
+        dbpath = os.path.join(rpmdbdir, dbn)
         if readonly and os.access(dbpath, os.W_OK):
-            logging.info("Drop write access perm from %s " % dbn)
+            logs.append((logging.INFO,
+                         "Drop write access perm from %s " % dbn))
             os.chmod(dbpath, _MODE_RO)
 
-    return True
+    return (True, logs)
+
+
+def check_rpmdb_root(root, readonly=True, dbnames=_RPM_DB_FILENAMES):
+    """
+    :param root: The pivot root directry where target's RPM DB files exist.
+    :param readonly: Ensure RPM DB files readonly.
+    :return: True if necessary setup was done w/ success else False
+    """
+    (ok, logs) = scan_rpmdb_root(root, readonly, dbnames)
+    for level, msg in logs:
+        logging.log(level, msg)
+
+    return ok
 
 
 RHERRATA_RE = re.compile(r"^RH[SBE]A-\d{4}[:-]\d{4,5}(?:-\d+)?$")
@@ -214,7 +240,12 @@ def guess_rhel_repos(root, with_extras=False):
     :param with_extras: Include extra yum repos if True
     :return: A list of yum repos
     """
-    rhelver = rpmkit.rpmutils.guess_rhel_version_simple(root)
+    rlist = rpmkit.updateinfo.rpmlist.find_rpm_list(root)
+    if rlist:
+        pkgs = rpmkit.updateinfo.rpmlist.load(rlist)
+        rhelver = rpmkit.updateinfo.rpmlist.guess_rhel_version(pkgs)
+    else:
+        rhelver = rpmkit.rpmutils.guess_rhel_version_simple(root)
     assert rhelver in (5, 6, 7), "Not supported RHEL version: %d" % rhelver
 
     if rhelver == 5:
@@ -47,6 +47,122 @@ def normalize_cve(cve):
     return cve
 
 
+def _references(nmd, rtype):
+    return [r for r in nmd.get("references", []) if r.get("type") == rtype]
+
+
+class Errata(rpmkit.updateinfo.base.Record):
+    """
+    Dict-compatible errata record made from an updateinfo notice lazily.
+
+    Description, solution, references and packages of the notice are
+    converted only when they are accessed first, so that errata filtered out
+    later cost little. :meth:`to_dict` or dict() makes all of them, and the
+    notice is released after that.
+
+    >>> nmd = dict(update_id="RHBA-2015:0001", title="bash bug fix",
+    ...            description="...", updated="2015-01-01",
+    ...            issued="2015-01-01", solution="...", type="bugfix",
+    ...            references=[dict(id="1", title="bug", type="bugzilla")],
+    ...            pkglist=[dict(packages=[dict(name="bash", version="4.1.2",
+    ...                                         release="29.el6", epoch="0",
+    ...                                         arch="x86_64")])])
+    >>> e = Errata(nmd)
+    >>> e["advisory"], e["package_names"], [b["summary"] for b in e["bzs"]]
+    ('RHBA-2015:0001', 'bash', ['bug'])
+    >>> len(e), len(e.to_dict()), e.get("cves"), e._nmd
+    (13, 13, [], None)
+    """
+    _lazy_keys = frozenset(("description", "solution", "bzs", "cves",
+                            "packages", "package_names"))
+    __slots__ = ("_nmd", "_data", "_pending")
+
+    def __init__(self, nmd):
+        """
+        :param nmd: Notice metadata, see :function:`_notice_to_errata`
+        """
+        advisory = nmd["update_id"]
+        self._nmd = nmd
+        self._data = dict(advisory=advisory, synopsis=nmd["title"],
+                          update_date=nmd["updated"],
+                          issue_date=nmd["issued"], type=nmd["type"],
+                          severity=nmd.get("severity", "N/A"),
+                          url=rpmkit.updateinfo.utils.errata_url(advisory))
+        self._pending = self._lazy_keys
+
+    def _make(self, key):
+        nmd = self._nmd
+        if key in ("description", "solution"):
+            return nmd[key]
+
+        if key == "bzs":
+            return [normalize_bz(bz) for bz in _references(nmd, "bugzilla")]
+
+        if key == "cves":
+            return [normalize_cve(cve) for cve in _references(nmd, "cve")]
+
+        if key == "packages":
+            return [rpmkit.updateinfo.base.NEVRA(**p) for p in
+                    RU.concat(nps["packages"] for nps in
+                              nmd.get("pkglist", []))]
+
+        return ','.join(RU.uniq(p["name"] for p in self["packages"]))
+
+    def _done(self, key):
+        self._pending = self._pending - set([key])
+        if not self._pending:
+            self._nmd = None  # Not needed any more.
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            self._data[key] = self._make(key)
+            self._done(key)
+
+        return self._data[key]
+
+    def __setitem__(self, key, val):
+        self._data[key] = val
+        if key in self._pending:
+            self._done(key)
+
+    def __delitem__(self, key):
+        if key in self._pending:
+            self._done(key)
+        else:
+            del self._data[key]
+
+    def __iter__(self):
+        for key in self._data:
+            yield key
+
+        for key in self._pending:
+            yield key
+
+    def __len__(self):
+        return len(self._data) + len(self._pending)
+
+    def __contains__(self, key):
+        return key in self._data or key in self._pending
+
+    def __getstate__(self):
+        return (self._nmd, self._data, self._pending)
+
+    def __setstate__(self, state):
+        (self._nmd, self._data, self._pending) = state
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def to_dict(self):
+        """
+        :return: A dict represents this errata, e.g. to dump as JSON data
+        """
+        return dict(self)
+
+
+collections.Mapping.register(Errata)
+
+
 def _notice_to_errata(notice):
     """
     Notice metadata examples:
@@ -76,28 +192,7 @@ def _notice_to_errata(notice):
      'title': 'CVE-2013-1994',
      'type': 'cve'}
     """
-    nmd = notice.get_metadata()
-
-    errata = dict(advisory=nmd["update_id"], synopsis=nmd["title"],
-                  description=nmd["description"], update_date=nmd["updated"],
-                  issue_date=nmd["issued"], solution=nmd["solution"],
-                  type=nmd["type"], severity=nmd.get("severity", "N/A"))
-
-    errata["bzs"] = [normalize_bz(bz) for bz in
-                     filter(lambda r: r.get("type") == "bugzilla",
-                            nmd.get("references", []))]
-    errata["cves"] = [normalize_cve(cve) for cve in
-                      filter(lambda r: r.get("type") == "cve",
-                             nmd.get("references", []))]
-
-    errata["packages"] = RU.concat(nps["packages"] for nps in
-                                   nmd.get("pkglist", []))
-
-    errata["package_names"] = ','.join(RU.uniq(p["name"] for p
-                                               in errata["packages"]))
-    errata["url"] = rpmkit.updateinfo.utils.errata_url(errata["advisory"])
-
-    return errata
+    return Errata(notice.get_metadata())
 
 
 def _to_pkg(pkg, extras=[], extra_names=[]):
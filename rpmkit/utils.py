@@ -21,6 +21,7 @@
 from itertools import izip, takewhile
 
 import codecs
+import collections
 import datetime
 import itertools
 import logging
@@ -393,6 +394,20 @@ def json_load(filepath, encoding="utf-8"):
     return json.load(copen(filepath, encoding=encoding))
 
 
+def _json_default(obj):
+    """
+    Convert objects json module does not know how to serialize, e.g. compact
+    dict-like records such as rpmkit.updateinfo.base.Package.
+
+    >>> _json_default(collections.OrderedDict(a=1))
+    {'a': 1}
+    """
+    if isinstance(obj, collections.Mapping):
+        return dict(obj)
+
+    raise TypeError("%r is not JSON serializable" % obj)
+
+
 def json_dump(data, filepath):
     """
     Dump given ``data`` into ``filepath`` in JSON format.
@@ -400,7 +415,20 @@ def json_dump(data, filepath):
     :param data: Data to dump
     :param filepath: Output file path
     """
-    json.dump(data, copen(filepath, 'w'))
+    json.dump(data, copen(filepath, 'w'), default=_json_default)
+
+
+def json_dumps(data, **kwargs):
+    """
+    Serialize given ``data`` to a str in JSON format.
+
+    :param data: Data to dump
+    :param kwargs: Keyword arguments passed to :function:`json.dumps`
+
+    >>> json_dumps(dict(b=1, a=collections.OrderedDict(c=2)), sort_keys=True)
+    '{"a": {"c": 2}, "b": 1}'
+    """
+    return json.dumps(data, default=_json_default, **kwargs)
 
 
 def select_from_list_g(xs, ref_xs=[]):